@@ -1,5 +1,11 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import os
 from datetime import timedelta
+from importlib import import_module
+
+import click
 from flask import Flask, redirect, url_for, render_template, session, flash
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from flask_mail import Mail
@@ -7,7 +13,38 @@ from flask_mail import Mail
 mail = Mail()
 csrf = CSRFProtect()
 
+# Costo de importar el paquete (Flask y extensiones), para `flask startup-report`
+_IMPORT_MS = (time.perf_counter() - _IMPORT_START) * 1000
+
+
+class _LazyCommand(click.Command):
+    """
+    Comando de CLI que importa su módulo recién al ejecutarse. Para los de
+    operación (seed, bench, db-audit, startup-report): los workers que solo
+    atienden requests no pagan esos imports en cada arranque.
+    """
+
+    def __init__(self, name, target, help):
+        super().__init__(name, help=help)
+        self.target = target   # "módulo:comando"
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        module, _, attr = self.target.partition(":")
+        command = getattr(import_module(module), attr)
+        return command.make_context(info_name, args, parent=parent, **extra)
+
 def create_app(test_config=None):
+    # create_app no toca la base: eso lo hace `flask bootstrap` una sola vez
+    # (ver db.bootstrap). Acá solo se miden las fases del arranque.
+    started = time.perf_counter()
+    timings = {"package_import_ms": round(_IMPORT_MS, 2)}
+
+    def mark(phase):
+        nonlocal started
+        now = time.perf_counter()
+        timings[phase] = round((now - started) * 1000, 2)
+        started = now
+
     app = Flask(__name__, instance_relative_config=True)
 
     # Crear carpeta instance si no existe
@@ -22,6 +59,64 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY=os.getenv('SECRET_KEY', 'dev'),
         DATABASE=os.path.join(app.instance_path, 'flaskr.sqlite'),
+
+        # Pool de conexiones SQLite (por proceso)
+        DB_POOL_SIZE=8,
+        DB_POOL_TIMEOUT=10.0,
+
+        # Pool de solo lectura (listados y reportes)
+        DB_READ_POOL_SIZE=8,
+        DB_READ_CACHE_SIZE_KB=16384,
+        DB_READ_MMAP_SIZE=256 * 1024 * 1024,
+
+        # Filas por lote en las exportaciones (fetchmany)
+        EXPORT_BATCH_SIZE=1000,
+
+        # Filas por transacción en la importación de productos
+        IMPORT_CHUNK_SIZE=1000,
+
+        # Cache por proceso del usuario logueado (g.user)
+        USER_CACHE_SIZE=1024,
+        USER_CACHE_TTL=30.0,
+
+        # Productos que muestra /stock/consult sin búsqueda
+        CONSULT_LIMIT=50,
+
+        # Hashing de contraseñas fuera del hilo de la request
+        # (HASH_EXECUTOR: process | thread | inline)
+        PASSWORD_HASH_METHOD='scrypt',
+        HASH_EXECUTOR='process',
+        HASH_WORKERS=None,        # None: según CPUs
+        HASH_MAX_PENDING=None,    # None: 2 por worker
+        HASH_TIMEOUT=10.0,
+
+        # Bandeja de salida de mails (worker en segundo plano)
+        MAIL_OUTBOX_WORKER=None,     # None: activo salvo con TESTING
+        MAIL_OUTBOX_POLL=5.0,        # segundos entre revisiones
+        MAIL_OUTBOX_BATCH=50,        # mails por conexión SMTP
+        MAIL_OUTBOX_MAX_ATTEMPTS=6,  # luego pasa a DEAD
+        MAIL_OUTBOX_BACKOFF=30,      # segundos; se duplica en cada intento
+
+        # Cola de escritura con group commit para sales.new / shopping.new
+        WRITE_QUEUE_ENABLED=False,
+        WRITE_QUEUE_MAX_BATCH=64,
+        WRITE_QUEUE_MAX_DELAY_MS=5,
+
+        # Máximo de ventas por lote en la API de cajas
+        SALES_API_MAX_BATCH=500,
+
+        # Paginación por keyset de los historiales (?limit= acotado)
+        PAGE_SIZE=50,
+        MAX_PAGE_SIZE=500,
+        # Listados renderizados en streaming: bytes por chunk enviado
+        STREAM_BUFFER_BYTES=16 * 1024,
+
+        # Métricas por proceso en /metrics (formato Prometheus)
+        METRICS_ENABLED=True,
+        METRICS_TOKEN=os.getenv('METRICS_TOKEN'),   # Bearer para el scraper de Prometheus
+
+        # Log de consultas lentas con su EXPLAIN QUERY PLAN (ms; None = apagado)
+        SLOW_QUERY_MS=None,
     )
 
     if test_config is None:
@@ -59,17 +154,27 @@ def create_app(test_config=None):
         WTF_CSRF_SSL_STRICT=False,
     )
 
+    mark("config_ms")
+
     # -----------------------------
     # 🔌 Inicializar extensiones
     # -----------------------------
     mail.init_app(app)
     csrf.init_app(app)
 
+    from . import hashing, metrics, outbox
+    metrics.init_app(app)   # primero: su before_request toma el tiempo de toda la request
+    hashing.init_app(app)
+    outbox.init_app(app)
+
     # -----------------------------
     # 🗄️ Inicializar base de datos
     # -----------------------------
     from . import db
+    from .migrations import migrate_command
     db.init_app(app)
+    app.cli.add_command(migrate_command)
+    mark("extensions_ms")
 
     # -----------------------------
     # 📦 Registrar Blueprints
@@ -81,8 +186,32 @@ def create_app(test_config=None):
     app.register_blueprint(users.bp)
     app.register_blueprint(sales.bp)
     app.register_blueprint(stock.bp)
+    app.cli.add_command(stock.import_products_command)
+    app.cli.add_command(stock.snapshot_stock_command)
+    app.cli.add_command(stock.backfill_ledger_command)
+    app.cli.add_command(stock.reconcile_stock_command)
     app.register_blueprint(shopping.bp)
     app.register_blueprint(reports.bp)
+    app.cli.add_command(reports.backfill_rollups_command)
+
+    from .export import export_command
+    app.cli.add_command(export_command)
+
+    # Los blueprints sí se importan acá: Flask necesita las vistas para
+    # registrar las rutas. Los comandos de operación se cargan al usarlos.
+    for name, target, help in (
+        ("seed", "flaskr.seed:seed_command",
+         "Genera un dataset de volumen (productos, usuarios, compras y ventas)."),
+        ("bench", "flaskr.bench:bench_command",
+         "Mide latencia (p50/p95/p99) y throughput de los endpoints GET y del login."),
+        ("db-audit", "flaskr.dbaudit:db_audit_command",
+         "Captura las consultas de cada endpoint y marca los planes con SCAN o TEMP B-TREE."),
+        ("startup-report", "flaskr.startup:startup_report_command",
+         "Muestra cuánto cuesta cada fase del arranque de un worker."),
+    ):
+        app.cli.add_command(_LazyCommand(name, target, help))
+
+    mark("blueprints_ms")
 
     # -----------------------------
     # 🔄 Redirección raíz
@@ -101,6 +230,7 @@ def create_app(test_config=None):
         si no, redirige al login.
         """
         user_id = session.get("user_id")
+        metrics.count_event("csrf_error")
 
         flash("⚠️ Se detectó un problema de seguridad en el formulario. Intenta de nuevo.", "warning")
 
@@ -114,12 +244,10 @@ def create_app(test_config=None):
             # Sesión expirada o inválida → redirigir al login
             return redirect(url_for("auth.login"))
         
-    # -----------------------------
-    # 👑 Crear usuario ADMIN por defecto (si no existe)
-    # -----------------------------
-    with app.app_context():
-        from .db import ensure_admin
-        ensure_admin()
+    mark("handlers_ms")
+    timings["create_app_ms"] = round(sum(
+        v for k, v in timings.items() if k != "package_import_ms"), 2)
+    app.extensions["startup"] = timings
 
     # -----------------------------
     # ✅ Retornar la app configurada
@@ -4,8 +4,8 @@ from flask import (
     Blueprint, flash, redirect, render_template,
     request, url_for, session, g
 )
-from werkzeug.security import generate_password_hash, check_password_hash
 from flaskr.db import get_db
+from flaskr.hashing import hash_password, needs_rehash, verify_password
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -45,12 +45,43 @@ def roles_required(*roles):
     return decorator
 
 
-from flask import g, session
-from flaskr.db import get_db
+from flask import g, session, current_app
+from flaskr.db import get_db, get_read_db
+from flaskr.cache import TTLCache
+
+# Campos de user que usan roles_required y las plantillas (nunca el hash)
+USER_CACHE_FIELDS = ("id", "firstname", "lastname", "email", "username", "role", "status")
+
+
+def get_user_cache() -> TTLCache:
+    """Cache por proceso de g.user: id de usuario -> (user.cache_version, fila)."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault("user_cache", TTLCache(
+            maxsize=current_app.config["USER_CACHE_SIZE"],
+            ttl=current_app.config["USER_CACHE_TTL"],
+        ))
+    return cache
+
+
+def invalidate_user(user_id):
+    """
+    Descarta el usuario cacheado en este proceso. Los demás workers se
+    enteran por su user.cache_version, que avanza trg_user_cache_version.
+    """
+    get_user_cache().invalidate(user_id)
+
 
 @bp.before_app_request
 def load_logged_in_user():
-    """Carga g.user desde la sesión si hay user_id. Tolerante a errores."""
+    """
+    Carga g.user desde la sesión si hay user_id. Tolerante a errores.
+
+    Cada request lee igual user.cache_version por PK (es lo que hace que un
+    cambio hecho en otro worker se vea enseguida), así que el cache no ahorra
+    la consulta: ahorra leer y armar la fila completa. La versión es por
+    usuario, y editar a uno no invalida a los demás.
+    """
     user_id = session.get("user_id")
 
     # Si no hay sesión activa, g.user = None
@@ -58,15 +89,37 @@ def load_logged_in_user():
         g.user = None
         return
 
+    cache = get_user_cache()
     try:
-        db = get_db()
-        row = db.execute("SELECT * FROM user WHERE id = ?", (user_id,)).fetchone()
-        g.user = dict(row) if row else None
+        # La fila completa solo se relee si su versión cambió
+        db = get_read_db()
+        row = db.execute("SELECT cache_version FROM user WHERE id = ?", (user_id,)).fetchone()
+        if row is None:
+            cache.invalidate(user_id)
+            g.user = None
+            return
+        version = row["cache_version"]
+        cached = cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            user = cached[1]
+        else:
+            row = db.execute(
+                f"SELECT {', '.join(USER_CACHE_FIELDS)} FROM user WHERE id = ?",
+                (user_id,)
+            ).fetchone()
+            if row is None:
+                cache.invalidate(user_id)
+                g.user = None
+                return
+            user = dict(row)
+            cache.set(user_id, (version, user))
     except Exception as e:
         # Previene que errores de DB rompan la sesión
         g.user = None
+        return
 
-
+    # Un usuario suspendido queda afuera aunque tenga la sesión abierta
+    g.user = dict(user) if user["status"] == "ACTIVE" else None
 
 
 # ----------------------------
@@ -105,7 +158,7 @@ def register():
                     INSERT INTO user (firstname, lastname, email, username, password_hash)
                     VALUES (?, ?, ?, ?, ?)
                     """,
-                    (firstname, lastname, email, username, generate_password_hash(password)),
+                    (firstname, lastname, email, username, hash_password(password)),
                 )
                 db.commit()
             except sqlite3.IntegrityError as e:
@@ -149,8 +202,10 @@ def login():
             ).fetchone()
 
             # Mensaje genérico para no filtrar existencia del usuario
-            if user is None or not check_password_hash(user['password_hash'], password):
+            if user is None or not verify_password(user['password_hash'], password):
                 error = 'Usuario o contraseña incorrectos.'
+            elif user['status'] != 'ACTIVE':
+                error = 'Tu cuenta está suspendida.'
 
         if error is None:
             session.clear()
@@ -162,6 +217,12 @@ def login():
                 "UPDATE user SET last_login_at = strftime('%Y-%m-%dT%H:%M:%fZ','now') WHERE id = ?",
                 (user['id'],)
             )
+            # Hash con un método/costo anterior: se actualiza con la contraseña en mano
+            if needs_rehash(user['password_hash']):
+                db.execute(
+                    "UPDATE user SET password_hash = ? WHERE id = ?",
+                    (hash_password(password), user['id'])
+                )
             db.commit()
 
             # Redirección opcional según rol
@@ -0,0 +1,193 @@
+# flaskr/bench.py
+import json
+import math
+import os
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from flaskr.db import get_read_db
+from flaskr.seed import SEED_PASSWORD
+
+# Endpoints GET de cada blueprint que se miden por defecto: (nombre, ruta)
+ENDPOINTS = (
+    ("main.index", "/main/"),
+    ("users.perfil", "/users/perfil"),
+    ("reports.index", "/reports/"),
+    ("reports.top_sellers", "/reports/top-sellers?limit=20"),
+    ("sales.list_all", "/sales/list"),
+    ("sales.my_sales", "/sales/my"),
+    ("shopping.list", "/shopping/list"),
+    ("shopping.my_purchases", "/shopping/my"),
+    ("stock.consult", "/stock/consult"),
+    ("stock.consult?q", "/stock/consult?q=cafe"),
+    ("stock.search", "/stock/search?q=yer"),
+    ("stock.list", "/stock/list"),
+    ("users.admin_panel", "/users/admin"),
+    ("users.manage", "/users/manage"),
+)
+
+# POST que también se miden: el login incluye la verificación del hash, que
+# es lo más caro del arranque de una sesión. Los formularios de la app
+# responden 302 (PRG) cuando salen bien.
+POST_ENDPOINTS = (
+    ("auth.login", "/auth/login"),
+)
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def make_client(app, user_id):
+    """Cliente de prueba con la sesión de `user_id` ya iniciada (bench y db-audit)."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+    return client
+
+
+def measure(app, path, user_id, requests=200, threads=1, warmup=5, data=None):
+    """
+    Pide `path` `requests` veces repartidas en `threads` hilos (cada uno con
+    su propio cliente y sesión). Con `data` hace un POST de ese formulario
+    y cuenta como error toda respuesta que no sea 302. Devuelve latencias
+    (ms) y throughput.
+    """
+    method = "GET" if data is None else "POST"
+    warm = make_client(app, user_id)
+    for _ in range(warmup):
+        warm.open(path, method=method, data=data)
+
+    per_thread = max(1, requests // threads)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = make_client(app, user_id)
+        local, bad = [], 0
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            resp = client.open(path, method=method, data=data)
+            resp.close()
+            local.append((time.perf_counter() - start) * 1000)
+            if resp.status_code >= 400 or (data is not None and resp.status_code != 302):
+                bad += 1
+        with lock:
+            latencies.extend(local)
+            errors.append(bad)
+
+    start = time.perf_counter()
+    if threads == 1:
+        worker()
+    else:
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "p50": round(percentile(latencies, 50), 2),
+        "p95": round(percentile(latencies, 95), 2),
+        "p99": round(percentile(latencies, 99), 2),
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+    }
+
+
+def _baseline_path(name):
+    return os.path.join(current_app.instance_path, "bench", f"{name}.json")
+
+
+def _delta(new, old):
+    if not old:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+# -----------------
+# Comando de CLI
+# -----------------
+@click.command("bench")
+@click.option("--requests", "-n", default=200, show_default=True, help="Requests por endpoint.")
+@click.option("--threads", "-t", default=1, show_default=True, help="Hilos concurrentes (modo carga).")
+@click.option("--endpoint", "-e", "only", multiple=True, help="Medir solo estos (nombre o ruta).")
+@click.option("--save", "save_as", default=None, help="Guarda los resultados como baseline NOMBRE.")
+@click.option("--compare", "compare_to", default=None, help="Compara contra el baseline NOMBRE.")
+@click.option("--login-user", default=None,
+              help="Usuario para medir /auth/login (por defecto, el primero de `flask seed`).")
+@click.option("--login-password", default=SEED_PASSWORD, show_default=True,
+              help="Contraseña de --login-user.")
+@with_appcontext
+def bench_command(requests, threads, only, save_as, compare_to, login_user, login_password):
+    """Mide latencia (p50/p95/p99) y throughput de los endpoints GET y del login."""
+    app = current_app._get_current_object()
+    db = get_read_db()
+    admin = db.execute(
+        "SELECT id FROM user WHERE role = 'ADMIN' AND status = 'ACTIVE' ORDER BY id LIMIT 1"
+    ).fetchone()
+    if admin is None:
+        raise click.ClickException("Se necesita un usuario ADMIN activo (flask create-admin).")
+    if login_user is None:
+        row = db.execute(
+            "SELECT username FROM user WHERE email LIKE 'seed%@example.com' ORDER BY id LIMIT 1"
+        ).fetchone()
+        login_user = row["username"] if row else None
+    login_form = {"username": login_user, "password": login_password}
+
+    def selected(entries):
+        return [(n, p) for n, p in entries if not only or n in only or p in only]
+
+    known = {p for _, p in ENDPOINTS + POST_ENDPOINTS}
+    endpoints = [(n, p, None) for n, p in selected(ENDPOINTS)]
+    endpoints += [(p, p, None) for p in only if p.startswith("/") and p not in known]
+    posts = selected(POST_ENDPOINTS)
+    if posts and login_user is None:
+        click.echo("auth.login: sin usuario para el login (--login-user o `flask seed`), se omite.", err=True)
+    elif posts:
+        endpoints += [(n, p, login_form) for n, p in posts]
+
+    baseline = {}
+    if compare_to:
+        with open(_baseline_path(compare_to), encoding="utf8") as f:
+            baseline = json.load(f)["results"]
+
+    click.echo(f"{'endpoint':<24} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'err':>4}")
+    # Sin CSRF mientras mide: el login limpia la sesión (y con ella el token)
+    # en cada request exitosa, y lo que interesa es el costo de la vista.
+    csrf_enabled = app.config.get("WTF_CSRF_ENABLED", True)
+    app.config["WTF_CSRF_ENABLED"] = False
+    results = {}
+    try:
+        for name, path, data in endpoints:
+            r = measure(app, path, admin["id"], requests=requests, threads=threads, data=data)
+            results[name] = r
+            old = baseline.get(name, {})
+            click.echo(
+                f"{name:<24} {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} {r['rps']:>8} {r['errors']:>4}"
+                + (f"   p95 {_delta(r['p95'], old.get('p95'))} req/s {_delta(r['rps'], old.get('rps'))}"
+                   if old else "")
+            )
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = csrf_enabled
+
+    if save_as:
+        path = _baseline_path(save_as)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "requests": requests, "threads": threads, "results": results,
+            }, f, indent=2)
+        click.echo(f"Baseline guardado en {path}")
@@ -0,0 +1,49 @@
+# flaskr/conditional.py
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+
+from flaskr.db import get_read_db
+
+
+def _etag(fingerprint) -> str:
+    # La misma huella sirve para distintas páginas, usuarios y filtros
+    user = sorted(g.user.items()) if getattr(g, "user", None) else None
+    key = repr((request.endpoint, request.query_string, user, tuple(fingerprint)))
+    return hashlib.blake2b(key.encode("utf8"), digest_size=16).hexdigest()
+
+
+def conditional_get(fingerprint):
+    """
+    GET condicional con ETag para páginas que se consultan seguido.
+
+    `fingerprint(db)` devuelve una tupla barata de calcular (versión del
+    catálogo, MAX(updated_at), conteos sobre un índice) que cambia cuando
+    cambian los datos de la página. Si el navegador ya tiene esa versión
+    (If-None-Match) se responde 304 sin ejecutar la vista: ni las
+    consultas del listado ni el render de Jinja.
+
+    Con mensajes flash pendientes se renderiza siempre y sin ETag: la
+    página los incluye una sola vez.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or "_flashes" in session:
+                return fn(*args, **kwargs)
+
+            etag = _etag(fingerprint(get_read_db()))
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200 or "_flashes" in session:
+                    return response
+            response.set_etag(etag)
+            # El navegador guarda la página pero revalida en cada visita
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -1,18 +1,93 @@
 # flaskr/db.py
 import os
+import pathlib
+import secrets
 import sqlite3
+import threading
+import time
 from datetime import datetime
 import click
-from flask import current_app, g
-from werkzeug.security import generate_password_hash
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask.cli import with_appcontext
+from flaskr.hashing import hash_password
 
 
 # ---------------------------------
 # Conexión e inicialización básica
 # ---------------------------------
+def explain(conn, sql, parameters=()):
+    """Pasos de EXPLAIN QUERY PLAN de `sql` (sin pasar por la medición)."""
+    rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    return [row[3] for row in rows]
+
+
+def _log_slow_query(conn, sql, parameters, elapsed):
+    try:
+        plan = explain(conn, sql, parameters) if parameters is not None else []
+    except sqlite3.Error:
+        plan = []
+    current_app.logger.warning(
+        "SQL lento (%.1f ms) en %s: %s | params=%r | plan: %s",
+        elapsed * 1000,
+        request.endpoint if has_request_context() else "cli",
+        " ".join(sql.split()),
+        parameters,
+        " / ".join(plan) or "-",
+    )
+
+
+def _record_sql(conn, sql, parameters, elapsed):
+    # Fuera de un contexto de la app (p. ej. el hilo de la cola de
+    # escritura) no se mide nada.
+    if not has_app_context():
+        return
+    # Sentencias y tiempo de la request en curso (ver metrics)
+    stats = g.get("sql_stats")
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+    # Sentencias que registra `flask db-audit`
+    captured = g.get("sql_capture")
+    if captured is not None:
+        captured.append((sql, parameters))
+    slow_ms = current_app.config.get("SLOW_QUERY_MS")
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        _log_slow_query(conn, sql, parameters, elapsed)
+
+
+class TimedConnection(sqlite3.Connection):
+    """
+    Conexión que mide cada execute/executemany/executescript: alimenta las
+    métricas por request y, con SLOW_QUERY_MS, el log de consultas lentas.
+    """
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(self, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            # Sin parámetros para el EXPLAIN: pueden ser miles de filas
+            _record_sql(self, sql, None, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_sql(self, sql_script, None, time.perf_counter() - start)
+
+
 def _connect_db(path: str) -> sqlite3.Connection:
     conn = sqlite3.connect(
         path,
+        factory=TimedConnection,
         detect_types=sqlite3.PARSE_DECLTYPES,
         timeout=10.0,            # evita "database is locked"
         check_same_thread=False  # útil si hay threads/WSGI
@@ -20,6 +95,7 @@ def _connect_db(path: str) -> sqlite3.Connection:
     conn.row_factory = sqlite3.Row
 
     # PRAGMAs recomendados para SQLite en apps web
+    # (una sola vez por conexión: las conexiones viven en el pool)
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute("PRAGMA journal_mode = WAL;")
     conn.execute("PRAGMA synchronous = NORMAL;")
@@ -27,23 +103,270 @@ def _connect_db(path: str) -> sqlite3.Connection:
     return conn
 
 
+def _connect_read_db(path: str, cache_size_kb: int, mmap_size: int) -> sqlite3.Connection:
+    """
+    Conexión de solo lectura (`mode=ro` + `query_only`) para listados y
+    reportes. En WAL los lectores trabajan sobre su propio snapshot y no
+    bloquean ni son bloqueados por las escrituras.
+    """
+    uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(
+        uri,
+        uri=True,
+        factory=TimedConnection,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        timeout=10.0,
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+
+    conn.execute("PRAGMA query_only = ON;")
+    conn.execute("PRAGMA busy_timeout = 5000;")
+    conn.execute(f"PRAGMA cache_size = -{int(cache_size_kb)};")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)};")
+    return conn
+
+
+# ---------------------------------
+# Pool de conexiones
+# ---------------------------------
+class PoolTimeout(sqlite3.OperationalError):
+    """No se liberó ninguna conexión del pool dentro del timeout."""
+
+
+class ConnectionPool:
+    """
+    Pool acotado y thread-safe de conexiones SQLite.
+
+    Las conexiones se crean a demanda (hasta `max_size`) con `connect`, que
+    aplica los PRAGMAs una sola vez por conexión. Al tomar una conexión se
+    verifica que siga abierta y sin transacción pendiente; al devolverla se
+    descarta cualquier transacción abierta para no retener locks.
+    """
+
+    def __init__(self, connect, max_size=8, timeout=10.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Estadísticas
+        self._borrows = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+        conn = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No hay conexiones libres tras {self.timeout}s "
+                        f"(pool de {self.max_size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            elapsed = time.perf_counter() - start
+            self._borrows += 1
+            if waited:
+                self._waits += 1
+                self._wait_total += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+
+        if conn is not None:
+            conn = self._checked(conn)
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._discard()
+                raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._close_quietly(conn)
+            self._discard()
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _checked(self, conn):
+        """Devuelve la conexión lista para usar, o None si hay que reemplazarla."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("SELECT 1")
+            return conn
+        except sqlite3.Error:
+            self._close_quietly(conn)
+            return None
+
+    def _discard(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "borrows": self._borrows,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_total_ms": round(self._wait_total * 1000, 3),
+                "wait_avg_ms": round(self._wait_total * 1000 / self._waits, 3) if self._waits else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+_pool_lock = threading.Lock()
+
+
+def _get_pool(app, key, make_pool) -> ConnectionPool:
+    pool = app.extensions.get(key)
+    if pool is None:
+        with _pool_lock:
+            pool = app.extensions.get(key)
+            if pool is None:
+                pool = app.extensions[key] = make_pool()
+    return pool
+
+
+def get_pool(app=None) -> ConnectionPool:
+    """Pool de lectura/escritura de la app (se crea la primera vez que se pide)."""
+    app = app or current_app._get_current_object()
+    path = app.config["DATABASE"]
+    return _get_pool(app, "db_pool", lambda: ConnectionPool(
+        lambda: _connect_db(path),
+        max_size=app.config["DB_POOL_SIZE"],
+        timeout=app.config["DB_POOL_TIMEOUT"],
+    ))
+
+
+def get_read_pool(app=None) -> ConnectionPool:
+    """Pool de solo lectura, separado para no competir con las escrituras."""
+    app = app or current_app._get_current_object()
+    path = app.config["DATABASE"]
+    cache_size_kb = app.config["DB_READ_CACHE_SIZE_KB"]
+    mmap_size = app.config["DB_READ_MMAP_SIZE"]
+    return _get_pool(app, "db_read_pool", lambda: ConnectionPool(
+        lambda: _connect_read_db(path, cache_size_kb, mmap_size),
+        max_size=app.config["DB_READ_POOL_SIZE"],
+        timeout=app.config["DB_POOL_TIMEOUT"],
+    ))
+
+
+def pool_stats(app=None) -> dict:
+    return {
+        "write": get_pool(app).stats(),
+        "read": get_read_pool(app).stats(),
+    }
+
+
 def get_db() -> sqlite3.Connection:
     if "db" not in g:
-        g.db = _connect_db(current_app.config["DATABASE"])
+        g.db = get_pool().acquire()
     return g.db
 
 
+def get_read_db() -> sqlite3.Connection:
+    """Conexión de solo lectura para vistas que no escriben."""
+    if "read_db" not in g:
+        g.read_db = get_read_pool().acquire()
+    return g.read_db
+
+
 def close_db(e=None):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        get_pool().release(db)
+
+    read_db = g.pop("read_db", None)
+    if read_db is not None:
+        get_read_pool().release(read_db)
+
+
+def _drop_all_tables(db):
+    # schema.sql solo borra las tablas originales; las de las migraciones
+    # también se van. Sin FK para que el DELETE implícito del DROP no dispare
+    # SET NULL / CASCADE entre tablas que igual se borran.
+    db.commit()
+    db.execute("PRAGMA foreign_keys = OFF")
+    try:
+        # Primero las virtuales (FTS5): se llevan sus tablas internas
+        for kind in ("CREATE VIRTUAL TABLE%", "%"):
+            names = [r[0] for r in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name NOT LIKE 'sqlite_%' AND sql LIKE ?", (kind,)
+            )]
+            for name in names:
+                db.execute(f'DROP TABLE IF EXISTS "{name}"')
+        db.commit()
+    finally:
+        db.execute("PRAGMA foreign_keys = ON")
 
 
 def init_db():
+    """Recrea todo desde schema.sql y aplica encima las migraciones."""
+    from flaskr.migrations import migrate
+
     db = get_db()
+    _drop_all_tables(db)
     with current_app.open_resource("schema.sql") as f:
         db.executescript(f.read().decode("utf8"))
+    db.execute("PRAGMA user_version = 0")
     db.commit()
+    migrate(db)
 
 
 # -----------------
@@ -81,7 +404,7 @@ def create_admin_command(email, username, firstname, lastname, password):
         raise SystemExit(1)
 
     db = get_db()
-    password_hash = generate_password_hash(password)
+    password_hash = hash_password(password)
 
     db.execute(
         """
@@ -100,6 +423,52 @@ def create_admin_command(email, username, firstname, lastname, password):
     click.echo(f"Admin listo: {email} (username: {username})")
 
 
+@click.command("create-api-token")
+@click.option("--name", prompt=True, help="Nombre de la caja o integración.")
+@click.option("--username", prompt=True, help="Usuario en cuyo nombre se registran las ventas.")
+@with_appcontext
+def create_api_token_command(name, username):
+    """Crea un token de API (Bearer) y lo muestra una única vez."""
+    from flaskr.security import hash_token
+
+    db = get_db()
+    user = db.execute(
+        "SELECT id FROM user WHERE username = ? COLLATE NOCASE", (username.strip(),)
+    ).fetchone()
+    if user is None:
+        click.echo("Usuario inexistente.")
+        raise SystemExit(1)
+
+    token = secrets.token_urlsafe(32)
+    try:
+        db.execute(
+            "INSERT INTO api_token (name, token_hash, user_id) VALUES (?, ?, ?)",
+            (name.strip(), hash_token(token), user["id"]),
+        )
+        db.commit()
+    except sqlite3.IntegrityError:
+        click.echo("Ya existe un token con ese nombre.")
+        raise SystemExit(1)
+    click.echo(f"Token para '{name}' (guardalo, no se vuelve a mostrar):\n{token}")
+
+
+@click.command("revoke-api-token")
+@click.argument("name")
+@with_appcontext
+def revoke_api_token_command(name):
+    """Revoca el token de API con ese nombre."""
+    db = get_db()
+    cur = db.execute(
+        """
+        UPDATE api_token SET revoked_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+        WHERE name = ? AND revoked_at IS NULL
+        """,
+        (name,),
+    )
+    db.commit()
+    click.echo("Token revocado." if cur.rowcount else "No hay un token activo con ese nombre.")
+
+
 # -----------------
 # Converters (opcional)
 # -----------------
@@ -107,20 +476,78 @@ sqlite3.register_converter("timestamp", lambda v: datetime.fromisoformat(v.decod
 
 
 def init_app(app):
+    app.before_request(_ensure_database)
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
     app.cli.add_command(create_admin_command)
+    app.cli.add_command(create_api_token_command)
+    app.cli.add_command(revoke_api_token_command)
+    app.cli.add_command(bootstrap_command)
+
+
+# ---------------------------------
+# Bootstrap (una sola vez por despliegue)
+# ---------------------------------
+_bootstrap_lock = threading.Lock()
+
+
+def _ensure_database():
+    """
+    Red de seguridad para `flask run` en un checkout nuevo: si en la primera
+    request la base no existe, hace el bootstrap. Después es solo mirar un
+    flag; con una base ya creada nunca migra (eso sigue siendo del bootstrap).
+    """
+    app = current_app._get_current_object()
+    if app.extensions.get("db_ready"):
+        return
+    with _bootstrap_lock:
+        if app.extensions.get("db_ready"):
+            return
+        if not os.path.exists(app.config["DATABASE"]):
+            app.logger.warning("No existe %s: se corre el bootstrap.", app.config["DATABASE"])
+            bootstrap(app)
+        app.extensions["db_ready"] = True
+
+
+def bootstrap(app):
+    """
+    Tareas de única vez antes de atender requests: crea la base si no
+    existe (o le aplica las migraciones pendientes) y el ADMIN por
+    defecto. Se corre desde `flask bootstrap`,
+    run.py o el hook `on_starting` de gunicorn (en el master), así los
+    workers arrancan sin tocar la base; con `flask run` sobre una base que
+    no existe lo hace la primera request (`_ensure_database`).
+    """
+    from flaskr.migrations import migrate
 
-    # 🚀 Inicialización automática en Render (Flask 3.x compatible)
     with app.app_context():
         db_path = app.config["DATABASE"]
         if not os.path.exists(db_path):
             try:
-                from flaskr.db import init_db
                 init_db()
-                print("🗄️ Base de datos inicializada automáticamente en Render (Flask 3.x).")
+                print("🗄️ Base de datos inicializada automáticamente.")
             except Exception as e:
                 print(f"⚠️ Error al inicializar la base de datos: {e}")
+        else:
+            for version in migrate(get_db()):
+                print(f"🗄️ Migración {version} aplicada.")
+        ensure_admin()
+
+    # Quien hace el bootstrap (p. ej. el master de gunicorn) no atiende
+    # requests: no se queda con conexiones abiertas que heredarían los workers.
+    for key in ("db_pool", "db_read_pool"):
+        pool = app.extensions.pop(key, None)
+        if pool is not None:
+            pool.close()
+
+
+@click.command("bootstrap")
+@with_appcontext
+def bootstrap_command():
+    """Crea o migra la base y el ADMIN por defecto. Correr antes de levantar workers."""
+    start = time.perf_counter()
+    bootstrap(current_app._get_current_object())
+    click.echo(f"Bootstrap listo en {(time.perf_counter() - start) * 1000:.0f} ms.")
 
 def ensure_admin():
     db = get_db()
@@ -132,7 +559,7 @@ def ensure_admin():
             INSERT INTO user (firstname, lastname, email, username, password_hash, role)
             VALUES (?, ?, ?, ?, ?, 'ADMIN');
             """,
-            ("Admin", "Root", admin_email, "admin", generate_password_hash("admin123")),
+            ("Admin", "Root", admin_email, "admin", hash_password("admin123")),
         )
         db.commit()
         print("✅ Admin creado por defecto: admin@example.com / admin123")
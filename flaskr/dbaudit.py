@@ -0,0 +1,154 @@
+# flaskr/dbaudit.py
+import io
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+
+from flaskr.bench import ENDPOINTS, make_client
+from flaskr.db import _connect_db, explain, get_read_db
+from flaskr.sales.checkout import SaleLine, parse_batch, register_sales, register_sales_batch
+from flaskr.stock.importer import import_products
+
+# Pasos del plan que indican trabajo proporcional al tamaño de la tabla
+# (un SCAN, aunque sea sobre un índice) o un ordenamiento/agrupado aparte.
+FLAGS = ("SCAN ", "USE TEMP B-TREE", "AUTOMATIC INDEX", "AUTOMATIC COVERING INDEX")
+
+# No son recorridos de tablas del usuario
+IGNORED = ("SCAN CONSTANT ROW", "VIRTUAL TABLE")
+
+# Consultas de transacción y PRAGMAs: no tienen plan que revisar
+SKIP_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA", "SELECT 1")
+
+
+def flagged_steps(plan):
+    return [step for step in plan
+            if any(f in step for f in FLAGS) and not any(i in step for i in IGNORED)]
+
+
+def _unique(captured):
+    seen, queries = set(), []
+    for sql, params in captured:
+        key = " ".join(sql.split())
+        if key in seen or key.upper().startswith(SKIP_PREFIXES):
+            continue
+        seen.add(key)
+        queries.append((key, params))
+    return queries
+
+
+def capture_queries(app, path, user_id):
+    """Sentencias (sql, params) que ejecuta la vista de `path`, en orden y sin repetir."""
+    g.sql_capture = captured = []
+    try:
+        make_client(app, user_id).get(path).close()
+    finally:
+        g.pop("sql_capture", None)
+    return _unique(captured)
+
+
+def write_paths(product, user_id):
+    """[(nombre, fn(db))] de las escrituras que audita db-audit, sobre `product`."""
+    def cart(db):
+        register_sales(db, [SaleLine(product["id"], 1, 1.0)], user_id)
+
+    def api_batch(db):
+        valid, results = parse_batch([{"idempotency_key": "db-audit", "product_id": product["id"],
+                                       "quantity": 1, "unit_price": 1}])
+        register_sales_batch(db, valid, user_id, results)
+
+    def import_csv(db):
+        sku = product["sku"] or "DB-AUDIT-1"
+        import_products(db, io.StringIO(
+            f"sku,name,sale_price,purchase_price\n{sku},Existente,1,1\nDB-AUDIT-2,Nuevo,1,1\n"
+        ))
+
+    return [("sales.cart", cart), ("sales.api_batch", api_batch), ("stock.import_products", import_csv)]
+
+
+def audit_write_paths(user_id, only=()):
+    """
+    Lo mismo que `audit_endpoints` para las escrituras (carrito, lote de la
+    API e importación), ejecutadas sobre una copia en memoria de la base:
+    los planes son los de los datos reales y la base no se modifica. Los
+    executemany (INSERT de ventas, upsert) no tienen plan que revisar, y
+    lo que corre dentro de los triggers no pasa por la captura.
+    """
+    source = get_read_db()
+    product = source.execute(
+        "SELECT id, sku FROM product WHERE current_stock > 0 ORDER BY id LIMIT 1"
+    ).fetchone()
+    if product is None:
+        return []
+
+    copy = _connect_db(":memory:")
+    try:
+        source.backup(copy)
+        results = []
+        for name, run in write_paths(product, user_id):
+            if only and name not in only:
+                continue
+            g.sql_capture = captured = []
+            try:
+                run(copy)
+            finally:
+                g.pop("sql_capture", None)
+            for sql, params in _unique(captured):
+                plan = explain(copy, sql, params) if params is not None else []
+                results.append((name, sql, plan, flagged_steps(plan)))
+        return results
+    finally:
+        copy.close()
+
+
+def audit_endpoints(app, endpoints, user_id):
+    """[(endpoint, sql, plan, pasos_marcados)] para cada consulta de cada endpoint."""
+    db = get_read_db()
+    results = []
+    for name, path in endpoints:
+        for sql, params in capture_queries(app, path, user_id):
+            plan = explain(db, sql, params) if params is not None else []
+            results.append((name, sql, plan, flagged_steps(plan)))
+    return results
+
+
+# -----------------
+# Comando de CLI
+# -----------------
+@click.command("db-audit")
+@click.option("--endpoint", "-e", "only", multiple=True, help="Auditar solo estos (nombre o ruta).")
+@click.option("--all", "show_all", is_flag=True, help="Mostrar también las consultas sin observaciones.")
+@click.option("--strict", is_flag=True, help="Salir con error si hay consultas marcadas (CI).")
+@with_appcontext
+def db_audit_command(only, show_all, strict):
+    """
+    Ejecuta los endpoints GET (los mismos que `flask bench`) y las
+    escrituras del carrito, el lote de la API y la importación (sobre una
+    copia en memoria), captura cada consulta y marca los planes con SCAN o
+    TEMP B-TREE. Correrlo sobre una base con volumen (`flask seed`) para
+    que los planes sean los reales.
+    """
+    app = current_app._get_current_object()
+    admin = get_read_db().execute(
+        "SELECT id FROM user WHERE role = 'ADMIN' AND status = 'ACTIVE' ORDER BY id LIMIT 1"
+    ).fetchone()
+    if admin is None:
+        raise click.ClickException("Se necesita un usuario ADMIN activo (flask create-admin).")
+
+    endpoints = [(n, p) for n, p in ENDPOINTS if not only or n in only or p in only]
+    endpoints += [(p, p) for p in only if p.startswith("/") and p not in dict(endpoints).values()]
+
+    results = audit_endpoints(app, endpoints, admin["id"])
+    results += audit_write_paths(admin["id"], only)
+    flagged = 0
+    for name, sql, plan, steps in results:
+        if not steps and not show_all:
+            continue
+        flagged += bool(steps)
+        click.echo(f"{'⚠️ ' if steps else '✅'} [{name}] {sql[:160]}")
+        for step in plan:
+            click.echo(f"      {'→ ' if step in steps else '  '}{step}")
+    audited = len({name for name, *_ in results})
+    click.echo(f"{len(results)} consultas en {audited} endpoints; {flagged} con SCAN/TEMP B-TREE.")
+    if strict and flagged:
+        raise SystemExit(1)
@@ -0,0 +1,177 @@
+# flaskr/export.py
+import csv
+import io
+import json
+from datetime import date
+
+import click
+from flask import Response, abort, current_app, request, stream_with_context
+from flask.cli import with_appcontext
+from flaskr.db import get_read_db
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# Consulta base, columna de fecha, columna de producto y orden de cada exportación
+EXPORTS = {
+    "sales": (
+        """
+        SELECT v.id, v.sale_date, v.product_id, p.name AS product_name,
+               v.quantity, v.unit_price, v.total_price, v.created_by
+        FROM sales v
+        JOIN product p ON v.product_id = p.id
+        """,
+        "v.sale_date", "v.product_id", ("v.sale_date", "v.id"),
+    ),
+    "shopping": (
+        """
+        SELECT s.id, s.purchase_date, s.product_id, p.name AS product_name,
+               s.quantity, s.unit_price, s.total_price, s.created_by
+        FROM shopping s
+        JOIN product p ON s.product_id = p.id
+        """,
+        "s.purchase_date", "s.product_id", ("s.purchase_date", "s.id"),
+    ),
+    "products": (
+        """
+        SELECT id, sku, name, category, current_stock, sale_price, purchase_price,
+               created_at, updated_at
+        FROM product
+        """,
+        "updated_at", "id", ("id",),
+    ),
+}
+
+
+# ---------------------------------
+# Generadores (memoria constante)
+# ---------------------------------
+def iter_rows(cursor, batch_size):
+    """Recorre el cursor de a `batch_size` filas con fetchmany."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def stream_csv(cursor, batch_size):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([col[0] for col in cursor.description])
+    yield buf.getvalue()
+
+    for rows in iter_rows(cursor, batch_size):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue()
+
+
+def stream_jsonl(cursor, batch_size):
+    columns = [col[0] for col in cursor.description]
+    for rows in iter_rows(cursor, batch_size):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        )
+
+
+def build_query(kind, date_from=None, date_to=None, product_id=None):
+    """Arma (sql, params) para la exportación `kind` con los filtros dados."""
+    sql, date_col, product_col, order_by = EXPORTS[kind]
+    conditions, params = [], []
+    if date_from is not None:
+        conditions.append(f"{date_col} >= ?")
+        params.append(date_from.isoformat())
+    if date_to is not None:
+        # `to` es inclusivo: todo lo anterior al día siguiente
+        conditions.append(f"{date_col} < date(?, '+1 day')")
+        params.append(date_to.isoformat())
+    if product_id is not None:
+        conditions.append(f"{product_col} = ?")
+        params.append(product_id)
+
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(order_by)
+    return sql, params
+
+
+def generate(db, kind, fmt, batch_size, **filters):
+    """Ejecuta la consulta y devuelve el generador de texto del formato pedido."""
+    sql, params = build_query(kind, **filters)
+    cursor = db.execute(sql, params)
+    writer = stream_csv if fmt == "csv" else stream_jsonl
+    return writer(cursor, batch_size)
+
+
+# ---------------------------------
+# Endpoint HTTP (lo usan los blueprints)
+# ---------------------------------
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"Fecha inválida: {value!r} (usar AAAA-MM-DD).")
+
+
+def export_response(kind):
+    """
+    Respuesta en streaming para `?format=csv|jsonl&from=&to=&product_id=`.
+    Los bytes empiezan a salir con el primer lote, sin cargar la tabla.
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        abort(400, description="Formato inválido (csv o jsonl).")
+
+    filters = {
+        "date_from": _parse_date(request.args.get("from")),
+        "date_to": _parse_date(request.args.get("to")),
+        "product_id": request.args.get("product_id", type=int),
+    }
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+
+    def body():
+        yield from generate(get_read_db(), kind, fmt, batch_size, **filters)
+
+    return Response(
+        stream_with_context(body()),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+    )
+
+
+# -----------------
+# Comandos de CLI
+# -----------------
+@click.command("export")
+@click.argument("kind", type=click.Choice(sorted(EXPORTS)))
+@click.option("--format", "fmt", type=click.Choice(sorted(FORMATS)), default="csv")
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--product-id", type=int, default=None)
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default=None,
+              help="Archivo destino (por defecto, stdout).")
+@with_appcontext
+def export_command(kind, fmt, date_from, date_to, product_id, output):
+    """Exporta ventas, compras o productos en CSV/JSONL (streaming)."""
+    chunks = generate(
+        get_read_db(), kind, fmt, current_app.config["EXPORT_BATCH_SIZE"],
+        date_from=date_from.date() if date_from else None,
+        date_to=date_to.date() if date_to else None,
+        product_id=product_id,
+    )
+    if output is None:
+        for chunk in chunks:
+            click.echo(chunk, nl=False)
+        return
+
+    with open(output, "w", encoding="utf8", newline="") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    click.echo(f"Exportación '{kind}' guardada en {output}.", err=True)
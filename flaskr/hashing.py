@@ -0,0 +1,177 @@
+# flaskr/hashing.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, flash, has_request_context, redirect, request
+from werkzeug.security import check_password_hash, generate_password_hash
+
+MODES = ("process", "thread", "inline")
+
+
+class HashingBusy(RuntimeError):
+    """No se consiguió un lugar en el executor dentro del timeout."""
+
+
+class PasswordHasher:
+    """
+    Executor acotado para el hashing de contraseñas (scrypt/pbkdf2).
+
+    El hash es caro a propósito; en un pico de logins no debe ocupar los
+    hilos del servidor que atienden ventas. Con `mode="process"` el cálculo
+    corre en un pool de procesos (fuera del GIL) y el hilo de la request
+    solo espera el resultado. Un semáforo limita los trabajos en vuelo a
+    `max_pending`; el resto espera su turno (la profundidad de esa cola se
+    ve en `stats()`) o recibe HashingBusy tras `timeout` segundos.
+    """
+
+    def __init__(self, mode="process", workers=None, max_pending=None, timeout=10.0):
+        if mode not in MODES:
+            raise ValueError(f"Modo de hashing inválido: {mode!r}")
+        self.mode = mode
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.max_pending = max_pending or self.workers * 2
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._canonical = {}
+
+        self._in_flight = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_ms = 0.0
+
+    def _get_executor(self):
+        # Se crea al primer uso y se recrea si el proceso fue forkeado
+        # (gunicorn --preload): un pool heredado no sirve en el hijo.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                if self.mode == "process":
+                    # Import diferido: multiprocessing encarece el arranque de cada worker
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    # spawn: forkear un proceso con hilos puede heredar locks tomados
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hashing",
+                    )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        """Ejecuta `fn(*args)` en el executor respetando el límite de concurrencia."""
+        if self.mode == "inline":
+            return fn(*args)
+
+        with self._lock:
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._rejected += 1
+        if not acquired:
+            raise HashingBusy("Executor de hashing saturado.")
+
+        start = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._total_ms += elapsed
+            self._slots.release()
+
+    def canonical_method(self, method):
+        """Prefijo que werkzeug escribe para `method` (p. ej. 'scrypt:32768:8:1')."""
+        prefix = self._canonical.get(method)
+        if prefix is None:
+            prefix = self.run(generate_password_hash, "", method).split("$", 1)[0]
+            self._canonical[method] = prefix
+        return prefix
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "max_queue_depth": self._max_waiting,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_ms": round(self._total_ms / self._completed, 2) if self._completed else 0.0,
+            }
+
+
+# ---------------------------------
+# API usada por las vistas y la CLI
+# ---------------------------------
+def get_hasher(app=None) -> PasswordHasher:
+    app = app or current_app
+    hasher = app.extensions.get("hasher")
+    if hasher is None:
+        hasher = app.extensions.setdefault("hasher", PasswordHasher(
+            mode=app.config["HASH_EXECUTOR"],
+            workers=app.config["HASH_WORKERS"],
+            max_pending=app.config["HASH_MAX_PENDING"],
+            timeout=app.config["HASH_TIMEOUT"],
+        ))
+    return hasher
+
+
+def _run(fn, *args):
+    # Fuera de una request (CLI, arranque) no hay hilos que proteger:
+    # se calcula en el hilo actual sin levantar el pool.
+    if not has_request_context():
+        return fn(*args)
+    return get_hasher().run(fn, *args)
+
+
+def hash_password(password: str) -> str:
+    """Hash con el método configurado en PASSWORD_HASH_METHOD."""
+    return _run(generate_password_hash, password, current_app.config["PASSWORD_HASH_METHOD"])
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash: str) -> bool:
+    """True si el hash no usa el método/costo configurado actualmente."""
+    method = current_app.config["PASSWORD_HASH_METHOD"]
+    if has_request_context():
+        expected = get_hasher().canonical_method(method)
+    else:
+        expected = generate_password_hash("", method).split("$", 1)[0]
+    return pwhash.split("$", 1)[0] != expected
+
+
+def init_app(app):
+    @app.errorhandler(HashingBusy)
+    def handle_hashing_busy(e):
+        flash("El servidor está ocupado. Intentá de nuevo en unos segundos.", "warning")
+        return redirect(request.url)
@@ -0,0 +1,210 @@
+# flaskr/metrics.py
+import hmac
+import threading
+import time
+
+from flask import abort, current_app, g, request
+
+# Límites (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    Métricas por proceso de las requests, en formato de texto de Prometheus.
+
+    Por endpoint: histograma de latencia, requests por método y status, y
+    sentencias/tiempo de SQL (los cuenta TimedConnection en g.sql_stats).
+    Además, contadores de eventos sueltos (errores CSRF, 403). Con varios
+    workers de gunicorn cada uno expone los suyos: Prometheus los suma.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}    # (blueprint, endpoint) -> [conteo por bucket..., +Inf, suma]
+        self._requests = {}   # (endpoint, método, status) -> n
+        self._sql = {}        # endpoint -> [sentencias, segundos]
+        self._events = {}     # nombre -> n
+
+    def observe(self, blueprint, endpoint, method, status, seconds, sql_count, sql_seconds):
+        with self._lock:
+            hist = self._latency.get((blueprint, endpoint))
+            if hist is None:
+                hist = self._latency[(blueprint, endpoint)] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += seconds
+
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            sql = self._sql.setdefault(endpoint, [0, 0.0])
+            sql[0] += sql_count
+            sql[1] += sql_seconds
+
+    def inc(self, name):
+        with self._lock:
+            self._events[name] = self._events.get(name, 0) + 1
+
+    def render(self, gauges=()):
+        """Texto para /metrics; `gauges` son (nombre, ayuda, tipo, [(labels, valor)])."""
+        with self._lock:
+            latency = {k: list(v) for k, v in self._latency.items()}
+            requests = dict(self._requests)
+            sql = {k: list(v) for k, v in self._sql.items()}
+            events = dict(self._events)
+
+        out = []
+
+        def header(name, help_text, kind):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        header("flask_request_duration_seconds", "Latencia de las requests por endpoint.", "histogram")
+        for (blueprint, endpoint), hist in sorted(latency.items()):
+            labels = {"blueprint": blueprint, "endpoint": endpoint}
+            for bound, count in zip(self.buckets, hist):
+                out.append(_sample("flask_request_duration_seconds_bucket", dict(labels, le=repr(bound)), count))
+            out.append(_sample("flask_request_duration_seconds_bucket", dict(labels, le="+Inf"), hist[-2]))
+            out.append(_sample("flask_request_duration_seconds_count", labels, hist[-2]))
+            out.append(_sample("flask_request_duration_seconds_sum", labels, hist[-1]))
+
+        header("flask_requests_total", "Requests por endpoint, método y status.", "counter")
+        for (endpoint, method, status), n in sorted(requests.items()):
+            out.append(_sample("flask_requests_total",
+                               {"endpoint": endpoint, "method": method, "status": status}, n))
+
+        header("flask_sql_statements_total", "Sentencias SQL ejecutadas por endpoint.", "counter")
+        for endpoint, (count, _) in sorted(sql.items()):
+            out.append(_sample("flask_sql_statements_total", {"endpoint": endpoint}, count))
+        header("flask_sql_seconds_total", "Tiempo en SQL por endpoint.", "counter")
+        for endpoint, (_, seconds) in sorted(sql.items()):
+            out.append(_sample("flask_sql_seconds_total", {"endpoint": endpoint}, seconds))
+
+        header("flask_events_total", "Eventos (csrf_error, forbidden).", "counter")
+        for name, n in sorted(events.items()):
+            out.append(_sample("flask_events_total", {"event": name}, n))
+
+        for name, help_text, kind, samples in gauges:
+            header(name, help_text, kind)
+            for labels, value in samples:
+                out.append(_sample(name, labels, value))
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name, labels, value):
+    if labels:
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return f"{name}{{{body}}} {value}"
+    return f"{name} {value}"
+
+
+def get_metrics(app=None) -> Metrics:
+    app = app or current_app
+    return app.extensions.setdefault("metrics", Metrics())
+
+
+def count_event(name):
+    """Suma un evento (p. ej. 'csrf_error') si las métricas están activas."""
+    if current_app.config["METRICS_ENABLED"]:
+        get_metrics().inc(name)
+
+
+# ---------------------------------
+# Estado de pools y colas (se lee al momento del scrape)
+# ---------------------------------
+def _gauges(app):
+    from flaskr.db import pool_stats
+
+    pools = pool_stats(app)
+    gauges = [
+        ("db_pool_connections", "Conexiones del pool por estado.", "gauge",
+         [({"pool": name, "state": state}, p[state])
+          for name, p in pools.items() for state in ("in_use", "idle")]),
+        ("db_pool_waits_total", "Veces que se esperó una conexión libre.", "counter",
+         [({"pool": name}, p["waits"]) for name, p in pools.items()]),
+        ("db_pool_timeouts_total", "Esperas que terminaron en PoolTimeout.", "counter",
+         [({"pool": name}, p["timeouts"]) for name, p in pools.items()]),
+    ]
+
+    # Solo si ya existen en este proceso: el scrape no los crea
+    hasher = app.extensions.get("hasher")
+    if hasher is not None:
+        h = hasher.stats()
+        gauges.append(("password_hash_jobs", "Trabajos de hashing en curso y en cola.", "gauge",
+                       [({"state": "in_flight"}, h["in_flight"]),
+                        ({"state": "queued"}, h["queue_depth"])]))
+        gauges.append(("password_hash_rejected_total", "Hashings rechazados por saturación.", "counter",
+                       [({}, h["rejected"])]))
+
+    write_queue = app.extensions.get("write_queue")
+    if write_queue is not None:
+        w = write_queue.stats()
+        gauges.append(("write_queue_queued", "Escrituras esperando al hilo escritor.", "gauge",
+                       [({}, w["queued"])]))
+        gauges.append(("write_queue_avg_batch", "Operaciones promedio por commit.", "gauge",
+                       [({}, w["avg_batch"])]))
+    return gauges
+
+
+# ---------------------------------
+# Middleware y endpoint
+# ---------------------------------
+def _scrape_allowed():
+    # La IP de origen no sirve: detrás de un proxy local todo llega desde 127.0.0.1
+    user = getattr(g, "user", None)
+    if user is not None and user.get("role") == "ADMIN":
+        return True
+    token = current_app.config["METRICS_TOKEN"]
+    scheme, _, given = (request.headers.get("Authorization") or "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and hmac.compare_digest(given.strip(), token)
+
+
+def metrics_view():
+    """Métricas en formato Prometheus (sesión ADMIN o `Authorization: Bearer METRICS_TOKEN`)."""
+    if not _scrape_allowed():
+        abort(403)
+    app = current_app._get_current_object()
+    return current_app.response_class(
+        get_metrics(app).render(_gauges(app)),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+
+def init_app(app):
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    metrics = get_metrics(app)
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=metrics_view)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_stats = [0, 0.0]
+
+    # En las respuestas en streaming se mide hasta los headers, no el cuerpo
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            sql_count, sql_seconds = g.get("sql_stats") or (0, 0.0)
+            metrics.observe(
+                request.blueprint or "app",
+                request.endpoint or "<sin ruta>",
+                request.method,
+                str(response.status_code),
+                time.perf_counter() - started,
+                sql_count,
+                sql_seconds,
+            )
+            if response.status_code == 403:
+                metrics.inc("forbidden")
+        return response
@@ -0,0 +1,690 @@
+# flaskr/migrations.py
+import click
+from flask.cli import with_appcontext
+
+from flaskr.db import get_db
+
+# Migraciones incrementales sobre schema.sql (versión 0, el esquema original),
+# en orden: (versión, descripción, SQL). La versión aplicada se guarda en
+# PRAGMA user_version. Las que crean tablas nuevas también cargan el historial
+# existente. Nunca editar una migración ya publicada: agregar una nueva con el
+# número siguiente.
+MIGRATIONS = (
+    (1, "sku de productos, idempotency_key de ventas e índice por updated_at", """
+        -- Columnas agregadas con ALTER: SQLite no acepta UNIQUE en ADD COLUMN,
+        -- la unicidad va en un índice (sirve igual para ON CONFLICT(sku)).
+        ALTER TABLE product ADD COLUMN sku TEXT;   -- código del proveedor (clave de importación)
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_product_sku ON product(sku);
+        ALTER TABLE sales ADD COLUMN idempotency_key TEXT;   -- enviada por las cajas (API de lotes)
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_idempotency_key ON sales(idempotency_key);
+        -- Feed de cambios del catálogo (GET /stock/changes)
+        CREATE INDEX IF NOT EXISTS idx_product_updated_at ON product(updated_at);
+    """),
+    (2, "Rollups diarios y ranking de más vendidos", """
+        -- Totales por día (UTC, 'YYYY-MM-DD') y producto, mantenidos por triggers
+        -- para que el dashboard lea unas pocas filas en lugar de escanear el
+        -- historial. Sin FK: al borrar un producto, el CASCADE sobre sales/shopping
+        -- dispara los triggers de borrado que descuentan y limpian sus filas.
+        -- Se reconstruyen con `flask backfill-rollups`.
+
+        CREATE TABLE sales_daily (
+          day          TEXT NOT NULL,
+          product_id   INTEGER NOT NULL,
+          quantity     INTEGER NOT NULL DEFAULT 0,
+          total        REAL NOT NULL DEFAULT 0,
+          sales_count  INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, product_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE shopping_daily (
+          day             TEXT NOT NULL,
+          product_id      INTEGER NOT NULL,
+          quantity        INTEGER NOT NULL DEFAULT 0,
+          total           REAL NOT NULL DEFAULT 0,
+          purchase_count  INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, product_id)
+        ) WITHOUT ROWID;
+
+        -- Historial previo a la migración
+        INSERT INTO sales_daily (day, product_id, quantity, total, sales_count)
+        SELECT substr(sale_date, 1, 10), product_id, SUM(quantity), SUM(total_price), COUNT(*)
+        FROM sales
+        GROUP BY substr(sale_date, 1, 10), product_id;
+
+        INSERT INTO shopping_daily (day, product_id, quantity, total, purchase_count)
+        SELECT substr(purchase_date, 1, 10), product_id, SUM(quantity), SUM(total_price), COUNT(*)
+        FROM shopping
+        GROUP BY substr(purchase_date, 1, 10), product_id;
+
+        -- 🔁 Trigger: sumar la venta al rollup diario
+        CREATE TRIGGER IF NOT EXISTS trg_sales_daily_after_insert
+        AFTER INSERT ON sales
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO sales_daily (day, product_id, quantity, total, sales_count)
+          VALUES (substr(NEW.sale_date, 1, 10), NEW.product_id, NEW.quantity, NEW.total_price, 1)
+          ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total = total + excluded.total,
+            sales_count = sales_count + 1;
+        END;
+
+        -- 🔁 Trigger: descontar la venta eliminada del rollup diario
+        CREATE TRIGGER IF NOT EXISTS trg_sales_daily_after_delete
+        AFTER DELETE ON sales
+        FOR EACH ROW
+        BEGIN
+          UPDATE sales_daily
+             SET quantity = quantity - OLD.quantity,
+                 total = total - OLD.total_price,
+                 sales_count = sales_count - 1
+           WHERE day = substr(OLD.sale_date, 1, 10) AND product_id = OLD.product_id;
+          DELETE FROM sales_daily
+           WHERE day = substr(OLD.sale_date, 1, 10) AND product_id = OLD.product_id
+             AND sales_count <= 0;
+        END;
+
+        -- 🔁 Trigger: sumar la compra al rollup diario
+        CREATE TRIGGER IF NOT EXISTS trg_shopping_daily_after_insert
+        AFTER INSERT ON shopping
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO shopping_daily (day, product_id, quantity, total, purchase_count)
+          VALUES (substr(NEW.purchase_date, 1, 10), NEW.product_id, NEW.quantity, NEW.total_price, 1)
+          ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total = total + excluded.total,
+            purchase_count = purchase_count + 1;
+        END;
+
+        -- 🔁 Trigger: descontar la compra eliminada del rollup diario
+        CREATE TRIGGER IF NOT EXISTS trg_shopping_daily_after_delete
+        AFTER DELETE ON shopping
+        FOR EACH ROW
+        BEGIN
+          UPDATE shopping_daily
+             SET quantity = quantity - OLD.quantity,
+                 total = total - OLD.total_price,
+                 purchase_count = purchase_count - 1
+           WHERE day = substr(OLD.purchase_date, 1, 10) AND product_id = OLD.product_id;
+          DELETE FROM shopping_daily
+           WHERE day = substr(OLD.purchase_date, 1, 10) AND product_id = OLD.product_id
+             AND purchase_count <= 0;
+        END;
+
+        -- Acumulado histórico por producto. La categoría se copia del producto
+        -- (y se sincroniza al editarla) para que el ranking por categoría también
+        -- se resuelva recorriendo un índice y cortando en LIMIT.
+
+        CREATE TABLE product_sales_total (
+          product_id      INTEGER PRIMARY KEY,
+          category        TEXT,
+          total_quantity  INTEGER NOT NULL DEFAULT 0,
+          total_amount    REAL NOT NULL DEFAULT 0,
+          FOREIGN KEY (product_id) REFERENCES product(id) ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_product_sales_total_quantity
+          ON product_sales_total(total_quantity DESC);
+        CREATE INDEX IF NOT EXISTS idx_product_sales_total_category
+          ON product_sales_total(category, total_quantity DESC);
+
+        INSERT INTO product_sales_total (product_id, category, total_quantity, total_amount)
+        SELECT s.product_id, p.category, SUM(s.quantity), SUM(s.total_price)
+        FROM sales s
+        JOIN product p ON p.id = s.product_id
+        GROUP BY s.product_id;
+
+        -- 🏆 Trigger: sumar la venta al acumulado del producto
+        CREATE TRIGGER IF NOT EXISTS trg_product_sales_total_after_insert
+        AFTER INSERT ON sales
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO product_sales_total (product_id, category, total_quantity, total_amount)
+          VALUES (NEW.product_id,
+                  (SELECT category FROM product WHERE id = NEW.product_id),
+                  NEW.quantity, NEW.total_price)
+          ON CONFLICT(product_id) DO UPDATE SET
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_amount = total_amount + excluded.total_amount;
+        END;
+
+        -- 🏆 Trigger: descontar la venta eliminada del acumulado
+        CREATE TRIGGER IF NOT EXISTS trg_product_sales_total_after_delete
+        AFTER DELETE ON sales
+        FOR EACH ROW
+        BEGIN
+          UPDATE product_sales_total
+             SET total_quantity = total_quantity - OLD.quantity,
+                 total_amount = total_amount - OLD.total_price
+           WHERE product_id = OLD.product_id;
+          DELETE FROM product_sales_total
+           WHERE product_id = OLD.product_id AND total_quantity <= 0;
+        END;
+
+        -- 🏆 Trigger: mantener la categoría copiada al editar el producto
+        CREATE TRIGGER IF NOT EXISTS trg_product_sales_total_category
+        AFTER UPDATE OF category ON product
+        FOR EACH ROW
+        WHEN NEW.category IS NOT OLD.category
+        BEGIN
+          UPDATE product_sales_total
+             SET category = NEW.category
+           WHERE product_id = NEW.id;
+        END;
+    """),
+    (3, "Versiones para los caches en memoria (cache_version)", """
+        -- Cada proceso compara la versión guardada acá con la de su cache y sólo
+        -- recarga cuando cambió. 'catalog' cubre los datos del catálogo (no el
+        -- stock, que cambia con cada venta).
+
+        CREATE TABLE cache_version (
+          name     TEXT PRIMARY KEY,
+          version  INTEGER NOT NULL DEFAULT 0
+        );
+
+        INSERT INTO cache_version (name, version) VALUES ('catalog', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_version_insert
+        AFTER INSERT ON product
+        FOR EACH ROW
+        BEGIN
+          UPDATE cache_version SET version = version + 1 WHERE name = 'catalog';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_version_update
+        AFTER UPDATE OF sku, name, category, sale_price, purchase_price ON product
+        FOR EACH ROW
+        WHEN NEW.sku IS NOT OLD.sku OR NEW.name IS NOT OLD.name
+          OR NEW.category IS NOT OLD.category OR NEW.sale_price IS NOT OLD.sale_price
+          OR NEW.purchase_price IS NOT OLD.purchase_price
+        BEGIN
+          UPDATE cache_version SET version = version + 1 WHERE name = 'catalog';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_version_delete
+        AFTER DELETE ON product
+        FOR EACH ROW
+        BEGIN
+          UPDATE cache_version SET version = version + 1 WHERE name = 'catalog';
+        END;
+    """),
+    (4, "Búsqueda de productos (FTS5)", """
+        -- Índice de texto completo con contenido externo (las filas viven en
+        -- product; acá sólo el índice). Lo sincronizan los triggers de abajo.
+        -- `prefix` precalcula prefijos cortos para el autocompletado.
+
+        CREATE VIRTUAL TABLE product_fts USING fts5(
+          name, category, sku,
+          content = 'product',
+          content_rowid = 'id',
+          tokenize = 'unicode61 remove_diacritics 2',
+          prefix = '2 3'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_product_fts_insert
+        AFTER INSERT ON product
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO product_fts (rowid, name, category, sku)
+          VALUES (NEW.id, NEW.name, NEW.category, NEW.sku);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_product_fts_delete
+        AFTER DELETE ON product
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO product_fts (product_fts, rowid, name, category, sku)
+          VALUES ('delete', OLD.id, OLD.name, OLD.category, OLD.sku);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_product_fts_update
+        AFTER UPDATE OF name, category, sku ON product
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO product_fts (product_fts, rowid, name, category, sku)
+          VALUES ('delete', OLD.id, OLD.name, OLD.category, OLD.sku);
+          INSERT INTO product_fts (rowid, name, category, sku)
+          VALUES (NEW.id, NEW.name, NEW.category, NEW.sku);
+        END;
+
+        -- Indexa los productos existentes
+        INSERT INTO product_fts (product_fts) VALUES ('rebuild');
+    """),
+    (5, "Tokens de API y tombstones del feed de cambios", """
+        -- Sólo se guarda el SHA-256 del token; el valor en claro se muestra una
+        -- única vez al crearlo (`flask create-api-token`).
+
+        CREATE TABLE api_token (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          name        TEXT NOT NULL UNIQUE,
+          token_hash  TEXT NOT NULL UNIQUE,
+          user_id     INTEGER NOT NULL,
+          created_at  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+          revoked_at  TEXT,
+          FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE
+        );
+
+        -- Los productos modificados se leen por (updated_at, id) con
+        -- idx_product_updated_at; los borrados quedan registrados acá para que los
+        -- clientes que replican el catálogo (cajas, visores de precios) también
+        -- los reciban en GET /stock/changes.
+
+        CREATE TABLE product_tombstone (
+          product_id  INTEGER PRIMARY KEY,
+          deleted_at  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now'))
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_product_tombstone_deleted_at
+          ON product_tombstone(deleted_at);
+
+        CREATE TRIGGER IF NOT EXISTS trg_product_tombstone
+        AFTER DELETE ON product
+        FOR EACH ROW
+        BEGIN
+          INSERT OR REPLACE INTO product_tombstone (product_id) VALUES (OLD.id);
+        END;
+    """),
+    (6, "Bandeja de salida de mails", """
+        -- Las vistas solo encolan; el worker de flaskr/outbox.py envía por una
+        -- conexión SMTP compartida, reintenta con backoff y deja en DEAD los que
+        -- agotan MAIL_OUTBOX_MAX_ATTEMPTS (ver `flask outbox-dead`).
+
+        CREATE TABLE mail_outbox (
+          id               INTEGER PRIMARY KEY AUTOINCREMENT,
+          recipients       TEXT NOT NULL,            -- lista JSON
+          subject          TEXT NOT NULL,
+          body             TEXT NOT NULL,
+          status           TEXT NOT NULL DEFAULT 'PENDING'
+                           CHECK (status IN ('PENDING','SENDING','SENT','DEAD')),
+          attempts         INTEGER NOT NULL DEFAULT 0,
+          next_attempt_at  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+          last_error       TEXT,
+          created_at       TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+          sent_at          TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_mail_outbox_due
+          ON mail_outbox(status, next_attempt_at);
+    """),
+    (7, "Ledger de stock, snapshots y conciliación", """
+        -- Registro append-only de cada cambio de stock, con signo (+ entra,
+        -- - sale) y fecha del hecho (sale_date / purchase_date). Lo escriben los
+        -- triggers de abajo; sin FK para que el historial sobreviva al producto.
+        -- Un ADJUSTMENT (ajuste manual) se inserta acá y su trigger actualiza
+        -- product.current_stock. Se reconstruye con `flask backfill-ledger`.
+
+        CREATE TABLE stock_movement (
+          id          INTEGER PRIMARY KEY AUTOINCREMENT,
+          product_id  INTEGER NOT NULL,
+          kind        TEXT NOT NULL
+                      CHECK (kind IN ('INITIAL','PURCHASE','SALE','SALE_REVERSAL','ADJUSTMENT')),
+          quantity    INTEGER NOT NULL CHECK (quantity <> 0),
+          ref_id      INTEGER,                    -- id en shopping / sales
+          moved_at    TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+          note        TEXT
+        );
+
+        -- Stock a una fecha = snapshot + suma de un tramo corto de este índice
+        CREATE INDEX IF NOT EXISTS idx_stock_movement_product_time
+          ON stock_movement(product_id, moved_at, quantity);
+
+        -- Historial previo a la migración: compras, ventas y un INITIAL que cubre
+        -- la diferencia con current_stock (lo mismo que `flask backfill-ledger`)
+        INSERT INTO stock_movement (product_id, kind, quantity, moved_at)
+        SELECT p.id, 'INITIAL',
+               p.current_stock
+                 - COALESCE((SELECT SUM(quantity) FROM shopping WHERE product_id = p.id), 0)
+                 + COALESCE((SELECT SUM(quantity) FROM sales WHERE product_id = p.id), 0) AS qty,
+               p.created_at
+        FROM product p
+        WHERE qty <> 0;
+
+        INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+        SELECT product_id, 'PURCHASE', quantity, id, purchase_date FROM shopping;
+
+        INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+        SELECT product_id, 'SALE', -quantity, id, sale_date FROM sales;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_initial
+        AFTER INSERT ON product
+        FOR EACH ROW
+        WHEN NEW.current_stock <> 0
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, moved_at)
+          VALUES (NEW.id, 'INITIAL', NEW.current_stock, NEW.created_at);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_purchase
+        AFTER INSERT ON shopping
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+          VALUES (NEW.product_id, 'PURCHASE', NEW.quantity, NEW.id, NEW.purchase_date);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_sale
+        AFTER INSERT ON sales
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+          VALUES (NEW.product_id, 'SALE', -NEW.quantity, NEW.id, NEW.sale_date);
+        END;
+
+        -- Venta anulada (no cuando el borrado viene del CASCADE de un producto eliminado)
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_sale_reversal
+        AFTER DELETE ON sales
+        FOR EACH ROW
+        WHEN EXISTS (SELECT 1 FROM product WHERE id = OLD.product_id)
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id)
+          VALUES (OLD.product_id, 'SALE_REVERSAL', OLD.quantity, OLD.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_adjustment
+        AFTER INSERT ON stock_movement
+        FOR EACH ROW
+        WHEN NEW.kind = 'ADJUSTMENT'
+        BEGIN
+          UPDATE product
+          SET current_stock = current_stock + NEW.quantity,
+              updated_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+          WHERE id = NEW.product_id;
+        END;
+
+        -- Stock de cada producto a `taken_at` (suma del ledger hasta esa fecha).
+        -- Los toma `flask snapshot-stock` (solo para productos con movimientos
+        -- nuevos). Un movimiento con fecha anterior a un snapshot lo invalida.
+
+        CREATE TABLE stock_snapshot (
+          product_id  INTEGER NOT NULL,
+          taken_at    TEXT NOT NULL,
+          stock       INTEGER NOT NULL,
+          PRIMARY KEY (product_id, taken_at)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_snapshot_invalidate
+        AFTER INSERT ON stock_movement
+        FOR EACH ROW
+        WHEN EXISTS (SELECT 1 FROM stock_snapshot
+                     WHERE product_id = NEW.product_id AND taken_at >= NEW.moved_at)
+        BEGIN
+          DELETE FROM stock_snapshot
+          WHERE product_id = NEW.product_id AND taken_at >= NEW.moved_at;
+        END;
+
+        -- Marca de agua de la última corrida: las siguientes solo revisan los
+        -- productos con movimientos o cambios posteriores.
+
+        CREATE TABLE stock_reconcile_state (
+          id                INTEGER PRIMARY KEY CHECK (id = 1),
+          last_movement_id  INTEGER NOT NULL,
+          last_updated_at   TEXT NOT NULL,
+          last_run_at       TEXT NOT NULL
+        );
+
+        -- Diferencias abiertas entre current_stock y la suma del ledger
+        CREATE TABLE stock_discrepancy (
+          product_id     INTEGER PRIMARY KEY,
+          current_stock  INTEGER NOT NULL,
+          ledger_stock   INTEGER NOT NULL,
+          detected_at    TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now'))
+        );
+    """),
+    (8, "Índices (created_by, fecha) para los historiales por usuario", """
+        -- my_sales / my_purchases filtran por usuario y ordenan por fecha:
+        -- con el índice compuesto recorren solo las filas del usuario, en
+        -- orden y cortando en LIMIT (el rowid va incluido para el keyset).
+        CREATE INDEX IF NOT EXISTS idx_sales_created_by_date ON sales(created_by, sale_date);
+        CREATE INDEX IF NOT EXISTS idx_shopping_created_by_date ON shopping(created_by, purchase_date);
+        -- Los de una sola columna quedan cubiertos por el prefijo
+        DROP INDEX IF EXISTS idx_sales_created_by;
+        DROP INDEX IF EXISTS idx_shopping_created_by;
+    """),
+    (9, "Índices (product_id, quantity) para agregados por producto", """
+        -- SUM(quantity) por producto (ranking, rebuild del ledger y de los
+        -- rollups) se resuelve solo con el índice, sin leer la tabla.
+        CREATE INDEX IF NOT EXISTS idx_sales_product_quantity ON sales(product_id, quantity);
+        CREATE INDEX IF NOT EXISTS idx_shopping_product_quantity ON shopping(product_id, quantity);
+        DROP INDEX IF EXISTS idx_sales_product_id;
+        DROP INDEX IF EXISTS idx_shopping_product_id;
+    """),
+    (10, "Estadísticas del planificador", """
+        ANALYZE;
+    """),
+    (11, "Versión compartida del cache de usuarios", """
+        -- Cada worker guarda g.user en memoria junto con esta versión y lo
+        -- relee cuando cambió: un usuario suspendido o degradado en otro
+        -- proceso queda afuera en su próxima request, no al vencer el TTL.
+        INSERT OR IGNORE INTO cache_version (name, version) VALUES ('user', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_user_cache_version_update
+        AFTER UPDATE OF firstname, lastname, email, username, role, status ON user
+        FOR EACH ROW
+        WHEN NEW.firstname IS NOT OLD.firstname OR NEW.lastname IS NOT OLD.lastname
+          OR NEW.email IS NOT OLD.email OR NEW.username IS NOT OLD.username
+          OR NEW.role IS NOT OLD.role OR NEW.status IS NOT OLD.status
+        BEGIN
+          UPDATE cache_version SET version = version + 1 WHERE name = 'user';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_user_cache_version_delete
+        AFTER DELETE ON user
+        FOR EACH ROW
+        BEGIN
+          UPDATE cache_version SET version = version + 1 WHERE name = 'user';
+        END;
+    """),
+    (12, "Rollups diarios al modificar ventas y compras", """
+        -- Un UPDATE de producto, cantidad, precio o fecha descuenta la fila
+        -- vieja de su día y suma la nueva (que puede caer en otro día).
+        CREATE TRIGGER IF NOT EXISTS trg_sales_daily_after_update
+        AFTER UPDATE OF product_id, quantity, unit_price, sale_date ON sales
+        FOR EACH ROW
+        BEGIN
+          UPDATE sales_daily
+             SET quantity = quantity - OLD.quantity,
+                 total = total - OLD.total_price,
+                 sales_count = sales_count - 1
+           WHERE day = substr(OLD.sale_date, 1, 10) AND product_id = OLD.product_id;
+          DELETE FROM sales_daily
+           WHERE day = substr(OLD.sale_date, 1, 10) AND product_id = OLD.product_id
+             AND sales_count <= 0;
+          INSERT INTO sales_daily (day, product_id, quantity, total, sales_count)
+          VALUES (substr(NEW.sale_date, 1, 10), NEW.product_id, NEW.quantity, NEW.total_price, 1)
+          ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total = total + excluded.total,
+            sales_count = sales_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_shopping_daily_after_update
+        AFTER UPDATE OF product_id, quantity, unit_price, purchase_date ON shopping
+        FOR EACH ROW
+        BEGIN
+          UPDATE shopping_daily
+             SET quantity = quantity - OLD.quantity,
+                 total = total - OLD.total_price,
+                 purchase_count = purchase_count - 1
+           WHERE day = substr(OLD.purchase_date, 1, 10) AND product_id = OLD.product_id;
+          DELETE FROM shopping_daily
+           WHERE day = substr(OLD.purchase_date, 1, 10) AND product_id = OLD.product_id
+             AND purchase_count <= 0;
+          INSERT INTO shopping_daily (day, product_id, quantity, total, purchase_count)
+          VALUES (substr(NEW.purchase_date, 1, 10), NEW.product_id, NEW.quantity, NEW.total_price, 1)
+          ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            total = total + excluded.total,
+            purchase_count = purchase_count + 1;
+        END;
+    """),
+    (13, "Ranking de más vendidos al modificar ventas", """
+        CREATE TRIGGER IF NOT EXISTS trg_product_sales_total_after_update
+        AFTER UPDATE OF product_id, quantity, unit_price ON sales
+        FOR EACH ROW
+        BEGIN
+          UPDATE product_sales_total
+             SET total_quantity = total_quantity - OLD.quantity,
+                 total_amount = total_amount - OLD.total_price
+           WHERE product_id = OLD.product_id;
+          DELETE FROM product_sales_total
+           WHERE product_id = OLD.product_id AND total_quantity <= 0;
+          INSERT INTO product_sales_total (product_id, category, total_quantity, total_amount)
+          VALUES (NEW.product_id,
+                  (SELECT category FROM product WHERE id = NEW.product_id),
+                  NEW.quantity, NEW.total_price)
+          ON CONFLICT(product_id) DO UPDATE SET
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_amount = total_amount + excluded.total_amount;
+        END;
+    """),
+    (14, "idempotency_key única por usuario", """
+        -- La clave la genera cada caja: dos cajas (tokens de usuarios
+        -- distintos) pueden repetirla sin pisarse las ventas.
+        DROP INDEX IF EXISTS idx_sales_idempotency_key;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_user_idempotency_key
+          ON sales(created_by, idempotency_key);
+    """),
+    (15, "Stock y ledger al modificar ventas y compras", """
+        -- Hasta acá solo INSERT y DELETE movían el stock: editar producto o
+        -- cantidad dejaba current_stock y el ledger con el valor viejo. Se
+        -- devuelve lo de la fila vieja y se aplica la nueva (el CHECK de
+        -- current_stock >= 0 rechaza la edición si no alcanza el stock).
+        CREATE TRIGGER IF NOT EXISTS trg_sales_stock_after_update
+        AFTER UPDATE OF product_id, quantity ON sales
+        FOR EACH ROW
+        BEGIN
+          UPDATE product
+          SET current_stock = current_stock + OLD.quantity,
+              updated_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+          WHERE id = OLD.product_id;
+          UPDATE product
+          SET current_stock = current_stock - NEW.quantity,
+              updated_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+          WHERE id = NEW.product_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_shopping_stock_after_update
+        AFTER UPDATE OF product_id, quantity ON shopping
+        FOR EACH ROW
+        BEGIN
+          UPDATE product
+          SET current_stock = current_stock - OLD.quantity,
+              updated_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+          WHERE id = OLD.product_id;
+          UPDATE product
+          SET current_stock = current_stock + NEW.quantity,
+              updated_at = strftime('%Y-%m-%dT%H:%M:%fZ','now')
+          WHERE id = NEW.product_id;
+        END;
+
+        -- En el ledger: un movimiento que revierte la fila vieja y otro con la
+        -- nueva, cada uno en la fecha del hecho (así stock_at queda igual que
+        -- si la venta/compra se hubiera cargado bien; los snapshots afectados
+        -- se invalidan solos). La compra no tiene un kind de reversión: va
+        -- como PURCHASE negativo.
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_sale_update
+        AFTER UPDATE OF product_id, quantity, sale_date ON sales
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at, note)
+          VALUES (OLD.product_id, 'SALE_REVERSAL', OLD.quantity, OLD.id, OLD.sale_date, 'edición');
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at, note)
+          VALUES (NEW.product_id, 'SALE', -NEW.quantity, NEW.id, NEW.sale_date, 'edición');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stock_movement_purchase_update
+        AFTER UPDATE OF product_id, quantity, purchase_date ON shopping
+        FOR EACH ROW
+        BEGIN
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at, note)
+          VALUES (OLD.product_id, 'PURCHASE', -OLD.quantity, OLD.id, OLD.purchase_date, 'edición');
+          INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at, note)
+          VALUES (NEW.product_id, 'PURCHASE', NEW.quantity, NEW.id, NEW.purchase_date, 'edición');
+        END;
+    """),
+    (16, "Versión del cache de usuarios por usuario", """
+        -- Reemplaza la versión compartida 'user' (11): con una sola versión,
+        -- cualquier cambio de un usuario vaciaba el cache de todos en todos
+        -- los workers. Ahora cada fila lleva la suya.
+        DROP TRIGGER IF EXISTS trg_user_cache_version_update;
+        DROP TRIGGER IF EXISTS trg_user_cache_version_delete;
+        DELETE FROM cache_version WHERE name = 'user';
+
+        ALTER TABLE user ADD COLUMN cache_version INTEGER NOT NULL DEFAULT 0;
+
+        CREATE TRIGGER IF NOT EXISTS trg_user_cache_version
+        AFTER UPDATE OF firstname, lastname, email, username, role, status ON user
+        FOR EACH ROW
+        WHEN NEW.firstname IS NOT OLD.firstname OR NEW.lastname IS NOT OLD.lastname
+          OR NEW.email IS NOT OLD.email OR NEW.username IS NOT OLD.username
+          OR NEW.role IS NOT OLD.role OR NEW.status IS NOT OLD.status
+        BEGIN
+          UPDATE user SET cache_version = cache_version + 1 WHERE id = NEW.id;
+        END;
+    """),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+class MigrationError(RuntimeError):
+    """La base está en una versión que este código no conoce."""
+
+
+def schema_version(db) -> int:
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(db):
+    current = schema_version(db)
+    if current > LATEST_VERSION:
+        raise MigrationError(
+            f"La base está en la versión {current} y el código solo conoce hasta la {LATEST_VERSION}."
+        )
+    return [m for m in MIGRATIONS if m[0] > current]
+
+
+def migrate(db, echo=None):
+    """
+    Aplica las migraciones pendientes, cada una en su propia transacción
+    junto con el cambio de user_version: si una falla, la base queda en la
+    versión anterior y sin cambios a medias. Devuelve las versiones aplicadas.
+    """
+    applied = []
+    for version, description, sql in pending_migrations(db):
+        if echo:
+            echo(f"→ {version}: {description}")
+        try:
+            db.executescript(f"BEGIN;\n{sql}\nPRAGMA user_version = {int(version)};\nCOMMIT;")
+        except Exception:
+            if db.in_transaction:
+                db.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+# -----------------
+# Comando de CLI
+# -----------------
+@click.command("migrate")
+@click.option("--status", is_flag=True, help="Solo muestra la versión actual y lo pendiente.")
+@with_appcontext
+def migrate_command(status):
+    """Aplica las migraciones pendientes (versión en PRAGMA user_version)."""
+    db = get_db()
+    try:
+        pending = pending_migrations(db)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    if status:
+        click.echo(f"Versión actual: {schema_version(db)} (última: {LATEST_VERSION})")
+        for version, description, _ in pending:
+            click.echo(f"  pendiente {version}: {description}")
+        return
+    applied = migrate(db, echo=click.echo)
+    if applied:
+        click.echo(f"Base migrada a la versión {schema_version(db)}.")
+    else:
+        click.echo(f"Sin migraciones pendientes (versión {schema_version(db)}).")
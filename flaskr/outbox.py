@@ -0,0 +1,301 @@
+# flaskr/outbox.py
+import json
+import os
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_mail import Message
+
+from flaskr import mail
+from flaskr.db import get_db
+
+NOW = "strftime('%Y-%m-%dT%H:%M:%fZ','now')"
+
+# Mensajes listos para enviar: pendientes vencidos o reclamados por un
+# worker que no terminó dentro del lease (proceso caído).
+DUE_SQL = f"""
+    SELECT id FROM mail_outbox
+    WHERE status IN ('PENDING', 'SENDING') AND next_attempt_at <= {NOW}
+    ORDER BY next_attempt_at
+    LIMIT ?
+"""
+
+
+# ---------------------------------
+# Encolado (lo usan las vistas)
+# ---------------------------------
+def enqueue_mail(db, recipients, subject, body):
+    """
+    Agrega un mail a la bandeja de salida. No hace commit: el mail queda
+    en la misma transacción que el cambio que lo origina.
+    """
+    cur = db.execute(
+        "INSERT INTO mail_outbox (recipients, subject, body) VALUES (?, ?, ?)",
+        (json.dumps(list(recipients)), subject, body),
+    )
+    return cur.lastrowid
+
+
+# ---------------------------------
+# Envío
+# ---------------------------------
+def _claim(db, limit, lease):
+    """Reserva hasta `limit` mensajes vencidos por `lease` segundos."""
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        ids = [row[0] for row in db.execute(DUE_SQL, (limit,))]
+        if ids:
+            marks = ", ".join("?" for _ in ids)
+            db.execute(
+                f"""
+                UPDATE mail_outbox
+                SET status = 'SENDING',
+                    next_attempt_at = strftime('%Y-%m-%dT%H:%M:%fZ','now', ?)
+                WHERE id IN ({marks})
+                """,
+                (f"+{lease} seconds", *ids),
+            )
+            rows = db.execute(
+                f"SELECT * FROM mail_outbox WHERE id IN ({marks}) ORDER BY id", ids
+            ).fetchall()
+        else:
+            rows = []
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return rows
+
+
+def _mark_sent(db, msg_id):
+    db.execute(
+        f"UPDATE mail_outbox SET status = 'SENT', sent_at = {NOW}, last_error = NULL WHERE id = ?",
+        (msg_id,),
+    )
+
+
+def _mark_failed(db, row, error, max_attempts, backoff):
+    attempts = row["attempts"] + 1
+    if attempts >= max_attempts:
+        db.execute(
+            "UPDATE mail_outbox SET status = 'DEAD', attempts = ?, last_error = ? WHERE id = ?",
+            (attempts, error, row["id"]),
+        )
+        return
+    # Backoff exponencial: backoff, 2·backoff, 4·backoff... (máx. 1 hora)
+    delay = min(backoff * 2 ** (attempts - 1), 3600)
+    db.execute(
+        """
+        UPDATE mail_outbox
+        SET status = 'PENDING', attempts = ?, last_error = ?,
+            next_attempt_at = strftime('%Y-%m-%dT%H:%M:%fZ','now', ?)
+        WHERE id = ?
+        """,
+        (attempts, error, f"+{delay} seconds", row["id"]),
+    )
+
+
+def _release(db, rows):
+    """Devuelve a la cola, sin contar intento, los mensajes que no se llegaron a probar."""
+    if rows:
+        marks = ", ".join("?" for _ in rows)
+        db.execute(
+            f"UPDATE mail_outbox SET status = 'PENDING', next_attempt_at = {NOW} WHERE id IN ({marks})",
+            [row["id"] for row in rows],
+        )
+
+
+def deliver_batch(db, mail, limit=50, max_attempts=6, backoff=30, lease=300):
+    """
+    Envía un lote de la bandeja por una sola conexión SMTP (`mail.connect()`).
+    Si la conexión falla, el mensaje en curso cuenta un intento y el resto
+    del lote vuelve a la cola para el próximo ciclo (con conexión nueva).
+    Devuelve (enviados, fallidos).
+    """
+    rows = _claim(db, limit, lease)
+    if not rows:
+        return 0, 0
+
+    sent = failed = 0
+    pending = list(rows)
+    try:
+        with mail.connect() as conn:
+            while pending:
+                row = pending[0]
+                msg = Message(
+                    subject=row["subject"],
+                    recipients=json.loads(row["recipients"]),
+                    body=row["body"],
+                )
+                try:
+                    conn.send(msg)
+                except Exception as e:
+                    pending.pop(0)
+                    _mark_failed(db, row, f"{type(e).__name__}: {e}", max_attempts, backoff)
+                    db.commit()
+                    failed += 1
+                    break
+                pending.pop(0)
+                _mark_sent(db, row["id"])
+                db.commit()
+                sent += 1
+    except Exception as e:
+        # No se pudo abrir (o cerrar) la conexión
+        if pending and sent + failed == 0:
+            row = pending.pop(0)
+            _mark_failed(db, row, f"{type(e).__name__}: {e}", max_attempts, backoff)
+            failed += 1
+        current_app.logger.warning("Outbox: error SMTP: %s", e)
+    _release(db, pending)
+    db.commit()
+    return sent, failed
+
+
+def drain(app=None, max_batches=None):
+    """Envía lotes hasta vaciar lo vencido. Devuelve (enviados, fallidos)."""
+    app = app or current_app
+    cfg = app.config
+    total_sent = total_failed = 0
+    batches = 0
+    with app.app_context():
+        db = get_db()
+        while max_batches is None or batches < max_batches:
+            sent, failed = deliver_batch(
+                db, mail,
+                limit=cfg["MAIL_OUTBOX_BATCH"],
+                max_attempts=cfg["MAIL_OUTBOX_MAX_ATTEMPTS"],
+                backoff=cfg["MAIL_OUTBOX_BACKOFF"],
+            )
+            batches += 1
+            total_sent += sent
+            total_failed += failed
+            if sent + failed == 0 or failed:
+                # Vacío, o el servidor está fallando: se reintenta en el próximo ciclo
+                break
+    return total_sent, total_failed
+
+
+# ---------------------------------
+# Worker en segundo plano (uno por proceso)
+# ---------------------------------
+class OutboxWorker(threading.Thread):
+    def __init__(self, app):
+        super().__init__(name="mail-outbox", daemon=True)
+        self.app = app
+        self.poll = app.config["MAIL_OUTBOX_POLL"]
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            try:
+                drain(self.app)
+            except Exception:
+                self.app.logger.exception("Outbox: error en el worker")
+
+
+_worker_lock = threading.Lock()
+
+
+def worker_enabled(app):
+    enabled = app.config["MAIL_OUTBOX_WORKER"]
+    return not app.testing if enabled is None else bool(enabled)
+
+
+def get_worker(app=None):
+    """
+    Worker de este proceso; se arranca al primer uso (y tras un fork).
+    Con el worker apagado no hace nada: los mails quedan en la bandeja
+    hasta un `flask outbox-drain`.
+    """
+    app = app or current_app._get_current_object()
+    if not worker_enabled(app):
+        return None
+    worker = app.extensions.get("outbox_worker")
+    if worker is not None and worker.pid == os.getpid() and worker.is_alive():
+        return worker
+    with _worker_lock:
+        worker = app.extensions.get("outbox_worker")
+        if worker is None or worker.pid != os.getpid() or not worker.is_alive():
+            worker = OutboxWorker(app)
+            worker.pid = os.getpid()
+            worker.start()
+            app.extensions["outbox_worker"] = worker
+    return worker
+
+
+def wake_worker():
+    """
+    Avisa al worker que hay mails nuevos (tras el commit del encolado). Junto
+    con `resume_worker` es lo único que lo arranca: la CLI, los tests y las
+    requests que no encolan no abren un hilo contra SMTP.
+    """
+    worker = get_worker()
+    if worker is not None:
+        worker.wake()
+
+
+def resume_worker(app):
+    """
+    Al levantar un proceso servidor (post_worker_init de gunicorn, run.py):
+    arranca el worker para retomar lo que quedó en la bandeja antes del
+    reinicio (PENDING y reintentos programados). Con el worker apagado no
+    hace nada y la bandeja depende de `flask outbox-drain` en un cron.
+    """
+    worker = get_worker(app)
+    if worker is not None:
+        worker.wake()
+    return worker
+
+
+# -----------------
+# Comandos de CLI
+# -----------------
+@click.command("outbox-drain")
+@with_appcontext
+def outbox_drain_command():
+    """Envía ahora los mails pendientes de la bandeja de salida."""
+    sent, failed = drain()
+    click.echo(f"Enviados: {sent} · fallidos: {failed}")
+
+
+@click.command("outbox-dead")
+@click.option("--requeue", "requeue", type=int, multiple=True,
+              help="Id de un mail DEAD para volver a encolar (repetible).")
+@click.option("--requeue-all", is_flag=True, help="Vuelve a encolar todos los DEAD.")
+@with_appcontext
+def outbox_dead_command(requeue, requeue_all):
+    """Lista los mails que agotaron sus reintentos (o los reencola)."""
+    db = get_db()
+    if requeue or requeue_all:
+        sql = f"UPDATE mail_outbox SET status = 'PENDING', attempts = 0, next_attempt_at = {NOW} WHERE status = 'DEAD'"
+        params = []
+        if not requeue_all:
+            sql += f" AND id IN ({', '.join('?' for _ in requeue)})"
+            params = list(requeue)
+        count = db.execute(sql, params).rowcount
+        db.commit()
+        click.echo(f"Reencolados: {count}")
+        return
+
+    rows = db.execute(
+        "SELECT id, recipients, subject, attempts, last_error, created_at "
+        "FROM mail_outbox WHERE status = 'DEAD' ORDER BY id"
+    ).fetchall()
+    if not rows:
+        click.echo("No hay mails en la lista de descartados.")
+    for row in rows:
+        to = ", ".join(json.loads(row["recipients"]))
+        click.echo(f"#{row['id']} {row['created_at']} → {to} · {row['subject']!r} "
+                   f"({row['attempts']} intentos) {row['last_error']}")
+
+
+def init_app(app):
+    app.cli.add_command(outbox_drain_command)
+    app.cli.add_command(outbox_dead_command)
@@ -0,0 +1,128 @@
+# flaskr/pagination.py
+import base64
+import json
+from flask import current_app, request
+
+
+# ---------------------------------
+# Cursores opacos (keyset)
+# ---------------------------------
+def encode_cursor(*values) -> str:
+    """Codifica los valores de la clave de orden en un token URL-safe."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, arity=None):
+    """
+    Devuelve la tupla codificada en `token`, o None si es inválido: el token
+    viene del cliente, así que solo se aceptan `arity` valores escalares
+    (texto, número o null) que se puedan pasar como parámetros SQL.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or not values:
+        return None
+    if arity is not None and len(values) != arity:
+        return None
+    if not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        return None
+    return tuple(values)
+
+
+def get_page_size() -> int:
+    """Tamaño de página pedido en `?limit=`, acotado por MAX_PAGE_SIZE."""
+    default = current_app.config["PAGE_SIZE"]
+    size = request.args.get("limit", default, type=int)
+    return max(1, min(size, current_app.config["MAX_PAGE_SIZE"]))
+
+
+class Page:
+    """Una página de resultados con los cursores para avanzar/retroceder."""
+
+    def __init__(self, rows, next_cursor=None, prev_cursor=None, limit=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.limit = limit
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+
+def keyset_paginate(db, select_sql, order_by, fields, where=(), params=()):
+    """
+    Pagina `select_sql` por keyset (más reciente primero) sin OFFSET.
+
+    - `order_by`: columnas SQL de la clave, p. ej. ("v.sale_date", "v.id").
+    - `fields`: nombres de esas columnas en cada fila, p. ej. ("sale_date", "id").
+    - `where` / `params`: condiciones extra (AND) y sus parámetros.
+
+    Lee `?after=` / `?before=` / `?limit=` de la request. La comparación por
+    row values `(fecha, id) < (?, ?)` permite que SQLite recorra el índice
+    de la fecha (que ya incluye el rowid) y corte en LIMIT, así que el costo
+    de cada página no depende del tamaño del historial.
+    """
+    limit = get_page_size()
+    after = decode_cursor(request.args.get("after"), len(order_by))
+    before = decode_cursor(request.args.get("before"), len(order_by))
+
+    conditions = list(where)
+    args = list(params)
+    key = "(" + ", ".join(order_by) + ")"
+    marks = "(" + ", ".join("?" for _ in order_by) + ")"
+
+    if before is not None:
+        conditions.append(f"{key} > {marks}")
+        args.extend(before)
+        direction = "ASC"
+    else:
+        before = None
+        if after is not None:
+            conditions.append(f"{key} < {marks}")
+            args.extend(after)
+        direction = "DESC"
+
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(f"{col} {direction}" for col in order_by)
+    sql += " LIMIT ?"
+    args.append(limit + 1)
+
+    rows = db.execute(sql, args).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before is not None:
+        # Se leyó hacia atrás (ASC): se devuelve en el orden normal (DESC)
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    def cursor_of(row):
+        return encode_cursor(*(row[f] for f in fields))
+
+    next_cursor = cursor_of(rows[-1]) if rows and has_next else None
+    prev_cursor = cursor_of(rows[0]) if rows and has_prev else None
+    return Page(rows, next_cursor, prev_cursor, limit)
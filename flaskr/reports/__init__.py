@@ -1 +1,2 @@
-from .routes import bp
\ No newline at end of file
+from .routes import bp
+from .rollups import backfill_rollups_command
@@ -0,0 +1,47 @@
+# flaskr/reports/rollups.py
+import click
+from flask.cli import with_appcontext
+from flaskr.db import get_db
+
+
+def rebuild_rollups(db):
+    """
+    Recalcula los rollups diarios y el ranking de productos desde el
+    historial completo.
+    Útil tras importar datos con los triggers ausentes o para auditar.
+    """
+    db.execute("DELETE FROM sales_daily")
+    db.execute("""
+        INSERT INTO sales_daily (day, product_id, quantity, total, sales_count)
+        SELECT substr(sale_date, 1, 10), product_id,
+               SUM(quantity), SUM(total_price), COUNT(*)
+        FROM sales
+        GROUP BY substr(sale_date, 1, 10), product_id
+    """)
+    db.execute("DELETE FROM shopping_daily")
+    db.execute("""
+        INSERT INTO shopping_daily (day, product_id, quantity, total, purchase_count)
+        SELECT substr(purchase_date, 1, 10), product_id,
+               SUM(quantity), SUM(total_price), COUNT(*)
+        FROM shopping
+        GROUP BY substr(purchase_date, 1, 10), product_id
+    """)
+    db.execute("DELETE FROM product_sales_total")
+    db.execute("""
+        INSERT INTO product_sales_total (product_id, category, total_quantity, total_amount)
+        SELECT s.product_id, p.category, SUM(s.quantity), SUM(s.total_price)
+        FROM sales s
+        JOIN product p ON p.id = s.product_id
+        GROUP BY s.product_id
+    """)
+    db.commit()
+
+
+@click.command("backfill-rollups")
+@with_appcontext
+def backfill_rollups_command():
+    """Reconstruye las tablas de rollups de reportes desde sales/shopping."""
+    db = get_db()
+    rebuild_rollups(db)
+    days = db.execute("SELECT COUNT(DISTINCT day) AS c FROM sales_daily").fetchone()["c"]
+    click.echo(f"Rollups reconstruidos ({days} días con ventas).")
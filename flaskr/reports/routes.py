@@ -1,36 +1,52 @@
-from flask import Blueprint, render_template
-from flaskr.db import get_db
+from flask import Blueprint, render_template, request, jsonify
+from flaskr.db import get_read_db
 from flaskr.security import roles_required
 
 bp = Blueprint("reports", __name__, url_prefix="/reports")
 
+LEADERBOARD_MAX = 100
+
+
+def top_sellers(db, limit, category=None):
+    """
+    Ranking por cantidad vendida, leído de `product_sales_total`.
+    Recorre el índice sobre el acumulado y corta en `limit` filas.
+    """
+    sql = """
+        SELECT t.product_id, p.name AS product_name, t.category,
+               t.total_quantity AS total_sold, t.total_amount
+        FROM product_sales_total t
+        JOIN product p ON p.id = t.product_id
+    """
+    params = []
+    if category is not None:
+        sql += " WHERE t.category = ?"
+        params.append(category)
+    sql += " ORDER BY t.total_quantity DESC LIMIT ?"
+    params.append(limit)
+    return db.execute(sql, params).fetchall()
+
+
 @bp.get("/")
 @roles_required("ADMIN")
 def index():
-    db = get_db()
+    db = get_read_db()
 
-    # 💰 Ventas totales del día actual
+    # 💰 Ventas totales del día actual (rollup diario, búsqueda por PK)
     ventas_hoy = db.execute("""
-        SELECT COALESCE(SUM(total_price), 0) AS total
-        FROM sales
-        WHERE DATE(sale_date) = DATE('now')
+        SELECT COALESCE(SUM(total), 0) AS total
+        FROM sales_daily
+        WHERE day = DATE('now')
     """).fetchone()["total"]
 
     # 🏆 Top 5 productos más vendidos (por cantidad)
-    top5 = db.execute("""
-        SELECT p.name AS product_name, SUM(s.quantity) AS total_sold
-        FROM sales s
-        JOIN product p ON s.product_id = p.id
-        GROUP BY p.id
-        ORDER BY total_sold DESC
-        LIMIT 5
-    """).fetchall()
+    top5 = top_sellers(db, 5)
 
     # 📈 Total de compras del día (opcional)
     compras_hoy = db.execute("""
-        SELECT COALESCE(SUM(total_price), 0) AS total
-        FROM shopping
-        WHERE DATE(purchase_date) = DATE('now')
+        SELECT COALESCE(SUM(total), 0) AS total
+        FROM shopping_daily
+        WHERE day = DATE('now')
     """).fetchone()["total"]
 
     return render_template(
@@ -39,3 +55,19 @@ def index():
         compras_hoy=compras_hoy,
         top5=top5
     )
+
+
+# 🏆 Ranking configurable (JSON): ?limit=N&category=X
+@bp.get("/top-sellers")
+@roles_required("ADMIN")
+def top_sellers_api():
+    limit = request.args.get("limit", 10, type=int)
+    limit = max(1, min(limit, LEADERBOARD_MAX))
+    category = request.args.get("category") or None
+
+    rows = top_sellers(get_read_db(), limit, category)
+    return jsonify({
+        "category": category,
+        "limit": limit,
+        "items": [dict(r) for r in rows],
+    })
@@ -0,0 +1,251 @@
+# flaskr/sales/checkout.py
+import math
+import sqlite3
+from collections import Counter, namedtuple
+
+SaleLine = namedtuple("SaleLine", "product_id quantity unit_price")
+
+
+def parse_lines(form):
+    """
+    Lee las líneas del formulario (listas paralelas product_id / quantity /
+    unit_price). Ignora las filas vacías.
+    Devuelve (líneas, errores) con errores = {índice: mensaje}.
+    """
+    product_ids = form.getlist("product_id")
+    quantities = form.getlist("quantity")
+    prices = form.getlist("unit_price")
+
+    lines, errors = [], {}
+    for i in range(max(len(product_ids), len(quantities), len(prices))):
+        raw_pid = (product_ids[i] if i < len(product_ids) else "").strip()
+        raw_qty = (quantities[i] if i < len(quantities) else "").strip()
+        raw_price = (prices[i] if i < len(prices) else "").strip()
+        if not (raw_pid or raw_qty or raw_price):
+            continue
+
+        index = len(lines)
+        try:
+            line = SaleLine(int(raw_pid), int(raw_qty), float(raw_price or 0))
+        except ValueError:
+            errors[index] = "Datos inválidos."
+            line = SaleLine(None, 0, 0.0)
+        else:
+            if line.quantity <= 0:
+                errors[index] = "Ingresá una cantidad válida."
+            elif not math.isfinite(line.unit_price) or line.unit_price < 0:
+                errors[index] = "Ingresá un precio válido."
+        lines.append(line)
+    return lines, errors
+
+
+def apply_sales(db, lines, user_id):
+    """
+    Verifica el stock e inserta las líneas, dentro de la transacción que
+    ya abrió el llamador (`register_sales` o la cola de escritura).
+    Devuelve (ids_de_venta, errores); si hay errores no inserta nada.
+
+    El descuento lo hace `trg_sales_after_insert` (también alimenta el
+    ledger y los rollups), así que acá no hay un UPDATE condicional propio:
+    la lectura del stock equivale a ese `WHERE current_stock >= ?` porque
+    corre con el lock de escritura ya tomado (`BEGIN IMMEDIATE`) y nadie
+    puede cambiarlo antes de los INSERT. Si igual faltara stock, el
+    CHECK (current_stock >= 0) aborta el descuento del trigger.
+    """
+    if not lines:
+        return [], {}
+
+    requested = Counter()
+    for line in lines:
+        requested[line.product_id] += line.quantity
+
+    marks = ", ".join("?" for _ in requested)
+    stock = {
+        row["id"]: row["current_stock"]
+        for row in db.execute(
+            f"SELECT id, current_stock FROM product WHERE id IN ({marks})",
+            tuple(requested),
+        )
+    }
+
+    errors = {}
+    for i, line in enumerate(lines):
+        available = stock.get(line.product_id)
+        if available is None:
+            errors[i] = "Producto inexistente."
+        elif available < requested[line.product_id]:
+            errors[i] = (
+                f"Stock insuficiente (disponible: {available}, "
+                f"pedido: {requested[line.product_id]})."
+            )
+    if errors:
+        return [], errors
+
+    db.executemany(
+        """
+        INSERT INTO sales (product_id, quantity, unit_price, created_by)
+        VALUES (?, ?, ?, ?)
+        """,
+        [(l.product_id, l.quantity, l.unit_price, user_id) for l in lines],
+    )
+    # Con el lock tomado los ids asignados son consecutivos
+    last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - len(lines) + 1, last_id + 1)), {}
+
+
+def register_sales(db, lines, user_id):
+    """
+    Registra todas las líneas en una sola transacción `BEGIN IMMEDIATE`.
+
+    El lock de escritura se toma antes de leer el stock, así que entre la
+    verificación y los INSERT ningún otro cajero puede vender el mismo
+    producto. Se valida el total pedido por producto (no línea a línea)
+    con una sola lectura, y las ventas se insertan con `executemany`;
+    el descuento de stock lo hace `trg_sales_after_insert`.
+
+    Devuelve (ids_de_venta, errores) con errores = {índice: mensaje}.
+    Si hay algún error no se registra nada.
+    """
+    if not lines:
+        return [], {}
+
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        sale_ids, errors = apply_sales(db, lines, user_id)
+        if errors:
+            db.rollback()
+            return [], errors
+        db.commit()
+    except sqlite3.IntegrityError:
+        # Red de seguridad: CHECK (current_stock >= 0) u otra restricción
+        db.rollback()
+        return [], {i: "No se pudo registrar la línea." for i in range(len(lines))}
+    except Exception:
+        db.rollback()
+        raise
+
+    return sale_ids, {}
+
+
+# ---------------------------------
+# Lotes de la API de cajas (POS)
+# ---------------------------------
+BatchItem = namedtuple("BatchItem", "index key product_id quantity unit_price")
+
+MAX_KEY_LENGTH = 100
+
+
+def _result(index, key, status, **extra):
+    return dict(index=index, idempotency_key=key, status=status, **extra)
+
+
+def parse_batch(items):
+    """
+    Valida la forma de cada item del lote. Devuelve (válidos, resultados),
+    donde `resultados` ya trae el error de los items rechazados y None en
+    el lugar de los válidos.
+    """
+    results = [None] * len(items)
+    valid, seen = [], set()
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[i] = _result(i, None, "error", error="El item debe ser un objeto.")
+            continue
+
+        key = item.get("idempotency_key")
+        if not isinstance(key, str) or not key.strip() or len(key) > MAX_KEY_LENGTH:
+            results[i] = _result(i, None, "error", error="Falta idempotency_key (texto, máx. 100).")
+            continue
+        if key in seen:
+            results[i] = _result(i, key, "error", error="idempotency_key repetida en el lote.")
+            continue
+
+        try:
+            product_id = int(item["product_id"])
+            quantity = int(item["quantity"])
+            unit_price = float(item["unit_price"])
+        except (KeyError, TypeError, ValueError):
+            results[i] = _result(i, key, "error", error="Datos inválidos.")
+            continue
+        if quantity <= 0:
+            results[i] = _result(i, key, "error", error="La cantidad debe ser mayor a 0.")
+            continue
+        # json acepta NaN e Infinity; SQLite guardaría NaN como NULL
+        if not math.isfinite(unit_price) or unit_price <= 0:
+            results[i] = _result(i, key, "error", error="El precio debe ser un número mayor a 0.")
+            continue
+
+        seen.add(key)
+        valid.append(BatchItem(i, key, product_id, quantity, unit_price))
+    return valid, results
+
+
+def register_sales_batch(db, items, user_id, results):
+    """
+    Registra un lote de la API en una sola transacción `BEGIN IMMEDIATE`.
+
+    A diferencia del carrito, cada item es independiente: se aceptan los
+    que tienen stock (en el orden recibido) y se informan los demás. Las
+    claves ya registradas por el mismo usuario devuelven la venta original
+    ("duplicate"), así una caja puede reintentar el mismo lote sin duplicar
+    ventas; la misma clave de otro usuario es una venta distinta.
+    Completa y devuelve `results`.
+    """
+    if not items:
+        return results
+
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        key_marks = ", ".join("?" for _ in items)
+        existing = dict(db.execute(
+            f"SELECT idempotency_key, id FROM sales "
+            f"WHERE created_by = ? AND idempotency_key IN ({key_marks})",
+            [user_id, *(it.key for it in items)],
+        ).fetchall())
+
+        product_ids = {it.product_id for it in items}
+        pid_marks = ", ".join("?" for _ in product_ids)
+        stock = dict(db.execute(
+            f"SELECT id, current_stock FROM product WHERE id IN ({pid_marks})",
+            tuple(product_ids),
+        ).fetchall())
+
+        accepted = []
+        for it in items:
+            if it.key in existing:
+                results[it.index] = _result(it.index, it.key, "duplicate", sale_id=existing[it.key])
+            elif it.product_id not in stock:
+                results[it.index] = _result(it.index, it.key, "error", error="Producto inexistente.")
+            elif stock[it.product_id] < it.quantity:
+                results[it.index] = _result(
+                    it.index, it.key, "error",
+                    error=f"Stock insuficiente (disponible: {stock[it.product_id]}).",
+                )
+            else:
+                stock[it.product_id] -= it.quantity
+                accepted.append(it)
+
+        if accepted:
+            db.executemany(
+                """
+                INSERT INTO sales (product_id, quantity, unit_price, created_by, idempotency_key)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [(it.product_id, it.quantity, it.unit_price, user_id, it.key) for it in accepted],
+            )
+            last_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first_id = last_id - len(accepted) + 1
+            for offset, it in enumerate(accepted):
+                results[it.index] = _result(it.index, it.key, "created", sale_id=first_id + offset)
+        db.commit()
+    except sqlite3.IntegrityError:
+        db.rollback()
+        # Los "duplicate" siguen valiendo: la venta original ya estaba registrada
+        for it in items:
+            if results[it.index] is None or results[it.index]["status"] == "created":
+                results[it.index] = _result(it.index, it.key, "error", error="No se pudo registrar la venta.")
+    except Exception:
+        db.rollback()
+        raise
+
+    return results
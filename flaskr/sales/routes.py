@@ -1,39 +1,108 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g
-from flaskr.security import roles_required
-from flaskr.db import get_db
+import sqlite3
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, jsonify, current_app
+from flaskr import csrf
+from flaskr.security import roles_required, token_required
+from flaskr.db import get_db, get_read_db
+from flaskr.pagination import keyset_paginate
+from flaskr.export import export_response
+from flaskr.conditional import conditional_get
+from flaskr.streaming import stream_page
+from flaskr.stock.catalog import catalog_version
+from flaskr.writequeue import WriteQueueUnavailable, run_write
+from .checkout import apply_sales, parse_lines, register_sales, parse_batch, register_sales_batch
 
 bp = Blueprint("sales", __name__, url_prefix="/sales")
 
+# Filas vacías que muestra el formulario del carrito
+CART_ROWS = 5
+
 # ➕ Registrar nueva venta (USER y ADMIN)
 @bp.route("/new", methods=["GET", "POST"])
 @roles_required("USER", "ADMIN")
 def new():
     """Permite registrar una nueva venta."""
-    db = get_db()
-    productos = db.execute("SELECT id, name, sale_price, current_stock FROM product ORDER BY name").fetchall()
-
     if request.method == "POST":
-        product_id = request.form.get("product_id")
-        quantity = int(request.form.get("quantity", 0))
-        unit_price = float(request.form.get("unit_price", 0))
+        lines, errors = parse_lines(request.form)
 
-        if not product_id or quantity <= 0:
+        if len(lines) != 1 or errors:
             flash("⚠️ Ingresá una cantidad válida.", "warning")
         else:
-            # Verificar stock disponible
-            stock = db.execute("SELECT current_stock FROM product WHERE id = ?", (product_id,)).fetchone()
-            if stock and stock["current_stock"] < quantity:
-                flash("❌ Stock insuficiente.", "error")
+            # Directo o por la cola de escritura (WRITE_QUEUE_ENABLED)
+            try:
+                _, errors = run_write(apply_sales, lines, g.user["id"])
+            except WriteQueueUnavailable:
+                # Tras un timeout la venta pudo quedar hecha: reintentar vendería dos veces
+                flash("⚠️ Venta no confirmada: verificá en Mis ventas antes de reintentar.", "warning")
+                return redirect(url_for("sales.my_sales"))
+            except sqlite3.IntegrityError:
+                errors = {0: "No se pudo registrar la venta."}
+            if errors:
+                flash(f"❌ {errors[0]}", "error")
             else:
-                db.execute("""
-                    INSERT INTO sales (product_id, quantity, unit_price, created_by)
-                    VALUES (?, ?, ?, ?)
-                """, (product_id, quantity, unit_price, g.user["id"]))
-                db.commit()
                 flash("✅ Venta registrada correctamente.", "success")
                 return redirect(url_for("sales.my_sales"))
 
-    return render_template("sales/form.html", productos=productos, mode="new")
+    return render_template("sales/form.html", mode="new")
+
+
+# 🛒 Venta de varias líneas en una sola transacción (USER y ADMIN)
+@bp.route("/cart", methods=["GET", "POST"])
+@roles_required("USER", "ADMIN")
+def cart():
+    """Registra un carrito completo: o se venden todas las líneas o ninguna."""
+    db = get_db()
+    lines, errors = [], {}
+
+    if request.method == "POST":
+        lines, errors = parse_lines(request.form)
+
+        if not lines:
+            flash("⚠️ Agregá al menos una línea.", "warning")
+        elif errors:
+            flash("⚠️ Revisá las líneas marcadas.", "warning")
+        else:
+            sale_ids, errors = register_sales(db, lines, g.user["id"])
+            if errors:
+                flash("❌ No se registró la venta. Revisá las líneas marcadas.", "error")
+            else:
+                flash(f"✅ Venta registrada ({len(sale_ids)} líneas).", "success")
+                return redirect(url_for("sales.my_sales"))
+
+    # Nombres para volver a mostrar las líneas ya cargadas
+    ids = [l.product_id for l in lines if l.product_id is not None]
+    names = {}
+    if ids:
+        marks = ", ".join("?" for _ in ids)
+        names = dict(db.execute(f"SELECT id, name FROM product WHERE id IN ({marks})", ids).fetchall())
+
+    return render_template("sales/cart.html", lines=lines, names=names,
+                           errors=errors, rows=max(len(lines), CART_ROWS))
+
+
+# 🧾 API de cajas: lote de ventas en JSON (token Bearer, sin CSRF)
+@bp.post("/api/batch")
+@csrf.exempt
+@token_required
+def api_batch():
+    """
+    Recibe {"sales": [{"idempotency_key", "product_id", "quantity", "unit_price"}, ...]}
+    y devuelve un resultado por item (created / duplicate / error).
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get("sales") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify(error='Se esperaba {"sales": [...]} con al menos un item.'), 400
+
+    max_batch = current_app.config["SALES_API_MAX_BATCH"]
+    if len(items) > max_batch:
+        return jsonify(error=f"El lote supera el máximo de {max_batch} ventas."), 413
+
+    valid, results = parse_batch(items)
+    results = register_sales_batch(get_db(), valid, g.user["id"], results)
+    return jsonify(
+        created=sum(1 for r in results if r["status"] == "created"),
+        results=results,
+    )
 
 
 # 📋 Listado general de ventas (solo ADMIN)
@@ -41,30 +110,56 @@ def new():
 @roles_required("ADMIN")
 def list_all():
     """Listado completo de ventas (solo ADMIN)."""
-    db = get_db()
-    ventas = db.execute("""
+    db = get_read_db()
+    ventas = keyset_paginate(
+        db,
+        """
         SELECT v.id, p.name AS product_name, v.quantity, v.unit_price, 
                v.total_price, v.sale_date, u.username AS sold_by
         FROM sales v
         JOIN product p ON v.product_id = p.id
         JOIN user u ON v.created_by = u.id
-        ORDER BY v.sale_date DESC
-    """).fetchall()
-    return render_template("sales/list.html", ventas=ventas)
+        """,
+        order_by=("v.sale_date", "v.id"),
+        fields=("sale_date", "id"),
+    )
+    return stream_page("sales/list.html", ventas=ventas)
+
+
+def _my_sales_fingerprint(db):
+    # Ventas propias (sobre idx_sales_created_by_date): altas, bajas y ediciones
+    # (updated_at) + nombres de producto
+    row = db.execute(
+        "SELECT COUNT(*), MAX(id), MAX(updated_at) FROM sales WHERE created_by = ?", (g.user["id"],)
+    ).fetchone()
+    return (tuple(row), catalog_version(db))
 
 
 # 👤 Ventas del usuario logueado
 @bp.get("/my")
 @roles_required("USER", "ADMIN")
+@conditional_get(_my_sales_fingerprint)
 def my_sales():
     """Muestra las ventas realizadas por el usuario actual."""
-    db = get_db()
-    ventas = db.execute("""
+    db = get_read_db()
+    ventas = keyset_paginate(
+        db,
+        """
         SELECT v.id, p.name AS product_name, v.quantity, v.unit_price, 
                v.total_price, v.sale_date
         FROM sales v
         JOIN product p ON v.product_id = p.id
-        WHERE v.created_by = ?
-        ORDER BY v.sale_date DESC
-    """, (g.user["id"],)).fetchall()
-    return render_template("sales/my_list.html", ventas=ventas)
\ No newline at end of file
+        """,
+        order_by=("v.sale_date", "v.id"),
+        fields=("sale_date", "id"),
+        where=("v.created_by = ?",),
+        params=(g.user["id"],),
+    )
+    return render_template("sales/my_list.html", ventas=ventas)
+
+
+# ⬇️ Exportación en streaming (solo ADMIN): ?format=csv|jsonl&from=&to=&product_id=
+@bp.get("/export")
+@roles_required("ADMIN")
+def export():
+    return export_response("sales")
@@ -1,4 +1,7 @@
 -- schema.sql (solo DDL)
+-- Esquema base (versión 0). Lo agregado después vive en flaskr/migrations.py:
+-- init_db crea esto desde cero y aplica encima todas las migraciones, igual
+-- que en una base existente. No agregar tablas acá: crear una migración.
 
 DROP TABLE IF EXISTS user;
 
@@ -1,5 +1,7 @@
+import hashlib
 from functools import wraps
-from flask import g, redirect, url_for, abort
+from flask import g, redirect, url_for, abort, request, jsonify
+from flaskr.db import get_read_db
 
 def login_required(fn):
     @wraps(fn)
@@ -20,3 +22,38 @@ def roles_required(*roles):
             return fn(*args, **kwargs)
         return wrapper
     return decorator
+
+
+# ----------------------------
+# Tokens de API (Bearer)
+# ----------------------------
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf8")).hexdigest()
+
+
+def token_required(fn):
+    """
+    Autentica con `Authorization: Bearer <token>` contra la tabla api_token.
+    Deja en g.user al usuario dueño del token (debe estar ACTIVE).
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            return jsonify(error="Falta el token de API."), 401
+
+        row = get_read_db().execute(
+            """
+            SELECT u.id, u.username, u.role, u.status, t.id AS token_id
+            FROM api_token t
+            JOIN user u ON u.id = t.user_id
+            WHERE t.token_hash = ? AND t.revoked_at IS NULL
+            """,
+            (hash_token(token.strip()),),
+        ).fetchone()
+        if row is None or row["status"] != "ACTIVE":
+            return jsonify(error="Token de API inválido."), 401
+
+        g.user = dict(row)
+        return fn(*args, **kwargs)
+    return wrapper
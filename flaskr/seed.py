@@ -0,0 +1,205 @@
+# flaskr/seed.py
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+
+from flaskr.db import get_db
+from flaskr.reports.rollups import rebuild_rollups
+from flaskr.stock.ledger import rebuild_ledger
+
+CATEGORIES = (
+    "Almacén", "Bebidas", "Lácteos", "Limpieza", "Perfumería", "Panadería",
+    "Congelados", "Fiambrería", "Verdulería", "Carnicería", "Mascotas", "Bazar",
+)
+WORDS = (
+    "Yerba", "Café", "Leche", "Queso", "Arroz", "Fideos", "Aceite", "Azúcar",
+    "Harina", "Galletitas", "Jugo", "Agua", "Jabón", "Detergente", "Shampoo",
+    "Pan", "Manteca", "Dulce", "Salsa", "Atún", "Papel", "Vino", "Cerveza",
+)
+BRANDS = ("La Serena", "Don Julio", "El Molino", "Santa Ana", "Los Andes", "Del Valle")
+
+# Triggers por fila de ventas/compras que se suspenden durante la carga
+# masiva; sus agregados se recalculan después en una pasada.
+BULK_TRIGGER_TABLES = ("sales", "shopping")
+
+# Contraseña de todos los usuarios generados (la usa `flask bench` para el login)
+SEED_PASSWORD = "seed1234"
+
+
+def _timestamps(rng, count, days):
+    """Fechas crecientes repartidas en los últimos `days` días (formato del schema)."""
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    step = (end - start).total_seconds() / max(count, 1)
+    for i in range(count):
+        ts = start + timedelta(seconds=step * (i + rng.random()))
+        yield ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z"
+
+
+def _suspend_triggers(db):
+    rows = db.execute(
+        f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name IN ({', '.join('?' for _ in BULK_TRIGGER_TABLES)})
+          AND name NOT LIKE '%updated_at'
+        """,
+        BULK_TRIGGER_TABLES,
+    ).fetchall()
+    for row in rows:
+        db.execute(f'DROP TRIGGER "{row["name"]}"')
+    db.commit()
+    return [row["sql"] for row in rows]
+
+
+def _restore_triggers(db, sqls):
+    for sql in sqls:
+        db.execute(sql)
+    db.commit()
+
+
+def _bulk_insert(db, sql, rows, batch_size, label):
+    """executemany en transacciones de `batch_size` filas, con progreso."""
+    batch, done = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.executemany(sql, batch)
+            db.commit()
+            done += len(batch)
+            batch.clear()
+            click.echo(f"  {label}: {done:,}", err=True)
+    if batch:
+        db.executemany(sql, batch)
+        db.commit()
+        done += len(batch)
+    return done
+
+
+def is_empty(db):
+    """Sin productos, compras ni ventas (el ADMIN del bootstrap no cuenta)."""
+    return not db.execute(
+        "SELECT EXISTS (SELECT 1 FROM product) OR EXISTS (SELECT 1 FROM shopping) "
+        "OR EXISTS (SELECT 1 FROM sales)"
+    ).fetchone()[0]
+
+
+def seed_database(db, products=10_000, sales=5_000_000, purchases=None, users=500,
+                  days=365, seed=None, batch_size=50_000):
+    """
+    Genera un dataset grande y plausible para pruebas de carga.
+
+    No usar sobre una base en producción: mientras dura la carga los
+    triggers de sales/shopping (stock, rollups, ranking, ledger) no
+    existen; al final se recrean, se recalculan los rollups con
+    `rebuild_rollups`, se asigna un stock actual a cada producto y se
+    regenera el ledger con `rebuild_ledger`.
+    """
+    rng = random.Random(seed)
+    purchases = sales // 10 if purchases is None else purchases
+    counts = {}
+
+    # 👤 Usuarios (un solo hash para todos, de SEED_PASSWORD)
+    pwhash = generate_password_hash(SEED_PASSWORD)
+    first_user = (db.execute("SELECT COALESCE(MAX(id), 0) FROM user").fetchone()[0]) + 1
+    counts["users"] = _bulk_insert(
+        db,
+        "INSERT OR IGNORE INTO user (firstname, lastname, email, username, password_hash) "
+        "VALUES (?, ?, ?, ?, ?)",
+        ((f"Cajero{i}", "Seed", f"seed{i}@example.com", f"seed{i:05d}", pwhash)
+         for i in range(first_user, first_user + users)),
+        batch_size, "usuarios",
+    )
+
+    # 📦 Productos
+    first_sku = db.execute("SELECT COUNT(*) FROM product").fetchone()[0] + 1
+    counts["products"] = _bulk_insert(
+        db,
+        "INSERT OR IGNORE INTO product (sku, name, category, current_stock, sale_price, purchase_price) "
+        "VALUES (?, ?, ?, 0, ?, ?)",
+        (
+            (f"SEED-{i:07d}",
+             f"{rng.choice(WORDS)} {rng.choice(BRANDS)} {rng.randint(1, 999)}",
+             rng.choice(CATEGORIES),
+             round(cost * rng.uniform(1.2, 1.8), 2),
+             cost)
+            for i in range(first_sku, first_sku + products)
+            for cost in (round(rng.lognormvariate(6, 1), 2),)
+        ),
+        batch_size, "productos",
+    )
+
+    catalog = db.execute("SELECT id, sale_price, purchase_price FROM product").fetchall()
+    user_ids = [row[0] for row in db.execute("SELECT id FROM user")]
+    if not catalog or not user_ids:
+        return counts
+    rng.shuffle(catalog)   # los más vendidos quedan repartidos entre categorías
+
+    def pick():
+        # Sesgo tipo Pareto: pocos productos concentran la mayoría de las ventas
+        return catalog[int(len(catalog) * rng.random() ** 3)]
+
+    triggers = _suspend_triggers(db)
+    try:
+        counts["purchases"] = _bulk_insert(
+            db,
+            "INSERT INTO shopping (product_id, quantity, unit_price, purchase_date, created_by) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((p[0], rng.randint(10, 200), p[2], ts, rng.choice(user_ids))
+             for ts in _timestamps(rng, purchases, days) for p in (pick(),)),
+            batch_size, "compras",
+        )
+        counts["sales"] = _bulk_insert(
+            db,
+            "INSERT INTO sales (product_id, quantity, unit_price, sale_date, created_by) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((p[0], rng.randint(1, 5), p[1], ts, rng.choice(user_ids))
+             for ts in _timestamps(rng, sales, days) for p in (pick(),)),
+            batch_size, "ventas",
+        )
+    finally:
+        _restore_triggers(db, triggers)
+
+    click.echo("  recalculando rollups, stock y ledger...", err=True)
+    rebuild_rollups(db)
+    db.execute("UPDATE product SET current_stock = abs(random() % 300)")
+    db.commit()
+    rebuild_ledger(db)
+    db.execute("ANALYZE")
+    return counts
+
+
+# -----------------
+# Comando de CLI
+# -----------------
+@click.command("seed")
+@click.option("--products", default=10_000, show_default=True)
+@click.option("--sales", default=5_000_000, show_default=True)
+@click.option("--purchases", type=int, default=None, help="Por defecto, ventas / 10.")
+@click.option("--users", default=500, show_default=True)
+@click.option("--days", default=365, show_default=True, help="Historial a cubrir.")
+@click.option("--seed", "rng_seed", type=int, default=None, help="Semilla para repetir el dataset.")
+@click.option("--batch-size", default=50_000, show_default=True, help="Filas por transacción.")
+@click.option("--force", is_flag=True, help="Cargar aunque la base ya tenga productos, compras o ventas.")
+@with_appcontext
+def seed_command(products, sales, purchases, users, days, rng_seed, batch_size, force):
+    """Genera un dataset de volumen (productos, usuarios, compras y ventas)."""
+    db = get_db()
+    # Los triggers de ventas/compras se suspenden durante la carga: nunca
+    # sobre una base con datos reales salvo pedido explícito
+    if not force and not is_empty(db):
+        raise click.ClickException(
+            "La base ya tiene productos, compras o ventas; usá --force para cargar igual."
+        )
+    start = time.perf_counter()
+    counts = seed_database(
+        db, products=products, sales=sales, purchases=purchases, users=users,
+        days=days, seed=rng_seed, batch_size=batch_size,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    summary = " · ".join(f"{k}: {v:,}" for k, v in counts.items())
+    click.echo(f"Seed listo en {elapsed:.1f}s ({total / elapsed:,.0f} filas/s) — {summary}")
@@ -1,9 +1,25 @@
+import sqlite3
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g
 from flaskr.security import roles_required
-from flaskr.db import get_db
+from flaskr.db import get_read_db
+from flaskr.pagination import keyset_paginate
+from flaskr.export import export_response
+from flaskr.conditional import conditional_get
+from flaskr.streaming import stream_page
+from flaskr.stock.catalog import catalog_version
+from flaskr.writequeue import WriteQueueUnavailable, run_write
 
 bp = Blueprint("shopping", __name__, url_prefix="/shopping")
 
+
+def insert_purchase(db, product_id, quantity, unit_price, user_id):
+    """INSERT de la compra; el stock lo suma trg_shopping_after_insert."""
+    db.execute("""
+        INSERT INTO shopping (product_id, quantity, unit_price, created_by)
+        VALUES (?, ?, ?, ?)
+    """, (product_id, quantity, unit_price, user_id))
+
+
 @bp.get("/list")
 @roles_required("ADMIN")
 def list():
@@ -11,9 +27,11 @@ def list():
     Listado de compras registradas (solo ADMIN).
     Muestra producto, cantidad, precio, total, usuario y fecha.
     """
-    db = get_db()
+    db = get_read_db()
 
-    compras = db.execute("""
+    compras = keyset_paginate(
+        db,
+        """
         SELECT 
             s.id,
             p.name AS product_name,
@@ -25,33 +43,47 @@ def list():
         FROM shopping AS s
         JOIN product AS p ON s.product_id = p.id
         LEFT JOIN user AS u ON s.created_by = u.id
-        ORDER BY s.purchase_date DESC;
-    """).fetchall()
+        """,
+        order_by=("s.purchase_date", "s.id"),
+        fields=("purchase_date", "id"),
+    )
+
+    return stream_page("shopping/list.html", compras=compras)
+
+def _my_purchases_fingerprint(db):
+    # Compras propias (sobre idx_shopping_created_by_date): altas, bajas y ediciones
+    # (updated_at) + nombres de producto
+    row = db.execute(
+        "SELECT COUNT(*), MAX(id), MAX(updated_at) FROM shopping WHERE created_by = ?", (g.user["id"],)
+    ).fetchone()
+    return (tuple(row), catalog_version(db))
 
-    return render_template("shopping/list.html", compras=compras)
 
 @bp.get("/my")
 @roles_required("USER", "ADMIN")
+@conditional_get(_my_purchases_fingerprint)
 def my_purchases():
     """Muestra solo las compras registradas por el usuario actual."""
-    db = get_db()
-    compras = db.execute("""
+    db = get_read_db()
+    compras = keyset_paginate(
+        db,
+        """
         SELECT 
             s.id, p.name AS product_name, s.quantity, s.unit_price, s.total_price, s.purchase_date
         FROM shopping AS s
         JOIN product AS p ON s.product_id = p.id
-        WHERE s.created_by = ?
-        ORDER BY s.purchase_date DESC;
-    """, (g.user["id"],)).fetchall()
+        """,
+        order_by=("s.purchase_date", "s.id"),
+        fields=("purchase_date", "id"),
+        where=("s.created_by = ?",),
+        params=(g.user["id"],),
+    )
     return render_template("shopping/my_list.html", compras=compras)
 
 @bp.route("/new", methods=["GET", "POST"])
 @roles_required("ADMIN")
 def new():
     """Permite al ADMIN registrar una compra."""
-    db = get_db()
-    productos = db.execute("SELECT id, name FROM product ORDER BY name").fetchall()
-
     if request.method == "POST":
         product_id = request.form.get("product_id")
         quantity = int(request.form.get("quantity", 0))
@@ -60,12 +92,23 @@ def new():
         if not product_id or quantity <= 0 or unit_price <= 0:
             flash("⚠️ Datos inválidos. Verificá los campos.", "warning")
         else:
-            db.execute("""
-                INSERT INTO shopping (product_id, quantity, unit_price, created_by)
-                VALUES (?, ?, ?, ?)
-            """, (product_id, quantity, unit_price, g.user["id"]))
-            db.commit()
-            flash("✅ Compra registrada y stock actualizado.", "success")
-            return redirect(url_for("shopping.list"))
+            try:
+                run_write(insert_purchase, product_id, quantity, unit_price, g.user["id"])
+            except WriteQueueUnavailable:
+                # Tras un timeout la compra pudo quedar hecha: reintentar la duplicaría
+                flash("⚠️ Compra no confirmada: verificá en Mis compras antes de reintentar.", "warning")
+                return redirect(url_for("shopping.my_purchases"))
+            except sqlite3.IntegrityError:
+                flash("❌ No se pudo registrar la compra (producto inexistente).", "error")
+            else:
+                flash("✅ Compra registrada y stock actualizado.", "success")
+                return redirect(url_for("shopping.list"))
+
+    return render_template("shopping/form.html", mode="new")
 
-    return render_template("shopping/form.html", productos=productos, mode="new")
\ No newline at end of file
+
+# ⬇️ Exportación en streaming (solo ADMIN): ?format=csv|jsonl&from=&to=&product_id=
+@bp.get("/export")
+@roles_required("ADMIN")
+def export():
+    return export_response("shopping")
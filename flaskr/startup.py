@@ -0,0 +1,54 @@
+# flaskr/startup.py
+import subprocess
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+PHASES = (
+    ("package_import_ms", "import de flaskr (Flask + extensiones)"),
+    ("config_ms", "configuración"),
+    ("extensions_ms", "extensiones y DB (sin I/O)"),
+    ("blueprints_ms", "import y registro de blueprints"),
+    ("handlers_ms", "handlers y rutas extra"),
+    ("create_app_ms", "total create_app"),
+)
+
+
+def import_profile(limit=15):
+    """
+    Corre `python -X importtime` en un proceso limpio (import + create_app)
+    y devuelve los `limit` módulos con mayor tiempo propio: [(ms, módulo)].
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import flaskr; flaskr.create_app()"],
+        capture_output=True, text=True, check=False,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, module = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us) / 1000, module.strip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+@click.command("startup-report")
+@click.option("--imports", "top", default=15, show_default=True,
+              help="Módulos más caros a listar (0 para omitir el perfil de imports).")
+@with_appcontext
+def startup_report_command(top):
+    """Muestra cuánto cuesta cada fase del arranque de un worker."""
+    timings = current_app.extensions.get("startup", {})
+    click.echo("Fases de create_app:")
+    for key, label in PHASES:
+        if key in timings:
+            click.echo(f"  {label:<40} {timings[key]:>9.2f} ms")
+
+    if top:
+        click.echo("\nImports más costosos (tiempo propio, proceso limpio):")
+        for ms, module in import_profile(top):
+            click.echo(f"  {module:<48} {ms:>9.2f} ms")
@@ -0,0 +1,66 @@
+// Autocompletado de productos para los formularios de venta/compra.
+// Cada fila [data-product-row] tiene un <input data-product-search> con su
+// <datalist> y un <input type="hidden" name="product_id"> que se completa
+// al elegir una opción. Consulta al endpoint JSON indicado en data-endpoint.
+(function () {
+  const endpoint = document.currentScript.dataset.endpoint;
+  const MIN_CHARS = 2;
+  const DELAY_MS = 150;
+
+  function label(p) {
+    const sku = p.sku ? ` [${p.sku}]` : "";
+    return `${p.name}${sku} · $${Number(p.sale_price).toFixed(2)} · stock ${p.current_stock}`;
+  }
+
+  function bind(input) {
+    const row = input.closest("[data-product-row]");
+    const hidden = row.querySelector('input[name="product_id"]');
+    const price = row.querySelector('input[name="unit_price"]');
+    const list = document.getElementById(input.getAttribute("list"));
+    let results = [];
+    let timer = null;
+    let controller = null;
+
+    function select() {
+      const p = results.find((r) => label(r) === input.value);
+      if (!p) return false;
+      hidden.value = p.id;
+      if (price && !price.value && input.hasAttribute("data-fill-price")) {
+        price.value = p.sale_price;
+      }
+      return true;
+    }
+
+    async function fetchResults(q) {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      try {
+        const resp = await fetch(`${endpoint}?q=${encodeURIComponent(q)}&limit=10`, {
+          headers: { Accept: "application/json" },
+          signal: controller.signal,
+        });
+        if (!resp.ok) return;
+        results = (await resp.json()).items;
+      } catch (e) {
+        return;
+      }
+      list.replaceChildren(...results.map((p) => {
+        const option = document.createElement("option");
+        option.value = label(p);
+        return option;
+      }));
+      select();
+    }
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      if (select()) return;
+      hidden.value = "";
+      const q = input.value.trim();
+      if (q.length < MIN_CHARS) return;
+      timer = setTimeout(() => fetchResults(q), DELAY_MS);
+    });
+  }
+
+  document.querySelectorAll("input[data-product-search]").forEach(bind);
+})();
@@ -1 +1,4 @@
-from .routes import bp
\ No newline at end of file
+from .routes import bp
+from .importer import import_products_command
+from .ledger import snapshot_stock_command, backfill_ledger_command
+from .reconcile import reconcile_stock_command
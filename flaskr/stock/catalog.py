@@ -0,0 +1,63 @@
+# flaskr/stock/catalog.py
+import threading
+from flask import current_app
+from flaskr.db import get_read_db
+
+CATALOG_SQL = """
+    SELECT id, sku, name, category, sale_price, purchase_price
+    FROM product
+    ORDER BY name
+"""
+
+_lock = threading.Lock()
+
+
+def catalog_version(db) -> int:
+    """Versión actual del catálogo (la incrementan los triggers de product)."""
+    row = db.execute("SELECT version FROM cache_version WHERE name = 'catalog'").fetchone()
+    return row["version"] if row else 0
+
+
+def stock_fingerprint(db):
+    """
+    Huella para el GET condicional de los listados con stock: la versión del
+    catálogo cambia con altas y bajas, y cualquier UPDATE de un producto
+    (incluido el stock que mueven ventas y compras) avanza updated_at.
+    """
+    return (catalog_version(db), db.execute("SELECT MAX(updated_at) FROM product").fetchone()[0])
+
+
+def get_catalog():
+    """
+    Lista de productos ordenada por nombre, servida desde memoria mientras
+    la versión en la base no cambie. La versión se lee antes que las filas:
+    si alguien escribe en el medio, la próxima lectura verá una versión
+    nueva y recargará.
+    """
+    db = get_read_db()
+    version = catalog_version(db)
+
+    cached = current_app.extensions.get("catalog_cache")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        cached = current_app.extensions.get("catalog_cache")
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rows = tuple(dict(row) for row in db.execute(CATALOG_SQL))
+        current_app.extensions["catalog_cache"] = (version, rows)
+    return rows
+
+
+def with_stock(products, db):
+    """Completa productos del catálogo cacheado con su stock vigente (que no se cachea)."""
+    products = list(products)
+    if not products:
+        return []
+    marks = ", ".join("?" for _ in products)
+    stock = dict(db.execute(
+        f"SELECT id, current_stock FROM product WHERE id IN ({marks})",
+        [p["id"] for p in products],
+    ).fetchall())
+    return [dict(p, current_stock=stock.get(p["id"], 0)) for p in products]
@@ -0,0 +1,47 @@
+# flaskr/stock/changes.py
+from flaskr.pagination import decode_cursor, encode_cursor
+
+# Altas/modificaciones y bajas en un solo flujo ordenado por (fecha, id).
+# Cada rama recorre su índice de fecha; SQLite las combina con un merge.
+CHANGES_SQL = """
+    SELECT 'upsert' AS op, id, updated_at AS changed_at,
+           sku, name, category, current_stock, sale_price, purchase_price
+    FROM product
+    WHERE (updated_at, id) > (?, ?)
+    UNION ALL
+    SELECT 'delete' AS op, product_id, deleted_at,
+           NULL, NULL, NULL, NULL, NULL, NULL
+    FROM product_tombstone
+    WHERE (deleted_at, product_id) > (?, ?)
+    ORDER BY 3, 2
+    LIMIT ?
+"""
+
+
+def changes_since(db, cursor, limit):
+    """
+    Cambios del catálogo posteriores a `cursor` (token opaco, o None para
+    empezar desde cero). Devuelve (cambios, nuevo_cursor, hay_más); el
+    cliente guarda el cursor y lo reenvía para retomar donde quedó.
+    """
+    since = decode_cursor(cursor, 2)
+    if since is None:
+        since = ("", 0)
+
+    rows = db.execute(CHANGES_SQL, (*since, *since, limit + 1)).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes = []
+    for row in rows:
+        change = {"op": row["op"], "id": row["id"], "changed_at": row["changed_at"]}
+        if row["op"] == "upsert":
+            change.update(
+                sku=row["sku"], name=row["name"], category=row["category"],
+                current_stock=row["current_stock"], sale_price=row["sale_price"],
+                purchase_price=row["purchase_price"],
+            )
+        changes.append(change)
+
+    next_cursor = encode_cursor(rows[-1]["changed_at"], rows[-1]["id"]) if rows else encode_cursor(*since)
+    return changes, next_cursor, has_more
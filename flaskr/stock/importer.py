@@ -0,0 +1,144 @@
+# flaskr/stock/importer.py
+import csv
+import sqlite3
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flaskr.db import get_db
+
+REQUIRED_COLUMNS = ("name", "sale_price", "purchase_price")
+
+# Upsert por SKU: el stock sólo se fija al crear el producto; en productos
+# existentes lo siguen manejando compras y ventas (sus triggers).
+UPSERT_SQL = """
+    INSERT INTO product (sku, name, category, current_stock, sale_price, purchase_price)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sku) DO UPDATE SET
+        name = excluded.name,
+        category = excluded.category,
+        sale_price = excluded.sale_price,
+        purchase_price = excluded.purchase_price
+"""
+
+
+class ImportResult:
+    """Resumen de una importación: filas aplicadas, errores por fila y velocidad."""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []   # [(número de línea, mensaje)]
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+def _parse_row(row):
+    """Valida una fila del CSV y devuelve los parámetros del upsert."""
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("El nombre es obligatorio.")
+
+    try:
+        current_stock = int((row.get("current_stock") or "0").strip() or 0)
+    except ValueError:
+        raise ValueError("El stock debe ser un número entero.")
+    if current_stock < 0:
+        raise ValueError("El stock no puede ser negativo.")
+
+    prices = []
+    for field in ("sale_price", "purchase_price"):
+        try:
+            price = float((row.get(field) or "").strip())
+        except ValueError:
+            raise ValueError(f"{field} debe ser un número.")
+        if price < 0:
+            raise ValueError(f"{field} no puede ser negativo.")
+        prices.append(price)
+
+    sku = (row.get("sku") or "").strip() or None
+    category = (row.get("category") or "").strip()
+    return (sku, name, category, current_stock, prices[0], prices[1])
+
+
+def _flush(db, chunk, result):
+    """Aplica un lote en una transacción; si falla, reintenta fila por fila."""
+    if not chunk:
+        return
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        db.executemany(UPSERT_SQL, [params for _, params in chunk])
+        db.commit()
+        result.imported += len(chunk)
+        return
+    except sqlite3.IntegrityError:
+        db.rollback()
+
+    db.execute("BEGIN IMMEDIATE")
+    for line_no, params in chunk:
+        try:
+            db.execute("SAVEPOINT import_row")
+            db.execute(UPSERT_SQL, params)
+            db.execute("RELEASE import_row")
+            result.imported += 1
+        except sqlite3.IntegrityError as e:
+            db.execute("ROLLBACK TO import_row")
+            db.execute("RELEASE import_row")
+            result.errors.append((line_no, str(e)))
+    db.commit()
+
+
+def import_products(db, stream, chunk_size=1000):
+    """
+    Importa productos desde un CSV (`stream` en modo texto) leyendo fila a
+    fila y aplicando lotes de `chunk_size` con `executemany`, una
+    transacción por lote. Columnas: sku, name, category, current_stock,
+    sale_price, purchase_price (sku, category y current_stock opcionales).
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+
+    reader = csv.DictReader(stream)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+    if missing:
+        result.errors.append((1, f"Faltan columnas: {', '.join(missing)}."))
+        return result
+
+    chunk = []
+    for row in reader:
+        try:
+            chunk.append((reader.line_num, _parse_row(row)))
+        except ValueError as e:
+            result.errors.append((reader.line_num, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            _flush(db, chunk, result)
+            chunk = []
+    _flush(db, chunk, result)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+# -----------------
+# Comandos de CLI
+# -----------------
+@click.command("import-products")
+@click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--chunk-size", type=int, default=None,
+              help="Filas por transacción (por defecto IMPORT_CHUNK_SIZE).")
+@with_appcontext
+def import_products_command(csv_file, chunk_size):
+    """Importa o actualiza productos (upsert por SKU) desde un CSV."""
+    chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+    result = import_products(get_db(), csv_file, chunk_size)
+
+    for line_no, message in result.errors:
+        click.echo(f"Línea {line_no}: {message}", err=True)
+    click.echo(
+        f"{result.imported} productos importados, {len(result.errors)} errores "
+        f"({result.rows_per_second:.0f} filas/s)."
+    )
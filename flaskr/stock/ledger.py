@@ -0,0 +1,164 @@
+# flaskr/stock/ledger.py
+from datetime import date, datetime, timezone
+
+import click
+from flask.cli import with_appcontext
+from flaskr.db import get_db
+
+NOW = "strftime('%Y-%m-%dT%H:%M:%fZ','now')"
+
+
+def to_timestamp(value, end_of_day=False):
+    """Fecha/hora (date, datetime o ISO) en el formato de moved_at/taken_at."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if "T" in value or " " in value else date.fromisoformat(value)
+    if not isinstance(value, datetime):
+        suffix = "T23:59:59.999Z" if end_of_day else "T00:00:00.000Z"
+        return value.isoformat() + suffix
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+# ---------------------------------
+# Consultas
+# ---------------------------------
+def stock_at(db, product_id, at, inclusive=True):
+    """
+    Stock del producto a la fecha `at` (timestamp): el último snapshot
+    anterior más los movimientos entre ese snapshot y `at`. Con
+    `inclusive=False` no cuenta lo ocurrido exactamente en `at`.
+    """
+    op = "<=" if inclusive else "<"
+    row = db.execute(
+        f"""
+        SELECT taken_at, stock FROM stock_snapshot
+        WHERE product_id = ? AND taken_at {op} ?
+        ORDER BY taken_at DESC
+        LIMIT 1
+        """,
+        (product_id, at),
+    ).fetchone()
+    base_at, base = (row["taken_at"], row["stock"]) if row else ("", 0)
+    delta = db.execute(
+        f"""
+        SELECT COALESCE(SUM(quantity), 0) FROM stock_movement
+        WHERE product_id = ? AND moved_at > ? AND moved_at {op} ?
+        """,
+        (product_id, base_at, at),
+    ).fetchone()[0]
+    return base + delta
+
+
+def stock_range(db, product_id, date_from, date_to):
+    """
+    Stock inicial, entradas/salidas por día y stock al cierre de cada día
+    entre `date_from` y `date_to` (fechas, inclusivas).
+    """
+    start = to_timestamp(date_from)
+    end = to_timestamp(date_to, end_of_day=True)
+    opening = stock_at(db, product_id, start, inclusive=False)
+
+    days = []
+    closing = opening
+    for row in db.execute(
+        """
+        SELECT substr(moved_at, 1, 10) AS day,
+               SUM(CASE WHEN quantity > 0 THEN quantity ELSE 0 END) AS incoming,
+               -SUM(CASE WHEN quantity < 0 THEN quantity ELSE 0 END) AS outgoing
+        FROM stock_movement
+        WHERE product_id = ? AND moved_at >= ? AND moved_at <= ?
+        GROUP BY day
+        ORDER BY day
+        """,
+        (product_id, start, end),
+    ):
+        closing += row["incoming"] - row["outgoing"]
+        days.append({"day": row["day"], "in": row["incoming"], "out": row["outgoing"], "closing": closing})
+    return {"opening": opening, "days": days, "closing": closing}
+
+
+# ---------------------------------
+# Snapshots y reconstrucción
+# ---------------------------------
+SNAPSHOT_SQL = """
+    INSERT INTO stock_snapshot (product_id, taken_at, stock)
+    SELECT product_id, :at, base + delta
+    FROM (
+        SELECT p.id AS product_id,
+               s.taken_at AS base_at,
+               COALESCE(s.stock, 0) AS base,
+               (SELECT COALESCE(SUM(m.quantity), 0) FROM stock_movement m
+                WHERE m.product_id = p.id
+                  AND m.moved_at > COALESCE(s.taken_at, '') AND m.moved_at <= :at) AS delta
+        FROM product p
+        LEFT JOIN stock_snapshot s
+          ON s.product_id = p.id
+         AND s.taken_at = (SELECT MAX(taken_at) FROM stock_snapshot
+                           WHERE product_id = p.id AND taken_at <= :at)
+    )
+    WHERE delta <> 0 OR base_at IS NULL
+"""
+
+
+def take_snapshot(db, at=None):
+    """
+    Guarda el stock a `at` (por defecto, ahora) de los productos con
+    movimientos desde su último snapshot. Devuelve cuántos se guardaron.
+    """
+    if at is None:
+        at = db.execute(f"SELECT {NOW}").fetchone()[0]
+    count = db.execute(SNAPSHOT_SQL, {"at": at}).rowcount
+    db.commit()
+    return count
+
+
+def rebuild_ledger(db):
+    """
+    Regenera el ledger desde compras y ventas, con un INITIAL por producto
+    que cubre la diferencia con current_stock (stock cargado a mano o
+    previo al ledger). Borra los snapshots.
+    """
+    db.execute("DELETE FROM stock_snapshot")
+    db.execute("DELETE FROM stock_movement")
+    db.execute("""
+        INSERT INTO stock_movement (product_id, kind, quantity, moved_at)
+        SELECT p.id, 'INITIAL',
+               p.current_stock
+                 - COALESCE((SELECT SUM(quantity) FROM shopping WHERE product_id = p.id), 0)
+                 + COALESCE((SELECT SUM(quantity) FROM sales WHERE product_id = p.id), 0) AS qty,
+               p.created_at
+        FROM product p
+        WHERE qty <> 0
+    """)
+    db.execute("""
+        INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+        SELECT product_id, 'PURCHASE', quantity, id, purchase_date FROM shopping
+    """)
+    db.execute("""
+        INSERT INTO stock_movement (product_id, kind, quantity, ref_id, moved_at)
+        SELECT product_id, 'SALE', -quantity, id, sale_date FROM sales
+    """)
+    db.commit()
+
+
+# -----------------
+# Comandos de CLI
+# -----------------
+@click.command("snapshot-stock")
+@with_appcontext
+def snapshot_stock_command():
+    """Toma un snapshot del stock de los productos con movimientos nuevos."""
+    count = take_snapshot(get_db())
+    click.echo(f"Snapshots guardados: {count}")
+
+
+@click.command("backfill-ledger")
+@with_appcontext
+def backfill_ledger_command():
+    """Reconstruye el ledger de stock desde compras/ventas y toma un snapshot."""
+    db = get_db()
+    rebuild_ledger(db)
+    movements = db.execute("SELECT COUNT(*) FROM stock_movement").fetchone()[0]
+    count = take_snapshot(db)
+    click.echo(f"Ledger reconstruido ({movements} movimientos, {count} snapshots).")
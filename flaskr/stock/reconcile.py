@@ -0,0 +1,159 @@
+# flaskr/stock/reconcile.py
+import click
+from flask.cli import with_appcontext
+from flaskr.db import get_db
+
+# Stock según el ledger de cada producto; un solo GROUP BY sobre el índice
+# (product_id, moved_at, quantity), sin recorrer la tabla por producto.
+LEDGER_SQL = """
+    SELECT p.id AS product_id, p.current_stock, COALESCE(l.stock, 0) AS ledger_stock
+    FROM product p
+    LEFT JOIN (SELECT product_id, SUM(quantity) AS stock
+               FROM stock_movement GROUP BY product_id) l ON l.product_id = p.id
+    WHERE p.current_stock <> COALESCE(l.stock, 0)
+"""
+
+# Productos con movimientos o cambios posteriores a la marca de agua
+# (coincidan o no: los que ya no difieren cierran su diferencia abierta)
+INCREMENTAL_SQL = """
+    WITH touched(product_id) AS (
+        SELECT product_id FROM stock_movement WHERE id > :movement_id
+        UNION
+        SELECT id FROM product WHERE updated_at >= :updated_at
+    )
+    SELECT p.id AS product_id, p.current_stock,
+           (SELECT COALESCE(SUM(quantity), 0) FROM stock_movement
+            WHERE product_id = p.id) AS ledger_stock
+    FROM touched t JOIN product p ON p.id = t.product_id
+"""
+
+
+def reconcile_stock(db, full=False):
+    """
+    Compara current_stock con la suma del ledger (stock_movement) y deja
+    las diferencias abiertas en stock_discrepancy. La primera corrida (o
+    con `full=True`) revisa todo el catálogo; las siguientes solo los
+    productos tocados desde la marca de agua guardada.
+
+    Devuelve {"mode", "checked", "discrepancies": [...]}, con todas las
+    diferencias abiertas (también las detectadas en corridas anteriores).
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        state = None if full else db.execute(
+            "SELECT last_movement_id, last_updated_at FROM stock_reconcile_state WHERE id = 1"
+        ).fetchone()
+        # Con el lock de escritura tomado nada cambia durante la revisión; lo
+        # que llegue después tiene id mayor o updated_at >= la hora de corrida
+        movement_id, now = db.execute("""
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM stock_movement),
+                   strftime('%Y-%m-%dT%H:%M:%fZ','now')
+        """).fetchone()
+
+        if state is None:
+            mode = "full"
+            checked = db.execute("SELECT COUNT(*) FROM product").fetchone()[0]
+            rows = db.execute(LEDGER_SQL).fetchall()
+            db.execute("DELETE FROM stock_discrepancy")
+        else:
+            mode = "incremental"
+            touched = db.execute(
+                INCREMENTAL_SQL, {"movement_id": state[0], "updated_at": state[1]}
+            ).fetchall()
+            checked = len(touched)
+            rows = [r for r in touched if r["current_stock"] != r["ledger_stock"]]
+            db.executemany("DELETE FROM stock_discrepancy WHERE product_id = ?",
+                           [(r["product_id"],) for r in touched])
+            # Productos eliminados desde la última corrida
+            db.execute("DELETE FROM stock_discrepancy "
+                       "WHERE product_id NOT IN (SELECT id FROM product)")
+
+        db.executemany(
+            "INSERT INTO stock_discrepancy (product_id, current_stock, ledger_stock) VALUES (?, ?, ?)",
+            [tuple(r) for r in rows],
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO stock_reconcile_state "
+            "(id, last_movement_id, last_updated_at, last_run_at) VALUES (1, ?, ?, ?)",
+            (movement_id, now, now),
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"mode": mode, "checked": checked, "discrepancies": open_discrepancies(db)}
+
+
+def open_discrepancies(db):
+    return [dict(r) for r in db.execute("""
+        SELECT d.product_id, p.name, d.current_stock, d.ledger_stock,
+               d.current_stock - d.ledger_stock AS difference, d.detected_at
+        FROM stock_discrepancy d
+        JOIN product p ON p.id = d.product_id
+        ORDER BY d.product_id
+    """)]
+
+
+def repair_discrepancies(db, keep_stock=False, note="Conciliación"):
+    """
+    Corrige las diferencias abiertas. Por defecto manda el ledger:
+    current_stock pasa a ser la suma de movimientos. Con `keep_stock=True`
+    manda current_stock (p. ej. un conteo físico cargado a mano) y se
+    registra un ADJUSTMENT por la diferencia. Devuelve cuántas se corrigieron.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        rows = db.execute("""
+            SELECT d.product_id, p.current_stock, d.ledger_stock
+            FROM stock_discrepancy d JOIN product p ON p.id = d.product_id
+            WHERE p.current_stock = d.current_stock
+        """).fetchall()
+        repaired = 0
+        for product_id, current, ledger in rows:
+            if keep_stock:
+                # trg_stock_movement_adjustment suma el ajuste a current_stock:
+                # se lleva primero al valor del ledger (o se restaura después)
+                # para que current_stock nunca quede negativo en el medio.
+                if ledger > current:
+                    db.execute("UPDATE product SET current_stock = ? WHERE id = ?", (ledger, product_id))
+                db.execute(
+                    "INSERT INTO stock_movement (product_id, kind, quantity, note) "
+                    "VALUES (?, 'ADJUSTMENT', ?, ?)",
+                    (product_id, current - ledger, note),
+                )
+                if ledger < current:
+                    db.execute("UPDATE product SET current_stock = ? WHERE id = ?", (current, product_id))
+            elif ledger < 0:
+                continue   # el ledger no puede dejar stock negativo: revisar a mano
+            else:
+                db.execute("UPDATE product SET current_stock = ? WHERE id = ?", (ledger, product_id))
+            db.execute("DELETE FROM stock_discrepancy WHERE product_id = ?", (product_id,))
+            repaired += 1
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return repaired
+
+
+# -----------------
+# Comando de CLI
+# -----------------
+@click.command("reconcile-stock")
+@click.option("--full", is_flag=True, help="Revisa todo el catálogo, ignorando la marca de agua.")
+@click.option("--repair", is_flag=True, help="Corrige las diferencias (manda el ledger).")
+@click.option("--keep-stock", is_flag=True,
+              help="Con --repair: manda current_stock y se registra un ajuste en el ledger.")
+@with_appcontext
+def reconcile_stock_command(full, repair, keep_stock):
+    """Compara current_stock con el ledger de movimientos y reporta diferencias."""
+    db = get_db()
+    result = reconcile_stock(db, full=full)
+    click.echo(f"Revisión {result['mode']}: {result['checked']} productos, "
+               f"{len(result['discrepancies'])} diferencias abiertas.")
+    for d in result["discrepancies"]:
+        click.echo(f"  #{d['product_id']} {d['name']}: stock {d['current_stock']}, "
+                   f"ledger {d['ledger_stock']} ({d['difference']:+d})")
+    if repair and result["discrepancies"]:
+        count = repair_discrepancies(db, keep_stock=keep_stock)
+        click.echo(f"Corregidas: {count}")
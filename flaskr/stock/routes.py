@@ -1,40 +1,83 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flaskr.security import roles_required
-from flaskr.db import get_db
+import io
+from datetime import date
+from itertools import islice
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort, g
+from flaskr.security import roles_required, token_required
+from flaskr.db import get_db, get_read_db
+from flaskr.export import export_response
+from flaskr.conditional import conditional_get
+from flaskr.streaming import LazyRows, stream_page
+from .importer import import_products
+from .catalog import get_catalog, stock_fingerprint, with_stock
+from .search import search_products
+from .changes import changes_since
+from .ledger import stock_at, stock_range, to_timestamp
+from .reconcile import open_discrepancies, reconcile_stock, repair_discrepancies
 
 bp = Blueprint("stock", __name__, url_prefix="/stock")
 
+SEARCH_MAX_RESULTS = 50
+CHANGES_MAX_LIMIT = 1000
+
 # 🧾 1️⃣ Vista de CONSULTA (para USER y ADMIN)
 @bp.route('/consult', methods=('GET', 'POST'))
 @roles_required('USER', 'ADMIN')
+@conditional_get(stock_fingerprint)
 def consult():
     """
     Vista para consultar productos (USER o ADMIN)
     - El usuario tipo USER solo puede ver el stock y precios.
     - El ADMIN también puede acceder, pero para acciones avanzadas usa /list.
+    - Con ?q= busca en el índice FTS; sin búsqueda muestra los primeros
+      CONSULT_LIMIT productos por nombre.
     """
-    db = get_db()
-    productos = db.execute(
-        "SELECT id, name, category, current_stock, sale_price "
-        "FROM product ORDER BY name"
-    ).fetchall()
-    return render_template('stock/consult.html', productos=productos)
+    db = get_read_db()
+    q = (request.args.get('q') or '').strip()
+    limit = current_app.config['CONSULT_LIMIT']
+    if q:
+        productos = search_products(db, q, limit)
+    else:
+        productos = with_stock(islice(get_catalog(), limit), db)
+    return render_template('stock/consult.html', productos=productos, q=q, limit=limit)
+
+
+# 🔎 Autocompletado (JSON) para los formularios de venta/compra
+@bp.get("/search")
+@roles_required("USER", "ADMIN")
+def search():
+    """Busca por prefijo en nombre, categoría y SKU: ?q=texto&limit=N."""
+    limit = request.args.get("limit", 10, type=int)
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    rows = search_products(get_read_db(), request.args.get("q", ""), limit)
+    return jsonify({"items": [dict(r) for r in rows]})
+
+
+# 🔄 Feed de cambios para clientes que replican el catálogo (token Bearer)
+@bp.get("/changes")
+@token_required
+def changes():
+    """Altas, modificaciones y bajas desde ?cursor= (vacío: catálogo completo)."""
+    limit = request.args.get("limit", 500, type=int)
+    limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+    items, cursor, has_more = changes_since(get_read_db(), request.args.get("cursor"), limit)
+    return jsonify(changes=items, cursor=cursor, has_more=has_more)
 
 
 # 🧩 2️⃣ Vista de LISTADO COMPLETO (solo ADMIN)
 @bp.get("/list")
 @roles_required("ADMIN")
+@conditional_get(stock_fingerprint)
 def list():
     """
     Panel completo de gestión de stock (solo ADMIN)
     Permite ver, editar y eliminar productos.
     """
-    db = get_db()
-    productos = db.execute(
+    db = get_read_db()
+    productos = LazyRows(db.execute(
         "SELECT id, name, category, current_stock, sale_price, purchase_price "
         "FROM product ORDER BY name"
-    ).fetchall()
-    return render_template("stock/list.html", productos=productos)
+    ))
+    return stream_page("stock/list.html", productos=productos)
 
 
 @bp.route("/new", methods=["GET", "POST"])
@@ -64,6 +107,24 @@ def create():
     return render_template("stock/form.html", mode="new")
 
 
+# 📥 Importación masiva desde CSV (solo ADMIN)
+@bp.route("/import", methods=["GET", "POST"])
+@roles_required("ADMIN")
+def import_csv():
+    """Carga un catálogo CSV en lotes (upsert por SKU) y muestra el resumen."""
+    result = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if upload is None or not upload.filename:
+            flash("⚠️ Seleccioná un archivo CSV.", "warning")
+        else:
+            stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+            result = import_products(get_db(), stream, current_app.config["IMPORT_CHUNK_SIZE"])
+            flash(f"✅ {result.imported} productos importados.", "success")
+
+    return render_template("stock/import.html", result=result)
+
+
 # ✏️ Editar producto
 @bp.route("/edit/<int:id>", methods=["GET", "POST"])
 @roles_required("ADMIN")
@@ -81,11 +142,20 @@ def edit(id):
         precio_compra = float(request.form.get("sale_price", "0") or 0)
         precio_venta = float(request.form.get("purchase_price", "0") or 0)
 
+        stock = int(request.form.get("current_stock", producto["current_stock"]) or 0)
+
         db.execute("""
             UPDATE product
             SET name = ?, category = ?, sale_price = ?, purchase_price = ?
             WHERE id = ?
         """, (nombre, categoria, precio_compra, precio_venta, id))
+        # Un cambio de stock a mano queda como ajuste en el ledger
+        # (trg_stock_movement_adjustment actualiza current_stock)
+        if stock != producto["current_stock"] and stock >= 0:
+            db.execute(
+                "INSERT INTO stock_movement (product_id, kind, quantity, note) VALUES (?, 'ADJUSTMENT', ?, ?)",
+                (id, stock - producto["current_stock"], f"Edición manual ({g.user['username']})"),
+            )
         db.commit()
 
         flash("✅ Producto actualizado.", "success")
@@ -112,3 +182,60 @@ def delete(id):
         return redirect(url_for("stock.list"))
 
     return render_template("stock/delete.html", producto=producto)
+
+
+# 📒 Stock histórico desde el ledger (solo ADMIN)
+@bp.get("/<int:id>/stock-at")
+@roles_required("ADMIN")
+def stock_at_date(id):
+    """Stock del producto a ?at= (AAAA-MM-DD cuenta hasta el final del día)."""
+    try:
+        at = to_timestamp(request.args.get("at", ""), end_of_day=True)
+    except ValueError:
+        abort(400, description="Fecha inválida (usar AAAA-MM-DD o AAAA-MM-DDTHH:MM).")
+    return jsonify(product_id=id, at=at, stock=stock_at(get_read_db(), id, at))
+
+
+@bp.get("/<int:id>/movements")
+@roles_required("ADMIN")
+def movements(id):
+    """Stock inicial, entradas/salidas por día y cierre entre ?from= y ?to=."""
+    try:
+        date_from = date.fromisoformat(request.args.get("from", ""))
+        date_to = date.fromisoformat(request.args.get("to", ""))
+    except ValueError:
+        abort(400, description="Fechas inválidas (usar ?from=AAAA-MM-DD&to=AAAA-MM-DD).")
+    return jsonify(product_id=id, **stock_range(get_read_db(), id, date_from, date_to))
+
+
+# 🧮 Conciliación de current_stock contra el ledger (solo ADMIN)
+@bp.get("/reconcile")
+@roles_required("ADMIN")
+def reconcile_report():
+    """Diferencias abiertas detectadas por la última conciliación."""
+    db = get_read_db()
+    state = db.execute("SELECT last_run_at FROM stock_reconcile_state WHERE id = 1").fetchone()
+    return jsonify(last_run_at=state["last_run_at"] if state else None,
+                   discrepancies=open_discrepancies(db))
+
+
+@bp.post("/reconcile")
+@roles_required("ADMIN")
+def reconcile():
+    """Corre la conciliación (?full=1 revisa todo; ?repair=1 corrige, ?keep_stock=1 manda el stock)."""
+    db = get_db()
+    result = reconcile_stock(db, full=request.args.get("full", type=int) == 1)
+    if request.args.get("repair", type=int) == 1:
+        result["repaired"] = repair_discrepancies(
+            db, keep_stock=request.args.get("keep_stock", type=int) == 1,
+            note=f"Conciliación ({g.user['username']})",
+        )
+        result["discrepancies"] = open_discrepancies(db)
+    return jsonify(result)
+
+
+# ⬇️ Exportación en streaming del catálogo (solo ADMIN)
+@bp.get("/export")
+@roles_required("ADMIN")
+def export():
+    return export_response("products")
@@ -0,0 +1,37 @@
+# flaskr/stock/search.py
+import re
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Pesos de bm25 por columna: name, category, sku
+_RANK = "bm25(product_fts, 10.0, 1.0, 5.0)"
+
+
+def match_query(text, max_terms=8):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura: cada
+    palabra entre comillas (sin operadores) y con `*` para buscar por
+    prefijo. Devuelve None si no quedó ninguna palabra.
+    """
+    terms = _TOKEN.findall(text or "")[:max_terms]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_products(db, text, limit):
+    """Productos que coinciden con `text`, del más relevante al menos."""
+    query = match_query(text)
+    if query is None:
+        return []
+    return db.execute(
+        f"""
+        SELECT p.id, p.sku, p.name, p.category, p.sale_price, p.current_stock
+        FROM product_fts
+        JOIN product p ON p.id = product_fts.rowid
+        WHERE product_fts MATCH ?
+        ORDER BY {_RANK}, p.name
+        LIMIT ?
+        """,
+        (query, limit),
+    ).fetchall()
@@ -0,0 +1,55 @@
+# flaskr/streaming.py
+from flask import current_app, get_flashed_messages, stream_template
+
+
+class LazyRows:
+    """
+    Filas de un cursor que se leen mientras se renderiza la plantilla.
+
+    Solo adelanta la primera fila, para que `{% if filas %}` funcione sin
+    materializar la consulta; el resto sale del cursor a medida que el
+    `{% for %}` avanza.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._first = cursor.fetchone()
+
+    def __bool__(self):
+        return self._first is not None
+
+    def __iter__(self):
+        if self._first is None:
+            return
+        first, self._first = self._first, None
+        yield first
+        yield from self._cursor
+
+
+def _buffered(chunks, size):
+    # Jinja emite un fragmento por nodo; se agrupan para no mandar miles de
+    # chunks HTTP de pocos bytes
+    buf, length = [], 0
+    for chunk in chunks:
+        buf.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buf)
+            buf, length = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+def stream_page(template_name, **context):
+    """
+    Renderiza `template_name` en streaming (transferencia chunked): el
+    navegador recibe el encabezado de la página enseguida y las filas a
+    medida que se leen, con memoria constante aunque el listado sea largo.
+    """
+    # La cookie de sesión sale con los headers, antes que el cuerpo: los
+    # flash se consumen acá para que el render no los deje pendientes.
+    get_flashed_messages()
+    chunks = stream_template(template_name, **context)
+    return current_app.response_class(
+        _buffered(chunks, current_app.config["STREAM_BUFFER_BYTES"]), mimetype="text/html",
+    )
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flaskr.security import login_required, roles_required
-from flaskr.db import get_db
+from flaskr.db import get_db, get_read_db, pool_stats
+from flaskr.auth import get_user_cache, invalidate_user
+from flaskr.hashing import get_hasher
+from flaskr.writequeue import get_write_queue
 
 bp = Blueprint("users", __name__, url_prefix="/users")
 
@@ -12,17 +15,20 @@ def perfil():
 @bp.get("/admin")
 @roles_required("ADMIN")
 def admin_panel():
-    db = get_db()
+    db = get_read_db()
     # Ejemplo de métricas rápidas (ajustá a tus tablas reales)
     total_users = db.execute("SELECT COUNT(*) AS c FROM user").fetchone()["c"]
     admins = db.execute("SELECT COUNT(*) AS c FROM user WHERE role='ADMIN'").fetchone()["c"]
-    return render_template('users/admin.html', total_users=total_users, admins=admins)
+    return render_template('users/admin.html', total_users=total_users, admins=admins,
+                           pool=pool_stats(), user_cache=get_user_cache().stats(),
+                           hasher=get_hasher().stats(),
+                           write_queue=get_write_queue().stats() if current_app.config["WRITE_QUEUE_ENABLED"] else None)
 
 # flaskr/users/routes.py (continuación)
 @bp.get("/manage")
 @roles_required("ADMIN")
 def manage():
-    users = get_db().execute("SELECT id, firstname, lastname, email, username, role, status FROM user ORDER BY id").fetchall()
+    users = get_read_db().execute("SELECT id, firstname, lastname, email, username, role, status FROM user ORDER BY id").fetchall()
     return render_template("users/manage.html", users=users)
 
 @bp.post("/set-role/<int:user_id>")
@@ -35,6 +41,7 @@ def set_role(user_id):
     db = get_db()
     db.execute("UPDATE user SET role=? WHERE id=?", (role, user_id))
     db.commit()
+    invalidate_user(user_id)
     flash("Rol actualizado", "success")
     return redirect(url_for("users.manage"))
 
@@ -49,5 +56,6 @@ def toggle_status(user_id):
     new_status = "SUSPENDED" if row["status"] == "ACTIVE" else "ACTIVE"
     db.execute("UPDATE user SET status=? WHERE id=?", (new_status, user_id))
     db.commit()
+    invalidate_user(user_id)
     flash(f"Estado cambiado a {new_status}", "success")
     return redirect(url_for("users.manage"))
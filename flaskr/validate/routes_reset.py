@@ -1,18 +1,16 @@
 # flaskr/validate/routes_reset.py
-from flask import render_template, request, redirect, url_for, flash
-from werkzeug.security import generate_password_hash
+from flask import render_template, request, redirect, url_for, flash, current_app
 from . import bp
 from ..db import get_db
+from ..auth import invalidate_user
+from ..hashing import hash_password
+from ..outbox import enqueue_mail, wake_worker
 from .tokens import generate_reset_token, verify_reset_token
 
-# Si usás Flask-Mail, asegurate que mail esté inicializado en flaskr/__init__.py
-# y expuesto como 'mail' en el paquete (from . import mail)
-try:
-    from .. import mail
-    from flask_mail import Message
-    _MAIL_ENABLED = True
-except Exception:
-    _MAIL_ENABLED = False
+
+def _mail_configured() -> bool:
+    # Sin servidor o sin cuenta (MAIL_USERNAME en .env) no hay cómo enviar
+    return bool(current_app.config.get("MAIL_SERVER") and current_app.config.get("MAIL_USERNAME"))
 
 def _find_user_by_email(db, email: str):
     return db.execute("SELECT id, email FROM user WHERE email = ?", (email,)).fetchone()
@@ -20,6 +18,7 @@ def _find_user_by_email(db, email: str):
 def _update_user_password(db, user_id: int, pwd_hash: str):
     db.execute("UPDATE user SET password_hash = ? WHERE id = ?", (pwd_hash, user_id))
     db.commit()
+    invalidate_user(user_id)
 
 @bp.get("/forgot")
 def forgot_password_form():
@@ -40,16 +39,16 @@ def forgot_password_submit():
         # Usa endpoint del mismo blueprint
         reset_url = url_for("validate.reset_password_form", token=token, _external=True)
 
-        if _MAIL_ENABLED:
-            try:
-                msg = Message(
-                    subject="Restablecer contraseña",
-                    recipients=[email],
-                    body=f"Para restablecer tu contraseña, hacé clic: {reset_url}\n\nEste enlace expira en 1 hora."
-                )
-                mail.send(msg)
-            except Exception:
-                print("LINK DE RECUPERACIÓN:", reset_url)
+        if _mail_configured():
+            # Se encola y se responde al instante; lo envía el worker de la bandeja
+            enqueue_mail(
+                db,
+                recipients=[email],
+                subject="Restablecer contraseña",
+                body=f"Para restablecer tu contraseña, hacé clic: {reset_url}\n\nEste enlace expira en 1 hora."
+            )
+            db.commit()
+            wake_worker()
         else:
             # Entorno desarrollo (sin Mail)
             print("LINK DE RECUPERACIÓN:", reset_url)
@@ -81,7 +80,7 @@ def reset_password_submit(token):
         flash("La contraseña debe tener al menos 8 caracteres y coincidir.", "danger")
         return redirect(url_for("validate.reset_password_form", token=token))
 
-    pwd_hash = generate_password_hash(pwd)
+    pwd_hash = hash_password(pwd)
     db = get_db()
     _update_user_password(db, user_id, pwd_hash)
 
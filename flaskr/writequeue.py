@@ -0,0 +1,235 @@
+# flaskr/writequeue.py
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+
+from flaskr.db import _connect_db, get_db
+
+_STOP = object()
+
+
+class WriteQueueUnavailable(sqlite3.OperationalError):
+    """La cola está cerrada, su hilo escritor se cayó o no respondió a tiempo."""
+
+
+class WriteQueue:
+    """
+    Cola de escrituras con group commit (opcional, WRITE_QUEUE_ENABLED).
+
+    Un único hilo escritor, con su propia conexión, toma lo encolado y lo
+    ejecuta en una sola transacción `BEGIN IMMEDIATE`: junta hasta
+    `max_batch` operaciones o hasta que pasen `max_delay` segundos desde
+    la primera, y hace un solo COMMIT (un solo fsync del WAL) por lote.
+    Cada operación corre en su propio SAVEPOINT, así que una que falla se
+    deshace sola sin afectar al resto del lote.
+
+    Las operaciones son funciones `fn(db, *args)` que no manejan la
+    transacción (p. ej. `apply_sales`); el llamador recibe su resultado o
+    su excepción como si la hubiera ejecutado él. Nadie espera más de
+    `timeout` segundos: si el hilo escritor no puede conectarse o se cae,
+    lo pendiente falla con WriteQueueUnavailable y la cola queda cerrada.
+    """
+
+    def __init__(self, connect, max_batch=64, max_delay=0.005, timeout=None):
+        self._connect = connect
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self.pid = os.getpid()
+
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._commit_ms = 0.0
+
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        """Encola `fn(db, *args)` y espera su resultado (o relanza su excepción)."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise WriteQueueUnavailable("La cola de escritura está cerrada.")
+            self._queue.put((fn, args, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Si el escritor todavía no la tomó se descarta; si ya la está
+            # ejecutando, su resultado queda sin confirmar para el llamador.
+            applied = "no se aplicó" if future.cancel() else "sin confirmación"
+            raise WriteQueueUnavailable(
+                f"La cola de escritura no respondió en {self.timeout} s ({applied})."
+            ) from None
+
+    def _collect(self):
+        """Primer item (bloqueante) + lo que llegue dentro del presupuesto de latencia."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        try:
+            db = self._connect()
+        except Exception as e:
+            self._fail(e)
+            return
+        batch = None
+        try:
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    return
+                self._apply(db, batch)
+                batch = None
+        except Exception as e:
+            self._fail(e, batch)
+        finally:
+            db.close()
+
+    def _fail(self, error, batch=None):
+        """El hilo escritor no sigue: cierra la cola y rechaza todo lo pendiente."""
+        with self._lock:
+            self._closed = True
+            pending = list(batch or ())
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    pending.append(item)
+        for _, _, future in pending:
+            if not future.done():
+                exc = WriteQueueUnavailable(f"El hilo de la cola de escritura falló: {error}")
+                exc.__cause__ = error
+                future.set_exception(exc)
+
+    def _apply(self, db, batch):
+        # Las que el llamador ya abandonó (timeout) no se ejecutan
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            for fn, args, _ in batch:
+                db.execute("SAVEPOINT wq_item")
+                try:
+                    results.append((True, fn(db, *args)))
+                except Exception as e:
+                    db.execute("ROLLBACK TO wq_item")
+                    results.append((False, e))
+                finally:
+                    db.execute("RELEASE wq_item")
+            start = time.perf_counter()
+            db.commit()
+            commit_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            # Falló el BEGIN o el COMMIT: no quedó nada escrito
+            if db.in_transaction:
+                db.rollback()
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._commit_ms += commit_ms
+        for (_, _, future), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def close(self):
+        """Termina lo encolado y detiene el hilo escritor; después, submit() falla."""
+        with self._lock:
+            self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch": self._max_batch_seen,
+                "avg_commit_ms": round(self._commit_ms / self._batches, 3) if self._batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+
+_queue_lock = threading.Lock()
+
+
+def get_write_queue(app=None):
+    """Cola de este proceso; se crea al primer uso (y de nuevo tras un fork o si se cerró)."""
+    app = app or current_app._get_current_object()
+    wq = app.extensions.get("write_queue")
+    if wq is not None and wq.pid == os.getpid() and not wq.closed:
+        return wq
+    with _queue_lock:
+        wq = app.extensions.get("write_queue")
+        if wq is None or wq.pid != os.getpid() or wq.closed:
+            path = app.config["DATABASE"]
+            wq = WriteQueue(
+                lambda: _connect_db(path),
+                max_batch=app.config["WRITE_QUEUE_MAX_BATCH"],
+                max_delay=app.config["WRITE_QUEUE_MAX_DELAY_MS"] / 1000,
+                timeout=app.config["DB_POOL_TIMEOUT"],
+            )
+            app.extensions["write_queue"] = wq
+            atexit.register(wq.close)
+    return wq
+
+
+def run_write(fn, *args):
+    """
+    Ejecuta `fn(db, *args)` en una transacción de escritura: por la cola
+    (group commit) si WRITE_QUEUE_ENABLED, o directo con la conexión de la
+    request. Si `fn` lanza una excepción no queda nada escrito.
+    """
+    if current_app.config["WRITE_QUEUE_ENABLED"]:
+        return get_write_queue().submit(fn, *args)
+
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(db, *args)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
@@ -0,0 +1,22 @@
+# gunicorn.conf.py — gunicorn lo carga solo si se arranca desde la raíz del proyecto:
+#   gunicorn run:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+
+def on_starting(server):
+    """Bootstrap de la base una sola vez, en el master, antes de crear workers."""
+    from flaskr import create_app
+    from flaskr.db import bootstrap
+
+    bootstrap(create_app())
+
+
+def post_worker_init(worker):
+    """Cada worker retoma los mails que quedaron pendientes antes del reinicio."""
+    from flaskr.outbox import resume_worker
+
+    resume_worker(worker.wsgi)
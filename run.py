@@ -1,9 +1,13 @@
 import os
 from flask import Flask
 from flaskr import create_app  # o la función donde creas tu app
+from flaskr.db import bootstrap
+from flaskr.outbox import resume_worker
 
 app = create_app()
 
 if __name__ == "__main__":
+    bootstrap(app)  # una sola vez; con gunicorn lo hace on_starting (gunicorn.conf.py)
+    resume_worker(app)  # mails pendientes de antes del reinicio; con gunicorn, post_worker_init
     port = int(os.environ.get("PORT", 5000))  # ✅ usa el puerto que Render define
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
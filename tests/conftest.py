@@ -1,22 +1,78 @@
 import os
-import tempfile
+import sqlite3
 
 import pytest
 from flaskr import create_app
-from flaskr.db import get_db, init_db
+from flaskr.db import _connect_db, get_db, init_db
+from flaskr.migrations import migrate
+
+_SCHEMA = os.path.join(os.path.dirname(__file__), '..', 'flaskr', 'schema.sql')
 
 with open(os.path.join(os.path.dirname(__file__), 'data.sql'), 'rb') as f:
     _data_sql = f.read().decode('utf8')
 
 
+def _create_schema(conn):
+    with open(_SCHEMA, encoding='utf8') as f:
+        conn.executescript(f.read())
+    migrate(conn)
+
+
+@pytest.fixture
+def schema_db():
+    """Base en memoria con schema.sql y todas las migraciones, sin datos."""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    _create_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def schema_db_path(tmp_path):
+    """Igual que schema_db pero en un archivo (para conexiones desde otros hilos)."""
+    path = str(tmp_path / 'schema.sqlite')
+    conn = _connect_db(path)
+    _create_schema(conn)
+    conn.close()
+    return path
+
+
+def _add_seller(conn):
+    # Usuario id 1, el created_by de las ventas y compras de los tests
+    conn.execute(
+        "INSERT INTO user (firstname, lastname, email, username, password_hash) "
+        "VALUES ('T', 'T', 't@example.com', 'test', ?)", ('x' * 60,)
+    )
+    conn.commit()
+
+
+@pytest.fixture
+def seller_db(schema_db):
+    """schema_db con un usuario (id 1) para registrar ventas y compras."""
+    _add_seller(schema_db)
+    return schema_db
+
+
 @pytest.fixture
-def app():
-    db_fd, db_path = tempfile.mkstemp()
+def seller_db_path(schema_db_path):
+    """schema_db_path con el mismo usuario que seller_db."""
+    conn = _connect_db(schema_db_path)
+    _add_seller(conn)
+    conn.close()
+    return schema_db_path
 
+
+@pytest.fixture
+def app(tmp_path):
     app = create_app({
         'TESTING': True,
-        'DATABASE': db_path,
+        'DATABASE': str(tmp_path / 'app.sqlite'),
+        'HASH_EXECUTOR': 'inline',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',   # el de data.sql: sin re-hash al loguear
     })
+    # create_app fija las claves de CSRF después de aplicar la config
+    app.config['WTF_CSRF_ENABLED'] = False
 
     with app.app_context():
         init_db()
@@ -24,8 +80,10 @@ def app():
 
     yield app
 
-    os.close(db_fd)
-    os.unlink(db_path)
+    for key in ('db_pool', 'db_read_pool'):
+        pool = app.extensions.pop(key, None)
+        if pool is not None:
+            pool.close()
 
 
 @pytest.fixture
@@ -53,4 +111,4 @@ class AuthActions(object):
 
 @pytest.fixture
 def auth(client):
-    return AuthActions(client)
\ No newline at end of file
+    return AuthActions(client)
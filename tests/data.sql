@@ -1,8 +1,22 @@
-INSERT INTO user (username, password)
+-- Datos de prueba (contraseña = usuario; PASSWORD_HASH_METHOD del fixture `app`)
+INSERT INTO user (firstname, lastname, email, username, password_hash, role)
 VALUES
-  ('test', 'pbkdf2:sha256:50000$TCI4GzcX$0de171a4f4dac32e3364c7ddc7c14f3e2fa61f2d17574483f7ffbb431b4acb2f'),
-  ('other', 'pbkdf2:sha256:50000$kJPKsz6N$d2d4784f1b030a9761f5ccaeeaca413f27f2ecb76d6168407af962ddce849f79');
+  ('Test', 'User', 'test@example.com', 'test', 'pbkdf2:sha256:1000$hQBhFplao3yeRtr0$b2fb5bf3f84c227ab4b82f1d544f89c65c41707ecd17c4dda3d733729aa0f39b', 'USER'),
+  ('Other', 'User', 'other@example.com', 'other', 'pbkdf2:sha256:1000$9vBmo3H7CMaCY0Xz$20ec257f3108ca8c521cb7ec33fa211de73781f622608eed9f6bd9c7c76d4f05', 'USER'),
+  ('Admin', 'Root', 'admin@example.com', 'admin', 'pbkdf2:sha256:1000$zCBJoCNulD7sKyrV$04a8f33a616049bc68b138d82f98be1ae18bb638857aabd6066391d669582f32', 'ADMIN');
 
-INSERT INTO post (title, body, author_id, created)
+INSERT INTO product (sku, name, category, current_stock, sale_price, purchase_price)
 VALUES
-  ('test title', 'test' || x'0a' || 'body', 1, '2018-01-01 00:00:00');
\ No newline at end of file
+  ('YM-1', 'Yerba mate', 'Almacén', 20, 900, 600),
+  ('CF-1', 'Café molido', 'Almacén', 10, 1500, 1000),
+  ('LE-1', 'Leche', 'Lácteos', 30, 500, 300);
+
+INSERT INTO shopping (product_id, quantity, unit_price, purchase_date, created_by)
+VALUES
+  (2, 5, 1000, '2024-01-01T09:00:00.000Z', 3);
+
+INSERT INTO sales (product_id, quantity, unit_price, sale_date, created_by)
+VALUES
+  (1, 2, 900, '2024-01-02T10:00:00.000Z', 1),
+  (3, 1, 500, '2024-01-03T11:00:00.000Z', 1),
+  (1, 1, 900, '2024-01-03T12:00:00.000Z', 2);
@@ -52,4 +52,59 @@ def test_logout(client, auth):
 
     with client:
         auth.logout()
-        assert 'user_id' not in session
\ No newline at end of file
+        assert 'user_id' not in session
+
+def test_cached_user_is_reloaded_when_another_worker_changes_it(tmp_path):
+    from flaskr import create_app
+    from flaskr.db import bootstrap
+
+    # Dos apps sobre la misma base: cada una con su propio cache, como dos
+    # workers de gunicorn
+    config = {'TESTING': True, 'HASH_EXECUTOR': 'inline', 'DATABASE': str(tmp_path / 'workers.sqlite')}
+    worker_a, worker_b = create_app(config), create_app(config)
+    for app in (worker_a, worker_b):
+        app.config['WTF_CSRF_ENABLED'] = False
+    bootstrap(worker_a)
+    with worker_a.app_context():
+        db = get_db()
+        db.execute(
+            "INSERT INTO user (firstname, lastname, email, username, password_hash, role) "
+            "SELECT 'Otro', 'Admin', 'otro@example.com', 'otro', password_hash, 'ADMIN' "
+            "FROM user WHERE username = 'admin'"
+        )
+        db.commit()
+
+    client = worker_a.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    assert client.get('/users/manage').status_code == 200   # queda en el cache de A
+
+    # B degrada al usuario; A no se entera por invalidate_user
+    other = worker_b.test_client()
+    other.post('/auth/login', data={'username': 'otro', 'password': 'admin123'})
+    with worker_a.app_context():
+        admin_id = get_db().execute("SELECT id FROM user WHERE username = 'admin'").fetchone()[0]
+    other.post(f'/users/set-role/{admin_id}', data={'role': 'USER'})
+    assert client.get('/users/manage').status_code == 403
+
+    # Y suspendido queda afuera en la próxima request
+    assert client.get('/users/perfil').status_code == 200
+    other.post(f'/users/toggle-status/{admin_id}')
+    assert client.get('/users/perfil').status_code == 302
+
+
+def test_editing_one_user_keeps_the_others_cached(app, client, auth):
+    from flaskr.auth import get_user_cache
+
+    auth.login()
+    client.get('/users/perfil')
+    with app.app_context():
+        cached = get_user_cache().get(1)
+        db = get_db()
+        db.execute("UPDATE user SET role = 'ADMIN' WHERE id = 2")
+        db.commit()
+        versions = dict(db.execute("SELECT id, cache_version FROM user").fetchall())
+    assert versions == {1: 0, 2: 1, 3: 0}
+
+    client.get('/users/perfil')
+    with app.app_context():
+        assert get_user_cache().get(1) is cached   # no se releyó la fila
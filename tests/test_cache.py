@@ -0,0 +1,34 @@
+from flaskr.cache import TTLCache
+
+
+class FakeClock(object):
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry_and_stats():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set(1, 'a')
+    assert cache.get(1) == 'a'
+
+    clock.now = 6
+    assert cache.get(1) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_lru_eviction_and_invalidate():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    cache.get(1)          # 1 pasa a ser el más reciente
+    cache.set(3, 'c')     # desaloja 2
+    assert cache.get(2) is None
+    assert cache.get(1) == 'a'
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.stats()['evictions'] == 1
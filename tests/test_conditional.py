@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask, flash, g
+
+from flaskr import conditional
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(conditional, 'get_read_db', lambda: None)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    state = {'version': 1, 'renders': 0}
+
+    @app.before_request
+    def load_user():
+        g.user = {'id': 1, 'role': 'USER'}
+
+    @app.get('/page')
+    @conditional.conditional_get(lambda db: (state['version'],))
+    def page():
+        state['renders'] += 1
+        return 'listado'
+
+    @app.get('/flash')
+    def add_flash():
+        flash('hecho')
+        return ''
+
+    client = app.test_client()
+    client.state = state
+    return client
+
+
+def test_not_modified_skips_the_view(client):
+    first = client.get('/page')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and 'no-cache' in first.headers['Cache-Control']
+
+    again = client.get('/page', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert client.state['renders'] == 1
+
+    client.state['version'] += 1
+    assert client.get('/page', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_pending_flash_renders_without_etag(client):
+    etag = client.get('/page').headers['ETag']
+    client.get('/flash')
+    resp = client.get('/page', headers={'If-None-Match': etag})
+    assert resp.status_code == 200 and 'ETag' not in resp.headers
+
+
+def test_my_sales_revalidates_until_a_new_sale(app):
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'test', 'password': 'test'})
+    client.get('/sales/my')   # consume el flash del login
+
+    first = client.get('/sales/my')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and 'no-cache' in first.headers['Cache-Control']
+    again = client.get('/sales/my', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and not again.data
+
+    client.post('/sales/new', data={'product_id': '3', 'quantity': '1', 'unit_price': '500'})
+    client.get('/sales/my')   # la página con el flash va sin ETag
+    changed = client.get('/sales/my', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+
+def test_my_purchases_revalidates_after_an_edit(app):
+    from flaskr.db import get_db
+
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin'})
+    client.get('/shopping/my')   # consume el flash del login
+
+    etag = client.get('/shopping/my').headers['ETag']
+    assert client.get('/shopping/my', headers={'If-None-Match': etag}).status_code == 304
+
+    # Misma cantidad de filas y mismo MAX(id): solo cambia updated_at
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE shopping SET quantity = 6 WHERE id = 1")
+        db.commit()
+    changed = client.get('/shopping/my', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
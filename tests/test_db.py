@@ -1,7 +1,12 @@
+import os
 import sqlite3
 
 import pytest
-from flaskr.db import get_db
+from flaskr.db import ConnectionPool, PoolTimeout, get_db, get_pool, get_read_db
+from flaskr.migrations import LATEST_VERSION, MIGRATIONS, MigrationError, migrate
+
+# Copia congelada del schema.sql original: así están las bases en producción
+_ORIGINAL_SCHEMA = os.path.join(os.path.dirname(__file__), 'schema_v0.sql')
 
 
 def test_get_close_db(app):
@@ -9,10 +14,48 @@ def test_get_close_db(app):
         db = get_db()
         assert db is get_db()
 
-    with pytest.raises(sqlite3.ProgrammingError) as e:
-        db.execute('SELECT 1')
+    # La conexión vuelve al pool en lugar de cerrarse
+    assert get_pool(app).stats()['in_use'] == 0
+    with app.app_context():
+        assert get_db() is db
+
+
+def test_read_pool_rejects_writes(app):
+    with app.app_context():
+        db = get_read_db()
+        assert db is not get_db()
+        assert db.execute("SELECT COUNT(*) FROM product").fetchone()[0] == 3
+        assert db.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            db.execute("UPDATE product SET current_stock = 0")
+
+        # Aunque se apague query_only, el archivo está abierto con mode=ro
+        db.execute("PRAGMA query_only = OFF")
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            db.execute("DELETE FROM product")
+        db.execute("PRAGMA query_only = ON")
+
+    with app.app_context():
+        assert get_db().execute("SELECT COUNT(*) FROM product").fetchone()[0] == 3
 
-    assert 'closed' in str(e.value)
+
+def test_pool_rolls_back_and_bounds(tmp_path):
+    path = str(tmp_path / 'pool.sqlite')
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False),
+                          max_size=1, timeout=0.01)
+    conn = pool.acquire()
+    conn.execute('CREATE TABLE t (x)')
+    conn.execute('INSERT INTO t VALUES (1)')
+    assert conn.in_transaction
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    pool.release(conn)
+    again = pool.acquire()
+    assert again is conn and not again.in_transaction
+    assert again.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    assert pool.stats()['timeouts'] == 1
 
 def test_init_db_command(runner, monkeypatch):
     class Recorder(object):
@@ -24,4 +67,108 @@ def test_init_db_command(runner, monkeypatch):
     monkeypatch.setattr('flaskr.db.init_db', fake_init_db)
     result = runner.invoke(args=['init-db'])
     assert 'Initialized' in result.output
-    assert Recorder.called
\ No newline at end of file
+    assert Recorder.called
+
+def test_create_app_does_no_db_io_until_bootstrap(tmp_path):
+    from flaskr import create_app
+    from flaskr.db import bootstrap
+
+    path = tmp_path / 'boot.sqlite'
+    app = create_app({'TESTING': True, 'DATABASE': str(path)})
+    assert not path.exists()
+    assert 'db_pool' not in app.extensions
+    assert app.extensions['startup']['create_app_ms'] > 0
+
+    bootstrap(app)
+    assert path.exists()
+    assert 'db_pool' not in app.extensions   # el bootstrap no deja conexiones abiertas
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT role FROM user WHERE username = 'admin'").fetchone() == ('ADMIN',)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+    conn.close()
+
+
+def test_first_request_bootstraps_a_missing_database(tmp_path):
+    from flaskr import create_app
+
+    # `flask run` en un checkout nuevo, sin `flask bootstrap`
+    path = tmp_path / 'fresh.sqlite'
+    app = create_app({'TESTING': True, 'DATABASE': str(path),
+                      'HASH_EXECUTOR': 'inline', 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'})
+    assert app.test_client().get('/auth/login').status_code == 200
+    assert app.test_client().get('/auth/login').status_code == 200
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT role FROM user WHERE username = 'admin'").fetchone() == ('ADMIN',)
+    conn.close()
+
+
+def test_migrate_upgrades_original_schema_with_data():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('PRAGMA foreign_keys = ON')
+    with open(_ORIGINAL_SCHEMA, encoding='utf8') as f:
+        conn.executescript(f.read())
+    conn.executescript("""
+        INSERT INTO user (firstname, lastname, email, username, password_hash)
+        VALUES ('A', 'B', 'a@b.c', 'ab', printf('%060d', 0));
+        INSERT INTO product (name, category, current_stock, sale_price, purchase_price)
+        VALUES ('Yerba mate', 'Almacén', 10, 5, 3), ('Café', 'Almacén', 0, 8, 4);
+        INSERT INTO shopping (product_id, quantity, unit_price, purchase_date, created_by)
+        VALUES (2, 6, 4, '2024-01-01T10:00:00.000Z', 1);
+        INSERT INTO sales (product_id, quantity, unit_price, sale_date, created_by)
+        VALUES (1, 3, 5, '2024-01-02T10:00:00.000Z', 1),
+               (2, 2, 8, '2024-01-02T11:00:00.000Z', 1);
+    """)
+
+    assert migrate(conn) == [v for v, _, _ in MIGRATIONS]
+    assert migrate(conn) == []
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+    # Los índices quedaron reemplazados por los compuestos
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_sales_created_by_date', 'idx_sales_product_quantity', 'idx_product_sku'} <= indexes
+    assert 'idx_sales_created_by' not in indexes
+
+    # Lo que existía antes quedó cargado en las tablas nuevas
+    assert conn.execute(
+        "SELECT day, product_id, quantity FROM sales_daily ORDER BY product_id"
+    ).fetchall() == [('2024-01-02', 1, 3), ('2024-01-02', 2, 2)]
+    assert conn.execute(
+        "SELECT product_id, category, total_quantity FROM product_sales_total ORDER BY product_id"
+    ).fetchall() == [(1, 'Almacén', 3), (2, 'Almacén', 2)]
+    assert conn.execute(
+        "SELECT rowid FROM product_fts WHERE product_fts MATCH 'yerba'"
+    ).fetchall() == [(1,)]
+    assert conn.execute(
+        "SELECT p.current_stock, SUM(m.quantity) FROM product p "
+        "JOIN stock_movement m ON m.product_id = p.id GROUP BY p.id ORDER BY p.id"
+    ).fetchall() == [(7, 7), (4, 4)]
+
+    # Y los triggers de la serie funcionan sobre la base migrada
+    version = conn.execute("SELECT version FROM cache_version WHERE name = 'catalog'").fetchone()[0]
+    conn.execute("UPDATE product SET sku = 'YM-1' WHERE id = 1")
+    conn.execute("INSERT INTO sales (product_id, quantity, unit_price, created_by, idempotency_key) "
+                 "VALUES (1, 1, 5, 1, 'k1')")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO sales (product_id, quantity, unit_price, created_by, idempotency_key) "
+                     "VALUES (1, 1, 5, 1, 'k1')")
+    assert conn.execute("SELECT version FROM cache_version WHERE name = 'catalog'").fetchone()[0] == version + 1
+    assert conn.execute("SELECT total_quantity FROM product_sales_total WHERE product_id = 1").fetchone() == (4,)
+
+    conn.execute(f"PRAGMA user_version = {LATEST_VERSION + 1}")
+    with pytest.raises(MigrationError):
+        migrate(conn)
+
+
+def test_init_db_can_run_again_over_a_migrated_database(tmp_path):
+    from flaskr import create_app
+    from flaskr.db import init_db
+
+    app = create_app({'TESTING': True, 'DATABASE': str(tmp_path / 'again.sqlite')})
+    with app.app_context():
+        init_db()
+        get_db().execute("INSERT INTO mail_outbox (recipients, subject, body) VALUES ('[]', 's', 'b')")
+        get_db().commit()
+        init_db()
+        db = get_db()
+        assert db.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+        assert db.execute("SELECT COUNT(*) FROM mail_outbox").fetchone()[0] == 0
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+from flaskr.db import get_read_db
+from flaskr.export import generate
+
+
+def _ids(response):
+    return [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_export_streams_in_batches(app):
+    with app.app_context():
+        # data.sql: 3 ventas -> lotes de 2 y 1 (el CSV suma antes el encabezado)
+        chunks = list(generate(get_read_db(), 'sales', 'jsonl', 2))
+        assert [chunk.count('\n') for chunk in chunks] == [2, 1]
+        chunks = list(generate(get_read_db(), 'sales', 'csv', 2))
+        assert [len(list(csv.reader(io.StringIO(c)))) for c in chunks] == [1, 2, 1]
+
+
+def test_export_route_streams_with_filters(app, client, auth):
+    app.config['EXPORT_BATCH_SIZE'] = 1
+    auth.login('admin', 'admin')
+
+    response = client.get('/sales/export?format=jsonl')
+    assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+    assert 'sales.jsonl' in response.headers['Content-Disposition']
+    assert _ids(response) == [1, 2, 3]
+    # Un fragmento por lote de EXPORT_BATCH_SIZE filas
+    unbuffered = client.get('/sales/export?format=jsonl', buffered=False)
+    assert [chunk.count(b'\n') for chunk in unbuffered.iter_encoded()] == [1, 1, 1]
+    unbuffered.close()
+
+    # `to` es inclusivo; los filtros se combinan
+    assert _ids(client.get('/sales/export?format=jsonl&from=2024-01-03')) == [2, 3]
+    assert _ids(client.get('/sales/export?format=jsonl&to=2024-01-02')) == [1]
+    assert _ids(client.get('/sales/export?format=jsonl&product_id=1')) == [1, 3]
+    assert _ids(client.get('/sales/export?format=jsonl&from=2024-01-03&product_id=1')) == [3]
+
+    rows = list(csv.DictReader(io.StringIO(client.get('/shopping/export').get_data(as_text=True))))
+    assert [(r['product_name'], r['quantity']) for r in rows] == [('Café molido', '5')]
+
+    assert client.get('/sales/export?format=xml').status_code == 400
+    assert client.get('/sales/export?from=03-01-2024').status_code == 400
+
+
+def test_export_requires_admin(client, auth):
+    auth.login()
+    assert client.get('/sales/export').status_code == 403
+
+
+def test_export_command_writes_file(runner, tmp_path):
+    out = tmp_path / 'productos.csv'
+    result = runner.invoke(args=['export', 'products', '-o', str(out)])
+    assert 'guardada' in result.output
+    rows = list(csv.DictReader(out.open(encoding='utf8')))
+    assert [r['sku'] for r in rows] == ['YM-1', 'CF-1', 'LE-1']
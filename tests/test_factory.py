@@ -6,6 +6,13 @@ def test_config():
     assert create_app({'TESTING': True}).testing
 
 
+def test_ops_commands_load_on_demand(runner):
+    # Registrados sin importar su módulo; se cargan al invocarlos
+    result = runner.invoke(args=['startup-report', '--imports', '0'])
+    assert result.exit_code == 0
+    assert 'Fases de create_app' in result.output
+
+
 def test_hello(client):
     response = client.get('/hello')
     assert response.data == b'Hello, World!'
\ No newline at end of file
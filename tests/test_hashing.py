@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from flaskr.hashing import (
+    HashingBusy, PasswordHasher, hash_password, needs_rehash, verify_password,
+)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000', HASH_EXECUTOR='thread',
+        HASH_WORKERS=2, HASH_MAX_PENDING=None, HASH_TIMEOUT=5.0,
+    )
+    return app
+
+
+def test_hash_verify_and_rehash(app):
+    with app.test_request_context():
+        pwhash = hash_password('secreto123')
+        assert verify_password(pwhash, 'secreto123')
+        assert not verify_password(pwhash, 'otra')
+        assert not needs_rehash(pwhash)
+        assert needs_rehash(generate_password_hash('secreto123', 'pbkdf2:sha256:2000'))
+        assert app.extensions['hasher'].stats()['completed'] >= 3
+
+
+def test_hasher_caps_concurrency():
+    hasher = PasswordHasher(mode='thread', workers=1, max_pending=1, timeout=0.1)
+    release = threading.Event()
+    worker = threading.Thread(target=hasher.run, args=(release.wait,))
+    worker.start()
+    try:
+        while hasher.stats()['in_flight'] == 0:
+            pass
+        with pytest.raises(HashingBusy):
+            hasher.run(str, 'x')
+        assert hasher.stats()['rejected'] == 1
+    finally:
+        release.set()
+        worker.join()
+    assert hasher.run(str, 'x') == 'x'
+    hasher.shutdown()
@@ -0,0 +1,103 @@
+import sqlite3
+
+from flask import Flask, abort
+
+from flaskr import metrics
+from flaskr.db import TimedConnection
+from flaskr.dbaudit import flagged_steps
+
+
+def test_render_histogram_is_cumulative():
+    m = metrics.Metrics(buckets=(0.1, 1.0))
+    m.observe('stock', 'stock.list', 'GET', '200', 0.05, 3, 0.01)
+    m.observe('stock', 'stock.list', 'GET', '200', 0.5, 1, 0.02)
+    m.inc('csrf_error')
+    text = m.render([('write_queue_queued', 'En cola.', 'gauge', [({}, 2)])])
+    assert 'flask_request_duration_seconds_bucket{blueprint="stock",endpoint="stock.list",le="0.1"} 1' in text
+    assert 'flask_request_duration_seconds_bucket{blueprint="stock",endpoint="stock.list",le="1.0"} 2' in text
+    assert 'flask_request_duration_seconds_count{blueprint="stock",endpoint="stock.list"} 2' in text
+    assert 'flask_sql_statements_total{endpoint="stock.list"} 4' in text
+    assert 'flask_events_total{event="csrf_error"} 1' in text
+    assert '# TYPE write_queue_queued gauge\nwrite_queue_queued 2' in text
+
+
+def test_middleware_counts_sql_and_forbidden():
+    app = Flask(__name__)
+    app.config['METRICS_ENABLED'] = True
+    metrics.init_app(app)
+
+    @app.get('/query')
+    def query():
+        conn = sqlite3.connect(':memory:', factory=TimedConnection)
+        conn.execute('SELECT 1')
+        conn.executemany('SELECT ?', [(1,), (2,)])
+        return 'ok'
+
+    @app.get('/private')
+    def private():
+        abort(403)
+
+    client = app.test_client()
+    client.get('/query')
+    client.get('/private')
+    text = metrics.get_metrics(app).render()
+    assert 'flask_sql_statements_total{endpoint="query"} 2' in text
+    assert 'flask_requests_total{endpoint="private",method="GET",status="403"} 1' in text
+    assert 'flask_events_total{event="forbidden"} 1' in text
+
+
+def test_slow_query_log_includes_plan(caplog):
+    app = Flask(__name__)
+    app.config['SLOW_QUERY_MS'] = 0
+    conn = sqlite3.connect(':memory:', factory=TimedConnection)
+    conn.execute('CREATE TABLE t (a INTEGER)')
+    with app.app_context(), caplog.at_level('WARNING'):
+        conn.execute('SELECT a FROM t WHERE a = ? ORDER BY a', (1,))
+    message = caplog.records[-1].getMessage()
+    assert 'SQL lento' in message and 'params=(1,)' in message and 'SCAN t' in message
+
+
+def test_db_audit_flags_scans_and_temp_btrees():
+    plan = ['SCAN product_fts VIRTUAL TABLE INDEX 0:M3',
+            'SEARCH p USING INTEGER PRIMARY KEY (rowid=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+            'SCAN v USING INDEX idx_sales_sale_date']
+    assert flagged_steps(plan) == ['USE TEMP B-TREE FOR ORDER BY', 'SCAN v USING INDEX idx_sales_sale_date']
+
+
+def test_metrics_can_be_disabled_from_config(tmp_path):
+    from flaskr import create_app
+
+    app = create_app({'TESTING': True, 'DATABASE': str(tmp_path / 'm.sqlite'), 'METRICS_ENABLED': False})
+    assert app.config['METRICS_ENABLED'] is False
+    assert 'metrics' not in app.view_functions
+
+
+def test_slow_query_threshold_comes_from_config(tmp_path):
+    from flaskr import create_app
+
+    app = create_app({'TESTING': True, 'DATABASE': str(tmp_path / 'm.sqlite'), 'SLOW_QUERY_MS': 50})
+    assert app.config['SLOW_QUERY_MS'] == 50
+
+
+def test_metrics_requires_admin_or_token_even_from_localhost(tmp_path):
+    from flaskr import create_app
+
+    app = create_app({'TESTING': True, 'DATABASE': str(tmp_path / 'm.sqlite'), 'METRICS_TOKEN': 's3cret'})
+    client = app.test_client()
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer nope'}).status_code == 403
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert resp.status_code == 200 and b'flask_request_duration_seconds' in resp.data
+
+
+def test_metrics_route_reports_endpoints_to_admin_only(client, auth):
+    auth.login()
+    client.get('/stock/consult')
+    assert client.get('/metrics').status_code == 403
+
+    auth.login('admin', 'admin')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'flask_request_duration_seconds_count{blueprint="stock",endpoint="stock.consult"} 1' in body
+    assert 'flask_events_total{event="forbidden"} 1' in body
+    assert 'db_pool_connections{pool="read",state="idle"}' in body
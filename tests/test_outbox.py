@@ -0,0 +1,112 @@
+import socket
+import threading
+
+import pytest
+from flask import Flask
+from flask_mail import Mail
+
+from flaskr.outbox import deliver_batch, enqueue_mail, get_worker, resume_worker, wake_worker
+
+controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class _Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def db(schema_db):
+    return schema_db
+
+
+@pytest.fixture
+def mail_app():
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=_free_port(), MAIL_USE_TLS=False,
+        MAIL_DEFAULT_SENDER='stock@example.com',
+    )
+    return app, Mail(app)
+
+
+def test_deliver_batch_uses_one_connection(db, mail_app):
+    app, mail = mail_app
+    inbox = _Inbox()
+    smtp = controller.Controller(inbox, hostname='127.0.0.1', port=app.config['MAIL_PORT'])
+    smtp.start()
+    try:
+        for i in range(3):
+            enqueue_mail(db, [f'u{i}@example.com'], 'Hola', 'Cuerpo')
+        db.commit()
+        with app.app_context():
+            assert deliver_batch(db, mail) == (3, 0)
+    finally:
+        smtp.stop()
+    assert len(inbox.messages) == 3
+    assert db.execute("SELECT COUNT(*) FROM mail_outbox WHERE status = 'SENT'").fetchone()[0] == 3
+
+
+def test_deliver_batch_retries_then_dead_letters(db, mail_app):
+    app, mail = mail_app  # sin servidor escuchando: conexión rechazada
+    enqueue_mail(db, ['u@example.com'], 'Hola', 'Cuerpo')
+    enqueue_mail(db, ['v@example.com'], 'Hola', 'Cuerpo')
+    db.commit()
+    with app.app_context():
+        assert deliver_batch(db, mail, max_attempts=2) == (0, 1)
+        rows = db.execute("SELECT status, attempts, next_attempt_at > strftime('%Y-%m-%dT%H:%M:%fZ','now') "
+                          "FROM mail_outbox ORDER BY id").fetchall()
+        assert [tuple(r) for r in rows] == [('PENDING', 1, 1), ('PENDING', 0, 0)]
+
+        db.execute("UPDATE mail_outbox SET next_attempt_at = '2000-01-01' WHERE id = 1")
+        db.commit()
+        deliver_batch(db, mail, max_attempts=2)
+    assert db.execute("SELECT status FROM mail_outbox WHERE id = 1").fetchone()[0] == 'DEAD'
+
+
+def test_worker_is_a_noop_when_disabled(tmp_path):
+    from flaskr import create_app
+
+    # Apagado explícito, y por defecto con TESTING
+    for config in ({'MAIL_OUTBOX_WORKER': False}, {'TESTING': True}):
+        app = create_app(dict(config, DATABASE=str(tmp_path / 'outbox.sqlite')))
+        with app.test_request_context():
+            assert get_worker() is None
+            wake_worker()
+        assert resume_worker(app) is None
+        assert 'outbox_worker' not in app.extensions
+    assert not any(t.name == 'mail-outbox' for t in threading.enumerate())
+
+
+def test_requests_do_not_start_the_worker(tmp_path):
+    from flaskr import create_app
+
+    app = create_app({'MAIL_OUTBOX_WORKER': True, 'DATABASE': str(tmp_path / 'outbox.sqlite')})
+    app.test_client().get('/auth/login')
+    # Solo lo arranca wake_worker() después de encolar
+    assert 'outbox_worker' not in app.extensions
+
+
+def test_forgot_password_prints_the_link_without_mail_config(app, client, capsys):
+    from flaskr.db import get_db
+
+    app.config['MAIL_USERNAME'] = None
+    client.post('/validate/forgot', data={'email': 'test@example.com'})
+    assert 'LINK DE RECUPERACIÓN: http://localhost/validate/reset/' in capsys.readouterr().out
+
+    app.config['MAIL_USERNAME'] = 'stock@example.com'
+    client.post('/validate/forgot', data={'email': 'test@example.com'})
+    assert 'LINK DE RECUPERACIÓN' not in capsys.readouterr().out
+    with app.app_context():
+        rows = get_db().execute("SELECT recipients FROM mail_outbox").fetchall()
+    assert [tuple(r) for r in rows] == [('["test@example.com"]',)]
@@ -0,0 +1,80 @@
+import html
+import re
+import sqlite3
+
+from flask import Flask
+from flaskr.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+def test_cursor_roundtrip():
+    token = encode_cursor('2024-01-01T00:00:00.000Z', 7)
+    assert decode_cursor(token) == ('2024-01-01T00:00:00.000Z', 7)
+
+
+def test_cursor_invalid():
+    assert decode_cursor(None) is None
+    assert decode_cursor('garbage') is None
+
+
+def test_cursor_tampered():
+    # Tokens armados a mano: valores no escalares o cantidad distinta a la clave
+    assert decode_cursor(encode_cursor({}, 1), 2) is None
+    assert decode_cursor(encode_cursor([1], 2), 2) is None
+    assert decode_cursor(encode_cursor('2024-01-01', 7, 8), 2) is None
+    assert decode_cursor(encode_cursor('2024-01-01', 7), 2) == ('2024-01-01', 7)
+
+
+def _pages(app, db, query):
+    with app.test_request_context(query):
+        return keyset_paginate(
+            db, "SELECT id, ts FROM t",
+            order_by=("ts", "id"), fields=("ts", "id"),
+        )
+
+
+def test_keyset_paginate_walks_both_directions():
+    app = Flask(__name__)
+    app.config.update(PAGE_SIZE=2, MAX_PAGE_SIZE=10)
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, ts TEXT)")
+    db.executemany("INSERT INTO t (id, ts) VALUES (?, ?)",
+                   [(i, f"2024-01-0{i}") for i in range(1, 6)])
+
+    first = _pages(app, db, '/')
+    assert [r['id'] for r in first] == [5, 4]
+    assert first.has_next and not first.has_prev
+
+    second = _pages(app, db, f'/?after={first.next_cursor}')
+    assert [r['id'] for r in second] == [3, 2]
+    assert second.has_prev
+
+    back = _pages(app, db, f'/?before={second.prev_cursor}')
+    assert [r['id'] for r in back] == [5, 4]
+    assert not back.has_prev
+
+
+def _sale_ids(html):
+    return [int(i) for i in re.findall(r'<tr>\s*<td>(\d+)</td>', html)]
+
+
+def test_sales_list_walks_pages_through_the_links(client, auth):
+    auth.login('admin', 'admin')
+    # data.sql: ventas 1, 2 y 3, de la más antigua a la más reciente
+    first = client.get('/sales/list?limit=2').get_data(as_text=True)
+    assert _sale_ids(first) == [3, 2]
+    older = html.unescape(re.search(r'href="([^"]*after=[^"]*)"', first).group(1))
+    assert 'limit=2' in older
+
+    second = client.get(older).get_data(as_text=True)
+    assert _sale_ids(second) == [1]
+    assert 'after=' not in second
+    newer = html.unescape(re.search(r'href="([^"]*before=[^"]*)"', second).group(1))
+    assert _sale_ids(client.get(newer).get_data(as_text=True)) == [3, 2]
+
+    # Un cursor inválido vuelve a la primera página
+    assert _sale_ids(client.get('/sales/list?limit=2&after=basura').get_data(as_text=True)) == [3, 2]
+    tampered = encode_cursor({}, 1)
+    response = client.get(f'/sales/list?limit=2&after={tampered}&before={tampered}')
+    assert response.status_code == 200
+    assert _sale_ids(response.get_data(as_text=True)) == [3, 2]
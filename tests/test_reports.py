@@ -0,0 +1,111 @@
+import pytest
+from flaskr.db import get_db
+from flaskr.reports.routes import top_sellers
+
+_FRESH_SALES_DAILY = """
+    SELECT substr(sale_date, 1, 10), product_id, SUM(quantity), SUM(total_price), COUNT(*)
+    FROM sales GROUP BY 1, 2 ORDER BY 1, 2
+"""
+
+
+@pytest.fixture
+def db(seller_db):
+    conn = seller_db
+    conn.executemany(
+        "INSERT INTO product (name, category, current_stock, sale_price, purchase_price) "
+        "VALUES (?, ?, 100, 1, 1)", [('A', 'Almacén'), ('B', 'Almacén'), ('C', 'Lácteos')]
+    )
+    conn.commit()
+    return conn
+
+
+def _daily(db):
+    return [tuple(r) for r in db.execute(
+        "SELECT day, product_id, quantity, total, sales_count FROM sales_daily ORDER BY day, product_id"
+    )]
+
+
+def test_sales_daily_follows_insert_update_and_delete(db):
+    db.executemany(
+        "INSERT INTO sales (product_id, quantity, unit_price, sale_date, created_by) VALUES (?, ?, ?, ?, 1)",
+        [(1, 2, 10, '2024-01-01T10:00:00.000Z'), (1, 1, 10, '2024-01-01T18:00:00.000Z'),
+         (2, 5, 3, '2024-01-02T09:00:00.000Z')],
+    )
+    assert _daily(db) == [('2024-01-01', 1, 3, 30.0, 2), ('2024-01-02', 2, 5, 15.0, 1)]
+
+    # Cambio de cantidad y precio en el mismo día
+    db.execute("UPDATE sales SET quantity = 4, unit_price = 5 WHERE id = 1")
+    assert _daily(db) == [('2024-01-01', 1, 5, 30.0, 2), ('2024-01-02', 2, 5, 15.0, 1)]
+
+    # Cambio de fecha y producto: sale de un día y entra en otro
+    db.execute("UPDATE sales SET sale_date = '2024-01-02T20:00:00.000Z', product_id = 2 WHERE id = 2")
+    assert _daily(db) == [('2024-01-01', 1, 4, 20.0, 1), ('2024-01-02', 2, 6, 25.0, 2)]
+
+    db.execute("DELETE FROM sales WHERE id = 1")
+    assert _daily(db) == [('2024-01-02', 2, 6, 25.0, 2)]
+    assert _daily(db) == [tuple(r) for r in db.execute(_FRESH_SALES_DAILY)]
+
+
+def test_shopping_daily_follows_updates(db):
+    db.execute(
+        "INSERT INTO shopping (product_id, quantity, unit_price, purchase_date, created_by) "
+        "VALUES (3, 10, 2, '2024-01-01T10:00:00.000Z', 1)"
+    )
+    db.execute("UPDATE shopping SET purchase_date = '2024-01-05T10:00:00.000Z', quantity = 12 WHERE id = 1")
+    assert [tuple(r) for r in db.execute("SELECT * FROM shopping_daily")] == [('2024-01-05', 3, 12, 24.0, 1)]
+
+
+def test_backfill_rollups_matches_a_fresh_group_by(app, runner):
+    with app.app_context():
+        db = get_db()
+        # Rollups desincronizados (p. ej. datos cargados sin los triggers)
+        db.execute("DELETE FROM sales_daily WHERE product_id = 1")
+        db.execute("UPDATE shopping_daily SET quantity = 999")
+        db.execute("UPDATE product_sales_total SET total_quantity = 0")
+        db.commit()
+
+    result = runner.invoke(args=['backfill-rollups'])
+    assert 'Rollups reconstruidos (2 días con ventas)' in result.output
+
+    with app.app_context():
+        db = get_db()
+        assert ([tuple(r) for r in db.execute(
+            "SELECT day, product_id, quantity, total, sales_count FROM sales_daily ORDER BY day, product_id")]
+            == [tuple(r) for r in db.execute(_FRESH_SALES_DAILY)])
+        assert ([tuple(r) for r in db.execute(
+            "SELECT day, product_id, quantity, total, purchase_count FROM shopping_daily ORDER BY 1, 2")]
+            == [tuple(r) for r in db.execute(
+                "SELECT substr(purchase_date, 1, 10), product_id, SUM(quantity), SUM(total_price), COUNT(*) "
+                "FROM shopping GROUP BY 1, 2 ORDER BY 1, 2")])
+        assert ([tuple(r) for r in db.execute(
+            "SELECT product_id, total_quantity FROM product_sales_total ORDER BY product_id")]
+            == [tuple(r) for r in db.execute(
+                "SELECT product_id, SUM(quantity) FROM sales GROUP BY product_id ORDER BY product_id")])
+
+
+def _ranking(db, limit=10, category=None):
+    return [(r['product_name'], r['total_sold']) for r in top_sellers(db, limit, category)]
+
+
+def test_top_sellers_per_category(db):
+    db.executemany(
+        "INSERT INTO sales (product_id, quantity, unit_price, created_by) VALUES (?, ?, 1, 1)",
+        [(1, 3), (2, 5), (3, 10), (1, 1)],
+    )
+    assert _ranking(db) == [('C', 10), ('B', 5), ('A', 4)]
+    assert _ranking(db, category='Almacén') == [('B', 5), ('A', 4)]
+    assert _ranking(db, limit=1, category='Almacén') == [('B', 5)]
+    assert _ranking(db, category='Bebidas') == []
+
+    # La categoría copiada sigue al producto, y una venta corregida mueve el total
+    db.execute("UPDATE product SET category = 'Lácteos' WHERE id = 1")
+    db.execute("UPDATE sales SET product_id = 2, quantity = 2 WHERE id = 1")
+    assert _ranking(db, category='Lácteos') == [('C', 10), ('A', 1)]
+    assert _ranking(db, category='Almacén') == [('B', 7)]
+
+
+def test_top_sellers_route(client, auth):
+    auth.login('admin', 'admin')
+    data = client.get('/reports/top-sellers?category=Almacén&limit=500').get_json()
+    assert data['limit'] == 100 and data['category'] == 'Almacén'
+    assert [(i['product_name'], i['total_sold']) for i in data['items']] == [('Yerba mate', 3)]
@@ -0,0 +1,130 @@
+import pytest
+from flaskr.sales.checkout import (
+    SaleLine, parse_batch, register_sales, register_sales_batch,
+)
+
+
+@pytest.fixture
+def db(seller_db):
+    conn = seller_db
+    conn.executemany(
+        "INSERT INTO product (name, current_stock, sale_price, purchase_price) "
+        "VALUES (?, ?, 1, 1)", [('A', 5), ('B', 1)]
+    )
+    conn.commit()
+    return conn
+
+
+def _stock(db):
+    return dict(db.execute("SELECT id, current_stock FROM product").fetchall())
+
+
+def test_register_sales_all_lines(db):
+    ids, errors = register_sales(db, [SaleLine(1, 2, 1.0), SaleLine(2, 1, 1.0)], 1)
+    assert errors == {}
+    assert ids == [1, 2]
+    assert _stock(db) == {1: 3, 2: 0}
+
+
+def test_register_sales_is_all_or_nothing(db):
+    # 3 + 3 supera el stock de A aunque cada línea por separado alcanzaría
+    lines = [SaleLine(1, 3, 1.0), SaleLine(1, 3, 1.0), SaleLine(2, 1, 1.0)]
+    ids, errors = register_sales(db, lines, 1)
+    assert ids == []
+    assert set(errors) == {0, 1}
+    assert _stock(db) == {1: 5, 2: 1}
+    assert db.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 0
+
+
+def test_register_sales_unknown_product(db):
+    _, errors = register_sales(db, [SaleLine(99, 1, 1.0)], 1)
+    assert errors == {0: 'Producto inexistente.'}
+
+
+def test_register_sales_batch_partial_and_idempotent(db):
+    items = [
+        {'idempotency_key': 'k1', 'product_id': 1, 'quantity': 4, 'unit_price': 1},
+        {'idempotency_key': 'k2', 'product_id': 1, 'quantity': 4, 'unit_price': 1},
+        {'idempotency_key': 'k1', 'product_id': 2, 'quantity': 1, 'unit_price': 1},
+    ]
+    valid, results = parse_batch(items)
+    results = register_sales_batch(db, valid, 1, results)
+    assert [r['status'] for r in results] == ['created', 'error', 'error']
+    assert _stock(db) == {1: 1, 2: 1}
+
+    # Reintento del mismo lote: no duplica
+    valid, results = parse_batch(items[:1])
+    results = register_sales_batch(db, valid, 1, results)
+    assert results[0]['status'] == 'duplicate'
+    assert db.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 1
+
+
+def test_register_sales_batch_keys_are_per_user(db):
+    db.execute(
+        "INSERT INTO user (firstname, lastname, email, username, password_hash) "
+        "VALUES ('O', 'O', 'o@example.com', 'other', ?)", ('x' * 60,)
+    )
+    db.commit()
+    item = [{'idempotency_key': 'k1', 'product_id': 1, 'quantity': 1, 'unit_price': 1}]
+    valid, results = parse_batch(item)
+    first = register_sales_batch(db, valid, 1, results)
+    # La misma clave enviada por otra caja (otro usuario) es otra venta
+    valid, results = parse_batch(item)
+    second = register_sales_batch(db, valid, 2, results)
+    assert first[0]['status'] == second[0]['status'] == 'created'
+    assert first[0]['sale_id'] != second[0]['sale_id']
+    assert _stock(db)[1] == 3
+
+
+@pytest.mark.parametrize('price', [float('nan'), float('inf'), 0, -1])
+def test_parse_batch_rejects_invalid_prices(price):
+    valid, results = parse_batch(
+        [{'idempotency_key': 'k1', 'product_id': 1, 'quantity': 1, 'unit_price': price}]
+    )
+    assert valid == []
+    assert results[0]['status'] == 'error'
+
+
+def test_register_sales_batch_failure_keeps_duplicates(db):
+    item = {'idempotency_key': 'k1', 'product_id': 1, 'quantity': 1, 'unit_price': 1}
+    valid, results = parse_batch([item])
+    register_sales_batch(db, valid, 1, results)
+
+    # Una restricción que falla al insertar revierte las nuevas, no las ya registradas
+    db.execute(
+        "CREATE TEMP TRIGGER fail_insert BEFORE INSERT ON sales "
+        "BEGIN SELECT RAISE(ABORT, 'falla'); END"
+    )
+    valid, results = parse_batch([item, dict(item, idempotency_key='k2')])
+    results = register_sales_batch(db, valid, 1, results)
+    assert [r['status'] for r in results] == ['duplicate', 'error']
+    assert results[0]['sale_id'] == 1
+    assert db.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 1
+
+
+def test_register_sales_serializes_concurrent_checkouts(seller_db_path):
+    import sqlite3
+    from flaskr.sales.checkout import apply_sales
+
+    def connect():
+        conn = sqlite3.connect(seller_db_path, timeout=0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    first, second = connect(), connect()
+    first.execute("INSERT INTO product (name, current_stock, sale_price, purchase_price) "
+                  "VALUES ('A', 3, 1, 1)")
+
+    # El primer cajero leyó el stock con el lock tomado: el segundo no puede
+    # vender lo mismo en el medio
+    first.execute("BEGIN IMMEDIATE")
+    assert apply_sales(first, [SaleLine(1, 3, 1.0)], 1)[1] == {}
+    with pytest.raises(sqlite3.OperationalError):
+        register_sales(second, [SaleLine(1, 3, 1.0)], 1)
+    first.execute("COMMIT")
+
+    _, errors = register_sales(second, [SaleLine(1, 3, 1.0)], 1)
+    assert errors == {0: 'Stock insuficiente (disponible: 0, pedido: 3).'}
+    assert second.execute("SELECT current_stock FROM product").fetchone()[0] == 0
+    first.close()
+    second.close()
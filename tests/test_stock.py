@@ -0,0 +1,207 @@
+import io
+import sqlite3
+from datetime import date
+
+import pytest
+from flaskr.db import get_db
+from flaskr.stock.catalog import catalog_version, get_catalog
+from flaskr.stock.changes import changes_since
+from flaskr.stock.importer import import_products
+from flaskr.stock.ledger import stock_at, stock_range, take_snapshot
+from flaskr.stock.reconcile import reconcile_stock, repair_discrepancies
+from flaskr.stock.search import match_query
+
+
+@pytest.fixture
+def db(schema_db):
+    conn = schema_db
+    conn.executemany(
+        "INSERT INTO product (name, current_stock, sale_price, purchase_price) "
+        "VALUES (?, 5, 1, 1)", [('A',), ('B',), ('C',)]
+    )
+    conn.commit()
+    return conn
+
+
+def test_match_query_prefix_terms():
+    assert match_query('café mol') == '"café"* "mol"*'
+
+
+def test_match_query_strips_operators():
+    assert match_query('"; DROP -x OR') == '"DROP"* "x"* "OR"*'
+    assert match_query('  ') is None
+
+
+def test_changes_since_resumes_and_reports_deletes(db):
+    first, cursor, has_more = changes_since(db, None, 2)
+    assert [c['id'] for c in first] == [1, 2] and has_more
+    rest, cursor, has_more = changes_since(db, cursor, 2)
+    assert [c['id'] for c in rest] == [3] and not has_more
+
+    db.execute("UPDATE product SET updated_at = '9999-01-01T00:00:00.000Z' WHERE id = 1")
+    db.execute("DELETE FROM product WHERE id = 2")
+    db.execute("UPDATE product_tombstone SET deleted_at = '9999-01-02T00:00:00.000Z'")
+    changes, cursor, _ = changes_since(db, cursor, 10)
+    assert [(c['op'], c['id']) for c in changes] == [('upsert', 1), ('delete', 2)]
+    assert changes_since(db, cursor, 10)[0] == []
+
+
+def _move(db, qty, at, pid=1):
+    db.execute(
+        "INSERT INTO stock_movement (product_id, kind, quantity, moved_at) "
+        "VALUES (?, 'ADJUSTMENT', ?, ?)", (pid, qty, at)
+    )
+
+
+def test_stock_at_uses_snapshot_and_backdated_moves_invalidate_it(db):
+    db.execute("UPDATE stock_movement SET moved_at = '2024-01-01T00:00:00.000Z'")
+    _move(db, 10, '2024-01-02T10:00:00.000Z')
+    _move(db, -3, '2024-01-03T10:00:00.000Z')
+    db.commit()
+    assert db.execute("SELECT current_stock FROM product WHERE id = 1").fetchone()[0] == 12
+
+    assert take_snapshot(db, '2024-01-02T23:59:59.999Z') == 3
+    assert take_snapshot(db, '2024-01-02T23:59:59.999Z') == 0   # sin movimientos nuevos
+    assert stock_at(db, 1, '2024-01-02T12:00:00.000Z') == 15
+    assert stock_at(db, 1, '2024-01-04T00:00:00.000Z') == 12
+
+    _move(db, 4, '2024-01-02T08:00:00.000Z')
+    assert db.execute("SELECT COUNT(*) FROM stock_snapshot WHERE product_id = 1").fetchone()[0] == 0
+    assert stock_at(db, 1, '2024-01-04T00:00:00.000Z') == 16
+
+
+def test_stock_range_daily_in_out_and_closing(db):
+    db.execute("UPDATE stock_movement SET moved_at = '2024-01-01T00:00:00.000Z'")
+    _move(db, 10, '2024-01-02T10:00:00.000Z')
+    _move(db, -3, '2024-01-02T18:00:00.000Z')
+    _move(db, -2, '2024-01-04T09:00:00.000Z')
+    r = stock_range(db, 1, date(2024, 1, 2), date(2024, 1, 3))
+    assert r['opening'] == 5
+    assert r['days'] == [{'day': '2024-01-02', 'in': 10, 'out': 3, 'closing': 12}]
+    assert r['closing'] == 12
+
+
+def test_edited_sales_and_purchases_keep_stock_and_ledger_in_sync(db):
+    db.execute("UPDATE stock_movement SET moved_at = '2024-01-01T00:00:00.000Z'")
+    db.execute("INSERT INTO sales (product_id, quantity, unit_price, created_by, sale_date) "
+               "VALUES (1, 2, 1, 1, '2024-01-02T10:00:00.000Z')")
+    db.execute("INSERT INTO shopping (product_id, quantity, unit_price, created_by, purchase_date) "
+               "VALUES (2, 4, 1, 1, '2024-01-02T11:00:00.000Z')")
+    db.execute("UPDATE sales SET quantity = 3")
+    db.execute("UPDATE sales SET product_id = 3")
+    db.execute("UPDATE shopping SET quantity = 1, product_id = 3")
+    db.commit()
+
+    stock = dict(db.execute("SELECT id, current_stock FROM product").fetchall())
+    assert stock == {1: 5, 2: 5, 3: 3}
+    assert not reconcile_stock(db, full=True)['discrepancies']
+    assert stock_at(db, 3, '2024-01-03T00:00:00.000Z') == 3
+
+    # Sin stock para la edición: se rechaza entera
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute("UPDATE sales SET quantity = 9")
+    db.rollback()
+    assert not reconcile_stock(db, full=True)['discrepancies']
+
+
+def test_reconcile_incremental_and_repair(db):
+    db.execute("UPDATE product SET updated_at = '2024-01-01T00:00:00.000Z'")
+    db.commit()
+    result = reconcile_stock(db)
+    assert result['mode'] == 'full' and result['checked'] == 3 and not result['discrepancies']
+
+    db.execute("UPDATE product SET current_stock = 9 WHERE id = 2")   # fuera del ledger
+    db.commit()
+    result = reconcile_stock(db)
+    assert result['mode'] == 'incremental' and result['checked'] == 1
+    assert [(d['product_id'], d['difference']) for d in result['discrepancies']] == [(2, 4)]
+    assert reconcile_stock(db)['discrepancies']   # sigue abierta hasta corregirla
+
+    assert repair_discrepancies(db, keep_stock=True) == 1
+    assert db.execute("SELECT current_stock FROM product WHERE id = 2").fetchone()[0] == 9
+    assert not reconcile_stock(db, full=True)['discrepancies']
+
+    db.execute("UPDATE product SET current_stock = 1 WHERE id = 3")
+    db.commit()
+    reconcile_stock(db)
+    assert repair_discrepancies(db) == 1
+    assert db.execute("SELECT current_stock FROM product WHERE id = 3").fetchone()[0] == 5
+
+
+_CSV_HEADER = 'sku,name,category,current_stock,sale_price,purchase_price\n'
+
+
+def test_import_reports_invalid_rows_with_line_numbers(db):
+    csv_text = _CSV_HEADER + (
+        'S1,Yerba,Almacén,3,10,5\n'
+        'S2,,Almacén,1,10,5\n'
+        'S3,Café,,x,10,5\n'
+        'S4,Té,,1,-1,5\n'
+    )
+    result = import_products(db, io.StringIO(csv_text))
+    assert result.imported == 1
+    assert result.errors == [
+        (3, 'El nombre es obligatorio.'),
+        (4, 'El stock debe ser un número entero.'),
+        (5, 'sale_price no puede ser negativo.'),
+    ]
+
+    missing = import_products(db, io.StringIO('sku,name,sale_price\nS9,X,1\n'))
+    assert missing.imported == 0 and missing.errors == [(1, 'Faltan columnas: purchase_price.')]
+
+
+def test_import_falls_back_to_savepoints_when_a_chunk_fails(db):
+    db.execute(
+        "CREATE TRIGGER reject_product BEFORE INSERT ON product WHEN NEW.name = 'Malo' "
+        "BEGIN SELECT RAISE(ABORT, 'rechazado'); END"
+    )
+    csv_text = _CSV_HEADER + 'S1,Uno,,1,1,1\nS2,Malo,,1,1,1\nS3,Tres,,1,1,1\n'
+
+    result = import_products(db, io.StringIO(csv_text), chunk_size=10)
+
+    # El lote falla entero y se reaplica fila por fila: solo se pierde la mala
+    assert result.imported == 2
+    assert result.errors == [(3, 'rechazado')]
+    skus = [r[0] for r in db.execute("SELECT sku FROM product WHERE sku IS NOT NULL ORDER BY sku")]
+    assert skus == ['S1', 'S3']
+    assert not db.in_transaction
+
+
+def test_import_upsert_keeps_current_stock_of_existing_products(db):
+    import_products(db, io.StringIO(_CSV_HEADER + 'YM-1,Yerba,Almacén,10,100,60\n'))
+    db.execute("UPDATE product SET current_stock = 7 WHERE sku = 'YM-1'")   # ventas
+    db.commit()
+
+    result = import_products(db, io.StringIO(_CSV_HEADER + 'YM-1,Yerba mate,Infusiones,99,120,70\n'))
+
+    assert result.imported == 1 and not result.errors
+    rows = db.execute(
+        "SELECT name, category, current_stock, sale_price, purchase_price FROM product WHERE sku = 'YM-1'"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [('Yerba mate', 'Infusiones', 7, 120.0, 70.0)]
+
+
+def test_catalog_cache_invalidates_on_catalog_edits_but_not_on_stock(app):
+    with app.app_context():
+        db = get_db()
+        cached = get_catalog()
+        assert get_catalog() is cached
+        version = catalog_version(db)
+
+        # Ventas y compras solo mueven el stock: el catálogo cacheado sigue valiendo
+        db.execute("UPDATE product SET current_stock = current_stock + 5 WHERE id = 1")
+        db.commit()
+        assert catalog_version(db) == version
+        assert get_catalog() is cached
+
+        db.execute("UPDATE product SET sale_price = 999 WHERE id = 1")
+        db.commit()
+        assert catalog_version(db) == version + 1
+        repriced = get_catalog()
+        assert repriced is not cached
+        assert {p['id']: p['sale_price'] for p in repriced}[1] == 999
+
+        db.execute("UPDATE product SET name = 'Yerba mate suave' WHERE id = 1")
+        db.commit()
+        assert catalog_version(db) == version + 2
+        assert 'Yerba mate suave' in [p['name'] for p in get_catalog()]
@@ -0,0 +1,49 @@
+import sqlite3
+
+from flask import Flask, flash
+
+from flaskr import streaming
+
+
+def test_lazy_rows_peeks_only_the_first_row():
+    conn = sqlite3.connect(':memory:')
+    rows = streaming.LazyRows(conn.execute("VALUES (1), (2), (3)"))
+    assert rows and [r[0] for r in rows] == [1, 2, 3]
+    assert not streaming.LazyRows(conn.execute("SELECT 1 WHERE 0"))
+
+
+def test_stream_page_consumes_flashes_before_streaming(tmp_path):
+    (tmp_path / 'list.html').write_text(
+        "{% for m in get_flashed_messages() %}[{{ m }}]{% endfor %}"
+        "{% for r in rows %}{{ r }},{% endfor %}"
+    )
+    app = Flask(__name__, template_folder=str(tmp_path))
+    app.secret_key = 'test'
+    app.config['STREAM_BUFFER_BYTES'] = 4
+
+    @app.get('/list')
+    def view():
+        return streaming.stream_page('list.html', rows=range(5))
+
+    @app.get('/flash')
+    def add_flash():
+        flash('hecho')
+        return ''
+
+    client = app.test_client()
+    client.get('/flash')
+    resp = client.get('/list')
+    assert resp.is_streamed and resp.data == b'[hecho]0,1,2,3,4,'
+    assert client.get('/list').data == b'0,1,2,3,4,'
+
+
+def test_lists_are_streamed(client, auth):
+    auth.login('admin', 'admin')
+    client.get('/stock/list')   # consume el flash del login
+
+    for url, expected in (('/stock/list', ('Yerba mate', 'Café molido', 'Leche')),
+                          ('/sales/list', ('Yerba mate', 'Leche'))):
+        response = client.get(url)
+        assert response.status_code == 200 and response.is_streamed
+        body = response.get_data(as_text=True)
+        assert all(name in body for name in expected) and body.rstrip().endswith('</html>')
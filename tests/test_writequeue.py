@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+
+import pytest
+from flaskr.db import _connect_db, get_db
+from flaskr.sales.checkout import SaleLine, apply_sales
+from flaskr.shopping.routes import insert_purchase
+from flaskr.writequeue import WriteQueue, WriteQueueUnavailable
+
+
+@pytest.fixture
+def db_path(seller_db_path):
+    path = seller_db_path
+    conn = _connect_db(path)
+    conn.execute(
+        "INSERT INTO product (name, current_stock, sale_price, purchase_price) VALUES ('A', 10, 1, 1)"
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_write_queue_batches_and_isolates_failures(db_path):
+    wq = WriteQueue(lambda: _connect_db(db_path), max_batch=32, max_delay=0.05)
+    results, errors = [], []
+
+    def sell(quantity):
+        try:
+            results.append(wq.submit(apply_sales, [SaleLine(1, quantity, 1.0)], 1))
+        except sqlite3.IntegrityError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=sell, args=(q,)) for q in (1, 2, 3, 4, 5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with pytest.raises(sqlite3.IntegrityError):
+        wq.submit(insert_purchase, 999, 1, 1.0, 1)  # la FK falla solo en su savepoint
+    wq.close()
+
+    sold = sum(len(ids) for ids, errs in results if not errs)
+    conn = _connect_db(db_path)
+    stock = conn.execute("SELECT current_stock FROM product WHERE id = 1").fetchone()[0]
+    count = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    conn.close()
+    assert not errors and count == sold and stock >= 0
+    assert wq.stats()['items'] == 6 and wq.stats()['batches'] < 6
+
+
+def test_write_queue_fails_fast_when_the_writer_cannot_connect():
+    def broken():
+        raise sqlite3.OperationalError('unable to open database file')
+
+    wq = WriteQueue(broken, timeout=5)
+    wq._thread.join(1)
+    with pytest.raises(WriteQueueUnavailable):
+        wq.submit(lambda db: None)
+    assert wq.closed
+
+
+def test_write_queue_refuses_submit_after_close(db_path):
+    wq = WriteQueue(lambda: _connect_db(db_path), timeout=5)
+    assert wq.submit(lambda db: db.execute('SELECT 1').fetchone()[0]) == 1
+    wq.close()
+    with pytest.raises(WriteQueueUnavailable):
+        wq.submit(lambda db: None)
+
+
+def test_write_queue_times_out_and_drops_unstarted_writes(db_path):
+    wq = WriteQueue(lambda: _connect_db(db_path), max_batch=1, timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(db):
+        started.set()
+        release.wait(5)
+
+    def insert(db):
+        db.execute("INSERT INTO product (name, sale_price, purchase_price) VALUES ('B', 1, 1)")
+
+    blocker = threading.Thread(target=lambda: pytest.raises(WriteQueueUnavailable, wq.submit, slow))
+    blocker.start()
+    assert started.wait(5)
+    with pytest.raises(WriteQueueUnavailable, match='no se aplicó'):
+        wq.submit(insert)   # queda detrás de `slow` y se descarta
+    release.set()
+    blocker.join()
+    wq.close()
+
+    conn = _connect_db(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM product WHERE name = 'B'").fetchone()[0] == 0
+    conn.close()
+
+
+def _stock_of_first_product(app):
+    with app.app_context():
+        return get_db().execute("SELECT current_stock FROM product WHERE id = 1").fetchone()[0]
+
+
+@pytest.mark.parametrize(('username', 'path', 'redirect_to', 'message'), (
+    ('test', '/sales/new', '/sales/my', 'Venta no confirmada'),
+    ('admin', '/shopping/new', '/shopping/my', 'Compra no confirmada'),
+))
+def test_routes_report_unconfirmed_writes_when_the_writer_is_dead(
+        app, client, auth, monkeypatch, username, path, redirect_to, message):
+    def broken(path):
+        raise sqlite3.OperationalError('unable to open database file')
+
+    # Solo la conexión del hilo escritor falla; la de la request sigue andando
+    monkeypatch.setattr('flaskr.writequeue._connect_db', broken)
+    app.config['WRITE_QUEUE_ENABLED'] = True
+    auth.login(username, username)
+    before = _stock_of_first_product(app)
+
+    response = client.post(path, data={'product_id': 1, 'quantity': 1, 'unit_price': 900})
+    assert response.status_code == 302
+    assert response.headers['Location'] == redirect_to
+    with client.session_transaction() as session:
+        assert message in session['_flashes'][0][1]
+    assert _stock_of_first_product(app) == before